@@ -1,3 +1,15 @@
 from django.contrib import admin
 
+from .models import AttendanceArchive, Geofence
+
 # Register your models here.
+@admin.register(Geofence)
+class GeofenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'shape', 'radius', 'is_active')
+    list_filter = ('shape', 'is_active')
+
+
+@admin.register(AttendanceArchive)
+class AttendanceArchiveAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'year', 'month', 'fiscal_year', 'row_count', 'path', 'created_on')
+    list_filter = ('kind', 'fiscal_year')
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.core.management import call_command
+from django.db.models.signals import post_migrate
+
+
+def create_cache_table(using='default', **kwargs):
+    # The shared database cache lives outside the models; migrate creates it like any table
+    call_command('createcachetable', database=using, verbosity=0)
 
 
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(create_cache_table, sender=self)
@@ -0,0 +1,203 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from itertools import chain
+
+import nepali_datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import JSONField
+
+from fiscal_year.models import FiscalYear
+from .models import ArchiveKind, Attendance, AttendanceArchive, Request
+from .partitions import month_bounds, next_month
+from .register import register_cache_key
+
+ARCHIVED_MODELS = {ArchiveKind.ATTENDANCE: Attendance, ArchiveKind.REQUEST: Request}
+
+
+def archive_path(kind, year, month):
+    return os.path.join(kind, str(year), f'{year}-{month:02d}.csv.gz')
+
+
+def _encode(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _decode(field, value):
+    if value == '' and field.null:
+        return None
+    if isinstance(field, JSONField):
+        return json.loads(value)
+    return field.to_python(value)
+
+
+def _write(path, columns, rows):
+    """
+    Write rows to a gzipped CSV and return (row count, SHA-256 of the file).
+    The file is written and fsynced under a temporary name in the same
+    directory and then moved over ``path``, so a crash never leaves a
+    truncated archive behind.
+    """
+    full_path = os.path.join(settings.ATTENDANCE_ARCHIVE_DIR, path)
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        count = 0
+        with os.fdopen(descriptor, 'wb') as raw:
+            with gzip.open(raw, 'wt', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow([_encode(value) for value in row])
+                    count += 1
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        digest = hashlib.sha256()
+        with open(temp_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        os.replace(temp_path, full_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    # Make the rename itself durable
+    directory_descriptor = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(directory_descriptor)
+    finally:
+        os.close(directory_descriptor)
+    return count, digest.hexdigest()
+
+
+def _archived_rows(archive):
+    """Raw CSV rows of an archive file, without the header."""
+    with gzip.open(os.path.join(settings.ATTENDANCE_ARCHIVE_DIR, archive.path), 'rt', newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        return list(reader)
+
+
+def archive_month(year, month, fiscal_year=None):
+    """
+    Move one Nepali month of Attendance and Request rows into csv.gz files and
+    record them in the manifest. Files are replaced atomically and the rows are
+    only deleted afterwards, in one transaction with the manifest entries and
+    with a single DELETE per table. Rows that reached an archived month later
+    (imports, auto-closed checkouts) are added to its file on the next run; a
+    file left ahead of the table by a failed run is reconciled by row id.
+
+    Monthly summaries are not touched: rebuild_monthly_summaries reads
+    archived months from their files, so moving rows leaves them correct.
+    """
+    start, end = month_bounds(year, month)
+    archives = []
+    with transaction.atomic():
+        for kind, model in ARCHIVED_MODELS.items():
+            rows = model.objects.filter(date__gte=start, date__lt=end)
+            # Lock what is there now; anything inserted later stays in the table
+            ids = set(rows.select_for_update().values_list('id', flat=True))
+            if not ids:
+                continue
+            rows = rows.filter(id__lte=max(ids))
+
+            archive = AttendanceArchive.objects.select_for_update().filter(kind=kind, year=year, month=month).first()
+            previous = _archived_rows(archive) if archive else []
+            columns = [field.attname for field in model._meta.concrete_fields]
+            id_column = columns.index('id')
+            previous = [row for row in previous if int(row[id_column]) not in ids]
+            path = archive.path if archive else archive_path(kind, year, month)
+            row_count, checksum = _write(path, columns, chain(
+                previous, rows.order_by('id').values_list(*columns).iterator(chunk_size=2000),
+            ))
+            if archive:
+                archive.row_count, archive.checksum = row_count, checksum
+                archive.save(update_fields=['row_count', 'checksum'])
+            else:
+                archive = AttendanceArchive.objects.create(
+                    kind=kind, fiscal_year=fiscal_year, year=year, month=month, start_date=start,
+                    end_date=end, path=path, row_count=row_count, checksum=checksum,
+                )
+            archives.append(archive)
+            # Nothing references these rows, so skip collecting them for per-row delete signals
+            rows._raw_delete(rows.db)
+
+    if archives:
+        cache.delete(register_cache_key(year, month))
+    return archives
+
+
+def is_archived(year, month, kind=ArchiveKind.ATTENDANCE):
+    return AttendanceArchive.objects.filter(kind=kind, year=year, month=month).exists()
+
+
+def fiscal_year_months(fiscal_year):
+    year, month = fiscal_year.start_date.year, fiscal_year.start_date.month
+    while (year, month) <= (fiscal_year.end_date.year, fiscal_year.end_date.month):
+        yield year, month
+        year, month = next_month(year, month)
+
+
+def archive_fiscal_year(fiscal_year):
+    return [
+        archive
+        for year, month in fiscal_year_months(fiscal_year)
+        for archive in archive_month(year, month, fiscal_year)
+    ]
+
+
+def archivable_fiscal_years(keep=2):
+    """Fiscal years that have ended, other than the ``keep`` most recent ones."""
+    today = nepali_datetime.date.today()
+    fiscal_years = FiscalYear.objects.order_by('-start_date')[keep:]
+    return [fiscal_year for fiscal_year in fiscal_years if fiscal_year.end_date < today and not fiscal_year.is_current]
+
+
+def read_archive(archive, employee_ids=None):
+    """Unsaved model instances for the rows of an archive file."""
+    model = ARCHIVED_MODELS[archive.kind]
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    if employee_ids is not None:
+        employee_ids = {str(employee_id) for employee_id in employee_ids}
+    with gzip.open(os.path.join(settings.ATTENDANCE_ARCHIVE_DIR, archive.path), 'rt', newline='') as file:
+        for row in csv.DictReader(file):
+            if employee_ids is not None and row['employee_id'] not in employee_ids:
+                continue
+            yield model(**{name: _decode(fields[name], value) for name, value in row.items()})
+
+
+def month_attendance(year, month, employee_ids=None):
+    """
+    Attendance rows of a Nepali month, ordered by employee and date. For an
+    archived month the archive file is merged with rows written to the table
+    since; a live row wins over an archived one for the same employee and day.
+    Returns (rows, archived).
+    """
+    start, end = month_bounds(year, month)
+    rows = Attendance.objects.filter(date__gte=start, date__lt=end)
+    if employee_ids is not None:
+        rows = rows.filter(employee_id__in=employee_ids)
+    rows = list(rows.order_by('employee_id', 'date'))
+    archive = AttendanceArchive.objects.filter(kind=ArchiveKind.ATTENDANCE, year=year, month=month).first()
+    if not archive:
+        return rows, False
+
+    by_day = {(attendance.employee_id, attendance.date): attendance for attendance in read_archive(archive, employee_ids)}
+    by_day.update(((attendance.employee_id, attendance.date), attendance) for attendance in rows)
+    return [by_day[key] for key in sorted(by_day)], True
+
+
+def attendance_for_month(employee_id, year, month):
+    """An employee's Attendance rows for a Nepali month. Returns (rows, archived)."""
+    return month_attendance(year, month, employee_ids=[employee_id])
@@ -0,0 +1,54 @@
+import csv
+from datetime import timedelta
+
+from utils.date_converter import english_to_nepali_many
+from .models import Attendance
+
+REGISTER_HEADER = [
+    'Employee', 'Name', 'Date (AD)', 'Date (BS)',
+    'Actual Check-In', 'Check-In', 'Actual Check-Out', 'Check-Out', 'Working Hours',
+    'Check-In Device', 'Check-Out Device',
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def attendance_register_rows(start_date, end_date, employee_id=None):
+    """
+    Yield one register row per Attendance in the range, header first.
+
+    Rows come from ``iterator()``, which uses a server-side cursor on
+    PostgreSQL, so memory stays flat however long the range is.
+    """
+    queryset = Attendance.objects.filter(date__range=(start_date, end_date))
+    if employee_id:
+        queryset = queryset.filter(employee_id=employee_id)
+
+    queryset = queryset.order_by('employee_id', 'date').values_list(
+        'employee__username', 'employee__first_name', 'employee__middle_name', 'employee__last_name', 'date',
+        'actual_checkin_time', 'checkin_time', 'actual_checkout_time', 'checkout_time', 'working_hours',
+        'checkin_devices', 'checkout_devices',
+    )
+
+    yield REGISTER_HEADER
+    # Every BS date of the range in one batch conversion
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    nepali_dates = dict(zip(days, english_to_nepali_many(days)))
+    for username, first_name, middle_name, last_name, date, *times, checkin_device, checkout_device in \
+            queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        name = ' '.join(part for part in (first_name, middle_name, last_name) if part)
+        yield [username, name, date.isoformat(), nepali_dates[date],
+               *('' if value is None else value for value in times),
+               checkin_device or '', checkout_device or '']
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
@@ -0,0 +1,119 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+
+from utils.process_cache import ProcessIndex
+from .models import Geofence, GeofenceShape
+
+GRID_SIZE = 0.01  # degrees, roughly 1 km
+METERS_PER_DEGREE = 111320
+EARTH_RADIUS = 6371000
+VERSION_KEY = 'attendance_geofence_version'
+
+
+def distance_in_meters(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class CircleFence:
+    def __init__(self, name, lat, lon, radius):
+        self.name, self.lat, self.lon, self.radius = name, lat, lon, radius
+        lat_span = radius / METERS_PER_DEGREE
+        lon_span = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        self.bbox = (lat - lat_span, lon - lon_span, lat + lat_span, lon + lon_span)
+
+    def contains(self, lat, lon):
+        return distance_in_meters(self.lat, self.lon, lat, lon) <= self.radius
+
+
+class PolygonFence:
+    def __init__(self, name, ring):
+        # GeoJSON rings are [lon, lat] pairs
+        self.name, self.ring = name, [(float(lon), float(lat)) for lon, lat in ring]
+        lons, lats = [lon for lon, _ in self.ring], [lat for _, lat in self.ring]
+        self.bbox = (min(lats), min(lons), max(lats), max(lons))
+
+    def contains(self, lat, lon):
+        # Ray casting
+        inside = False
+        j = len(self.ring) - 1
+        for i in range(len(self.ring)):
+            xi, yi = self.ring[i]
+            xj, yj = self.ring[j]
+            if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+                inside = not inside
+            j = i
+        return inside
+
+
+class GeofenceIndex:
+    """Fences bucketed into a lat/lon grid so a punch is only tested against nearby ones."""
+
+    def __init__(self, fences):
+        self.fences = fences
+        self.cells = defaultdict(list)
+        for fence in fences:
+            min_lat, min_lon, max_lat, max_lon = fence.bbox
+            (low_row, low_col), (high_row, high_col) = self.cell(min_lat, min_lon), self.cell(max_lat, max_lon)
+            for row in range(low_row, high_row + 1):
+                for col in range(low_col, high_col + 1):
+                    self.cells[(row, col)].append(fence)
+
+    @staticmethod
+    def cell(lat, lon):
+        return math.floor(lat / GRID_SIZE), math.floor(lon / GRID_SIZE)
+
+    def locate(self, lat, lon):
+        for fence in self.cells.get(self.cell(lat, lon), ()):
+            if fence.contains(lat, lon):
+                return fence
+        return None
+
+    @classmethod
+    def from_db(cls):
+        fences = []
+        for geofence in Geofence.objects.filter(is_active=True):
+            if geofence.shape == GeofenceShape.CIRCLE and geofence.center and geofence.radius:
+                lon, lat = geofence.center['coordinates']
+                fences.append(CircleFence(geofence.name, float(lat), float(lon), geofence.radius))
+            elif geofence.shape == GeofenceShape.POLYGON and geofence.area:
+                fences.append(PolygonFence(geofence.name, geofence.area['coordinates'][0]))
+        return cls(fences)
+
+
+_index = ProcessIndex(VERSION_KEY, GeofenceIndex.from_db)
+
+
+def get_geofence_index():
+    """
+    Process-wide index, rebuilt only when the fence version moves. Punches do
+    not hit the database or the cache between version checks.
+    """
+    return _index.get()
+
+
+def invalidate_geofences():
+    _index.invalidate()
+
+
+def is_outside_fence(lat, lon):
+    """
+    True when a punch falls outside every active fence. Punches without a usable
+    location count as outside; with geofencing off or no fences set up nothing is.
+    """
+    if settings.ATTENDANCE_GEOFENCE_MODE == 'off':
+        return False
+    index = get_geofence_index()
+    if not index.fences:
+        return False
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return True
+    # NaN, infinite or out-of-range coordinates are no location at all
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return True
+    return index.locate(lat, lon) is None
@@ -0,0 +1,165 @@
+import functools
+import re
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponseRedirect, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import PunchIdempotencyKey
+
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+# Outcome of a key whose punch is still running
+PENDING = {}
+IN_PROGRESS_MESSAGE = "This punch is still being processed, please wait a moment."
+
+
+def idempotency_key(request):
+    """Client key from the Idempotency-Key header or an ``idempotency_key`` form field."""
+    key = request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key')
+    if key and KEY_PATTERN.match(key):
+        return key
+    return None
+
+
+def _cache_key(scope, key):
+    return f'attendance_idempotency:{scope}:{key}'
+
+
+def claim_key(scope, key):
+    """
+    Reserve a key before the punch runs, with an INSERT that fails on conflict.
+    Returns None when this request owns the key, otherwise the outcome stored
+    by the request that claimed it first (PENDING while that one still runs).
+    An expired key is taken over by whichever request updates it first.
+    """
+    outcome = cache.get(_cache_key(scope, key))
+    if outcome is not None:
+        return outcome
+
+    try:
+        with transaction.atomic():
+            PunchIdempotencyKey.objects.create(scope=scope, key=key, outcome=PENDING)
+        return None
+    except IntegrityError:
+        pass
+
+    ttl = settings.ATTENDANCE_IDEMPOTENCY_TTL
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=ttl)
+    if PunchIdempotencyKey.objects.filter(scope=scope, key=key, created_on__lt=cutoff).update(
+        outcome=PENDING, created_on=now,
+    ):
+        return None
+
+    record = PunchIdempotencyKey.objects.filter(scope=scope, key=key).first()
+    if record is None:
+        # Purged in between; the client can simply retry
+        return PENDING
+    if record.outcome != PENDING:
+        remaining = ttl - (now - record.created_on).total_seconds()
+        cache.set(_cache_key(scope, key), record.outcome, max(int(remaining), 1))
+    return record.outcome
+
+
+def save_outcome(scope, key, outcome):
+    """Store the outcome on the key this request claimed; a stored outcome is never overwritten."""
+    if PunchIdempotencyKey.objects.filter(scope=scope, key=key, outcome=PENDING).update(outcome=outcome):
+        cache.set(_cache_key(scope, key), outcome, settings.ATTENDANCE_IDEMPOTENCY_TTL)
+
+
+def release_key(scope, key):
+    """Give up a claimed key whose punch produced nothing to replay, so a retry runs again."""
+    PunchIdempotencyKey.objects.filter(scope=scope, key=key, outcome=PENDING).delete()
+
+
+def purge_expired_keys():
+    cutoff = timezone.now() - timedelta(seconds=settings.ATTENDANCE_IDEMPOTENCY_TTL)
+    deleted, _ = PunchIdempotencyKey.objects.filter(created_on__lt=cutoff).delete()
+    return deleted
+
+
+def replay(request, outcome):
+    if outcome == PENDING:
+        messages.warning(request, IN_PROGRESS_MESSAGE)
+        return HttpResponseRedirect(reverse('dashboard'))
+    if 'json' in outcome:
+        return JsonResponse(outcome['json'])
+    for level, message in outcome['messages']:
+        messages.add_message(request, level, message)
+    return HttpResponseRedirect(outcome['location'])
+
+
+def _message_count(request):
+    return len(messages.get_messages(request))
+
+
+def _record(request, scope, key, response, seen):
+    # Messages queued by the view are part of its outcome; reading them must
+    # not stop them from being shown on this response
+    storage = messages.get_messages(request)
+    new_messages = [[message.level, message.message] for message in list(storage)[seen:]]
+    storage.used = False
+    save_outcome(scope, key, {'location': response['Location'], 'messages': new_messages})
+
+
+def idempotent_punch(view):
+    """
+    Replay the first outcome of a punch view when the client retries it with the
+    same key, without running the view again. Works for sync and async views
+    that answer with a redirect.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = idempotency_key(request)
+            user = await request.auser()
+            if key is None or not user.is_authenticated:
+                return await view(request, *args, **kwargs)
+
+            scope = f'{view.__name__}:{user.pk}'
+            outcome = await sync_to_async(claim_key)(scope, key)
+            if outcome is not None:
+                return replay(request, outcome)
+
+            try:
+                seen = await sync_to_async(_message_count)(request)
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                await sync_to_async(release_key)(scope, key)
+                raise
+            if response.status_code == 302:
+                await sync_to_async(_record)(request, scope, key, response, seen)
+            else:
+                await sync_to_async(release_key)(scope, key)
+            return response
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = idempotency_key(request)
+        if key is None or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        scope = f'{view.__name__}:{request.user.pk}'
+        outcome = claim_key(scope, key)
+        if outcome is not None:
+            return replay(request, outcome)
+
+        try:
+            seen = _message_count(request)
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            release_key(scope, key)
+            raise
+        if response.status_code == 302:
+            _record(request, scope, key, response, seen)
+        else:
+            release_key(scope, key)
+        return response
+    return wrapper
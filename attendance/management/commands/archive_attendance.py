@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.archive import archivable_fiscal_years, archive_fiscal_year
+from fiscal_year.models import FiscalYear
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attendance and attendance request rows of closed fiscal years into per-month csv.gz files "
+        "under ATTENDANCE_ARCHIVE_DIR, keeping a manifest so history pages can still read them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=2, help="Most recent fiscal years to leave in the database")
+        parser.add_argument('--fiscal-year', help="Archive only this fiscal year, e.g. 2079/80")
+
+    def handle(self, *args, **options):
+        if options['fiscal_year']:
+            fiscal_years = [
+                fiscal_year for fiscal_year in archivable_fiscal_years(0)
+                if fiscal_year.fiscal_year == options['fiscal_year']
+            ]
+            if not fiscal_years:
+                if FiscalYear.objects.filter(fiscal_year=options['fiscal_year']).exists():
+                    raise CommandError(f"Fiscal year {options['fiscal_year']} has not closed yet.")
+                raise CommandError(f"Fiscal year {options['fiscal_year']} does not exist.")
+        else:
+            fiscal_years = archivable_fiscal_years(options['keep'])
+
+        for fiscal_year in fiscal_years:
+            for archive in archive_fiscal_year(fiscal_year):
+                self.stdout.write(f"{fiscal_year}: {archive.path} ({archive.row_count} rows)")
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(fiscal_years)} fiscal years."))
@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+from datetime import time as clock, timedelta
+
+import nepali_datetime
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from attendance.models import Attendance, MonthlyAttendanceSummary
+from attendance.partitions import ensure_partitions, is_partitioned
+from attendance.register import build_register
+from attendance.summary import rebuild_monthly_summaries
+from user.models import AuthUser
+
+USERNAME_PREFIX = 'bench_att_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Time punch lookups/updates and monthly report queries over a multi-year synthetic attendance set. "
+        "Seed once, run it before and after migrating to the partitioned table, then --cleanup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=300)
+        parser.add_argument('--years', type=int, default=3)
+        parser.add_argument('--samples', type=int, default=500, help="Punches to time")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the synthetic employees and their rows")
+
+    def handle(self, *args, **options):
+        users = AuthUser.objects.filter(username__startswith=USERNAME_PREFIX)
+        if options['cleanup']:
+            MonthlyAttendanceSummary.objects.filter(employee__in=users).delete()
+            Attendance.objects.filter(employee__in=users).delete()
+            users.delete()
+            self.stdout.write(self.style.SUCCESS("Synthetic attendance removed."))
+            return
+
+        if not users.exists():
+            self.seed(options['employees'], options['years'])
+        if is_partitioned():
+            ensure_partitions(ahead=1)
+
+        employee_ids = list(users.values_list('id', flat=True))
+        days = list(
+            Attendance.objects.filter(employee_id=employee_ids[0]).order_by('date').values_list('date', flat=True)
+        )
+        self.stdout.write(f"{Attendance.objects.count()} attendance rows, partitioned: {is_partitioned()}")
+
+        samples = [(random.choice(employee_ids), random.choice(days)) for _ in range(options['samples'])]
+        self.report("Punch lookup", [self.timed(self.lookup, *sample) for sample in samples])
+        self.report("Punch checkout", [self.timed(self.checkout, *sample) for sample in samples])
+
+        month = nepali_datetime.date.from_datetime_date(days[len(days) // 2])
+        self.report("Monthly summary", [self.timed(rebuild_monthly_summaries, month.year, month.month, employee_ids)
+                                        for _ in range(5)])
+        self.report("Monthly register", [self.timed(build_register, month.year, month.month) for _ in range(5)])
+
+    def seed(self, employees, years):
+        users = AuthUser.objects.bulk_create([
+            AuthUser(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com',
+                     first_name='Bench', last_name=str(i))
+            for i in range(employees)
+        ])
+        today = timezone.now().date()
+        # Saturday is the weekly holiday
+        days = [today - timedelta(days=n) for n in range(1, 365 * years) if (today - timedelta(days=n)).weekday() != 5]
+        for day in days:
+            Attendance.objects.bulk_create([
+                Attendance(employee=user, date=day, actual_checkin_time=clock(9, random.randint(0, 30)),
+                           checkin_time=clock(9, 0), actual_checkout_time=clock(17, 0), checkout_time=clock(17, 0),
+                           working_hours=8)
+                for user in users
+            ], batch_size=2000)
+        self.stdout.write(f"Seeded {len(users)} employees x {len(days)} days")
+
+    def lookup(self, employee_id, day):
+        return Attendance.objects.filter(employee_id=employee_id, date=day).first()
+
+    def checkout(self, employee_id, day):
+        attendance = self.lookup(employee_id, day)
+        attendance.checkout_time = clock(17, random.randint(0, 59))
+        attendance.save(update_fields=['checkout_time'])
+
+    @staticmethod
+    def timed(func, *args):
+        started = time.perf_counter()
+        func(*args)
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"{label:<18} mean {statistics.mean(timings):8.2f} ms   p95 {p95:8.2f} ms")
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from attendance.models import Attendance, MonthlyAttendanceSummary
+from user.models import AuthUser
+
+USERNAME_PREFIX = 'bench_punch_'
+
+
+class Command(BaseCommand):
+    help = (
+        "Check in a batch of synthetic employees through the sync (WSGI) and async (ASGI) punch views "
+        "and compare punches per second for a single worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50, help="In-flight async punches")
+
+    def handle(self, *args, **options):
+        AuthUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        users = AuthUser.objects.bulk_create([
+            AuthUser(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com',
+                     first_name='Bench', last_name=str(i))
+            for i in range(options['employees'])
+        ])
+        # The test clients present themselves as "testserver"
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                sync_rate = self.run_sync(users)
+                self.check_punches(users)
+                self.reset(users)
+                async_rate = asyncio.run(self.run_async(users, options['concurrency']))
+                self.check_punches(users)
+        finally:
+            AuthUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+        self.stdout.write(f"WSGI path:  {sync_rate:.1f} punches/s (one thread)")
+        self.stdout.write(f"ASGI path:  {async_rate:.1f} punches/s (one event loop, {options['concurrency']} in flight)")
+        self.stdout.write(self.style.SUCCESS(f"Async/sync ratio: {async_rate / sync_rate:.2f}x"))
+
+    def check_punches(self, users):
+        recorded = Attendance.objects.filter(employee__in=users).count()
+        if recorded != len(users):
+            raise CommandError(f"Only {recorded} of {len(users)} punches were recorded.")
+
+    def reset(self, users):
+        Attendance.objects.filter(employee__in=users).delete()
+        MonthlyAttendanceSummary.objects.filter(employee__in=users).delete()
+
+    def run_sync(self, users):
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        url = reverse('attendance:checkin')
+        started = time.perf_counter()
+        for client in clients:
+            client.post(url, {'checkinlat': '27.7172', 'checkinlon': '85.3240'})
+        return len(clients) / (time.perf_counter() - started)
+
+    async def run_async(self, users, concurrency):
+        clients = []
+        for user in users:
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append(client)
+
+        url = reverse('attendance:checkin_async')
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def punch(client):
+            async with semaphore:
+                await client.post(url, {'checkinlat': '27.7172', 'checkinlon': '85.3240'})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(punch(client) for client in clients))
+        return len(clients) / (time.perf_counter() - started)
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.missed_checkouts import close_missed_checkouts
+
+
+class Command(BaseCommand):
+    help = (
+        "Close attendance rows from past days that were never checked out, at the shift end time, "
+        "and open a pending missed checkout request for each. Meant to run nightly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Close rows dated before this AD date (YYYY-MM-DD), defaults to today")
+
+    def handle(self, *args, **options):
+        try:
+            before = date.fromisoformat(options['before']) if options['before'] else None
+        except ValueError:
+            raise CommandError("--before must be a YYYY-MM-DD date.")
+
+        closed = close_missed_checkouts(before)
+        self.stdout.write(self.style.SUCCESS(f"Closed {closed} missed checkouts."))
@@ -0,0 +1,27 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from attendance.exports import attendance_register_rows, stream_csv
+
+
+class Command(BaseCommand):
+    help = "Stream the attendance register for a date range (AD, YYYY-MM-DD) as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('start_date', type=date.fromisoformat)
+        parser.add_argument('end_date', type=date.fromisoformat)
+        parser.add_argument('--employee', type=int, help="Limit the export to one employee id")
+        parser.add_argument('--output', help="File to write to, defaults to stdout")
+
+    def handle(self, *args, **options):
+        rows = attendance_register_rows(options['start_date'], options['end_date'], employee_id=options['employee'])
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in stream_csv(rows):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
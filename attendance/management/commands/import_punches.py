@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.punches import DEFAULT_BATCH_SIZE, ingest_punches, parse_punches
+
+
+class Command(BaseCommand):
+    help = "Import a JSON or CSV batch of device punches (employee, timestamp, device, lat, lon) into attendance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Punch file exported from the device")
+        parser.add_argument('--format', choices=['json', 'csv'], help="Defaults to the file extension")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'json')
+        try:
+            rows = parse_punches(path.read_bytes(), format=format)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Could not parse {path}: {e}")
+
+        report = ingest_punches(rows, batch_size=options['batch_size'])
+
+        for rejected in report['rejected']:
+            self.stderr.write(f"Row {rejected['row']}: {rejected['reason']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['accepted']}/{report['received']} punches accepted "
+            f"({report['created']} created, {report['updated']} updated, {len(report['merged'])} merged, "
+            f"{len(report['rejected'])} rejected) "
+            f"in {report['elapsed_seconds']}s, {report['punches_per_second']} punches/s"
+        ))
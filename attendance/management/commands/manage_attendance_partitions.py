@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.partitions import detach_partitions_before, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly partitions of the attendance table (PostgreSQL) and optionally detach old ones. "
+        "Run it monthly from cron; a detached month is left as a standalone table that can be dumped and dropped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3, help="Nepali months to create beyond the current one")
+        parser.add_argument('--detach-before', metavar='YYYY-MM', help="Detach partitions older than this BS month")
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError("The attendance table is not partitioned; this needs PostgreSQL and migration 0011.")
+
+        for name in ensure_partitions(options['ahead']):
+            self.stdout.write(f"Created {name}")
+
+        if options['detach_before']:
+            try:
+                year, month = map(int, options['detach_before'].split('-'))
+            except ValueError:
+                raise CommandError("--detach-before must be a YYYY-MM Nepali month.")
+            for name in detach_partitions_before(year, month):
+                self.stdout.write(f"Detached {name}")
+
+        self.stdout.write(self.style.SUCCESS("Attendance partitions are up to date."))
@@ -0,0 +1,21 @@
+import nepali_datetime
+from django.core.management.base import BaseCommand
+
+from attendance.summary import rebuild_monthly_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute monthly attendance summaries for a Nepali (BS) year, or a single month of it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help="BS year, defaults to the current one")
+        parser.add_argument('--month', type=int, choices=range(1, 13), metavar='1-12')
+
+    def handle(self, *args, **options):
+        year = options['year'] or nepali_datetime.date.today().year
+        months = [options['month']] if options['month'] else range(1, 13)
+
+        for month in months:
+            count = rebuild_monthly_summaries(year, month)
+            self.stdout.write(f"{year}/{month:02d}: {count} employee summaries")
+        self.stdout.write(self.style.SUCCESS("Monthly attendance summaries rebuilt."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.reconciliation import attendance_on_leave
+from utils.date_converter import english_to_nepali, nepali_str_to_english
+
+
+class Command(BaseCommand):
+    help = "List attendance punched on days the employee was on approved leave."
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', help="First day, BS YYYY-MM-DD")
+        parser.add_argument('end', help="Last day, BS YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        try:
+            start, end = nepali_str_to_english(options['start']), nepali_str_to_english(options['end'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        rows = attendance_on_leave(start, end).order_by('date', 'employee__first_name').values_list(
+            'date', 'employee__username', 'checkin_time', 'checkout_time',
+        )
+        count = 0
+        for date, username, checkin_time, checkout_time in rows:
+            count += 1
+            self.stdout.write(f"{english_to_nepali(date)} {username}: {checkin_time} - {checkout_time or ''}")
+        self.stdout.write(self.style.SUCCESS(f"{count} attendance rows fall on approved leave."))
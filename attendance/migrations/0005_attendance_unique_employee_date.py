@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    # Keep the first punch of the day for every employee
+    Attendance = apps.get_model('attendance', 'Attendance')
+    keep_ids = (
+        Attendance.objects.values('employee_id', 'date')
+        .annotate(keep_id=Min('id'))
+        .values('keep_id')
+    )
+    Attendance.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendance_actual_checkin_time_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_attendance_employee_date'),
+        ),
+    ]
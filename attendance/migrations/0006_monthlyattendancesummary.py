@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendance_unique_employee_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('working_hours', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('late_arrivals', models.PositiveIntegerField(default=0)),
+                ('early_departures', models.PositiveIntegerField(default=0)),
+                ('missed_checkouts', models.PositiveIntegerField(default=0)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_attendance_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'year', 'month'), name='unique_monthly_attendance_summary')],
+            },
+        ),
+    ]
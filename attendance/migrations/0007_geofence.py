@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:54
+
+import djgeojson.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_monthlyattendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Geofence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('shape', models.CharField(choices=[('circle', 'Radius'), ('polygon', 'Polygon')], default='circle', max_length=20)),
+                ('center', djgeojson.fields.PointField(blank=True, null=True)),
+                ('radius', models.PositiveIntegerField(blank=True, help_text='Metres, for radius fences', null=True)),
+                ('area', djgeojson.fields.PolygonField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='checkin_outside_fence',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='checkout_outside_fence',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:05
+
+from django.conf import settings
+from django.db import migrations
+
+# Attendance becomes a PostgreSQL table range-partitioned on date. Every row
+# starts out in the default partition; manage_attendance_partitions then moves
+# them into one partition per Nepali month. The primary key has to include the
+# partition key, so it becomes (id, date); id still comes from its own sequence.
+# Other databases keep the plain table.
+
+TABLE = 'attendance_attendance'
+
+
+def _constraints_sql(apps, schema_editor, primary_key):
+    user_table = schema_editor.quote_name(apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table)
+    return [
+        f'ALTER TABLE {TABLE} ADD PRIMARY KEY ({primary_key})',
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT unique_attendance_employee_date UNIQUE (employee_id, date)',
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_employee_id_fk FOREIGN KEY (employee_id) '
+        f'REFERENCES {user_table} (id) DEFERRABLE INITIALLY DEFERRED',
+        f'CREATE INDEX {TABLE}_employee_id_idx ON {TABLE} (employee_id)',
+    ]
+
+
+def _recreate_sequence(schema_editor):
+    schema_editor.execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+    schema_editor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+    schema_editor.execute(f"SELECT setval('{TABLE}_id_seq', COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)")
+
+
+def partition_attendance(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in [
+        f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned',
+        f'ALTER SEQUENCE {TABLE}_id_seq RENAME TO {TABLE}_unpartitioned_id_seq',
+        f'CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (date)',
+        # A serial default would still point at the old table's sequence
+        f'ALTER TABLE {TABLE} ALTER COLUMN id DROP DEFAULT',
+        f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT',
+        f'INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned',
+        f'DROP TABLE {TABLE}_unpartitioned',
+    ]:
+        schema_editor.execute(sql)
+    _recreate_sequence(schema_editor)
+    for sql in _constraints_sql(apps, schema_editor, 'id, date'):
+        schema_editor.execute(sql)
+
+
+def unpartition_attendance(apps, schema_editor):
+    # Detached partitions are not brought back
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in [
+        f'CREATE TABLE {TABLE}_unpartitioned (LIKE {TABLE} INCLUDING DEFAULTS)',
+        f'ALTER TABLE {TABLE}_unpartitioned ALTER COLUMN id DROP DEFAULT',
+        f'INSERT INTO {TABLE}_unpartitioned SELECT * FROM {TABLE}',
+        f'DROP TABLE {TABLE} CASCADE',
+        f'ALTER TABLE {TABLE}_unpartitioned RENAME TO {TABLE}',
+    ]:
+        schema_editor.execute(sql)
+    _recreate_sequence(schema_editor)
+    for sql in _constraints_sql(apps, schema_editor, 'id'):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_attendance_auto_closed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_attendance, unpartition_attendance),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_partition_attendance_by_month'),
+        ('fiscal_year', '0003_remove_fiscalyear_is_active_fiscalyear_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('attendance', 'Attendance'), ('request', 'Request')], max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('path', models.CharField(help_text='Relative to ATTENDANCE_ARCHIVE_DIR', max_length=255)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('checksum', models.CharField(help_text='SHA-256 of the file', max_length=64)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('fiscal_year', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_archives', to='fiscal_year.fiscalyear')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'year', 'month'), name='unique_attendance_archive_month')],
+            },
+        ),
+    ]
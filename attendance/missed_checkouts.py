@@ -0,0 +1,85 @@
+from datetime import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ExpressionWrapper, FloatField, OuterRef, Subquery, TimeField, Value
+from django.db.models.functions import Coalesce, ExtractHour, ExtractMinute, ExtractSecond, Greatest, Round
+from django.utils import timezone
+
+from user.models import WorkingDetail
+from utils.date_converter import english_to_nepali
+from .models import Attendance, Request, RequestStatus, RequestType
+from .register import invalidate_register
+from .summary import rebuild_monthly_summaries
+
+AUTO_CLOSE_REASON = "Checkout was not recorded; closed automatically at the end of the shift."
+
+
+def _seconds(expression):
+    return ExtractHour(expression) * 3600 + ExtractMinute(expression) * 60 + ExtractSecond(expression)
+
+
+def close_time_expression():
+    """Shift end of the row's employee, falling back to ATTENDANCE_AUTO_CLOSE_TIME."""
+    shift_end = Subquery(
+        WorkingDetail.objects.filter(employee=OuterRef('employee_id')).values('shift__end_time')[:1],
+        output_field=TimeField(),
+    )
+    if not settings.ATTENDANCE_AUTO_CLOSE_TIME:
+        return shift_end
+    return Coalesce(shift_end, Value(time.fromisoformat(settings.ATTENDANCE_AUTO_CLOSE_TIME)), output_field=TimeField())
+
+
+def close_missed_checkouts(before=None):
+    """
+    Close every checked-in row before ``before`` (today by default) that has no
+    checkout. checkout_time and working_hours are set by a single UPDATE, the
+    rows are flagged as auto closed, and each gets a pending MISSED_CHECKOUT
+    request so the employee can correct the time. Returns the closed row count.
+    """
+    before = before or timezone.now().date()
+    open_rows = Attendance.objects.filter(date__lt=before, checkin_time__isnull=False, checkout_time__isnull=True)
+    if not settings.ATTENDANCE_AUTO_CLOSE_TIME:
+        # Nothing to close at without a shift
+        open_rows = open_rows.filter(employee__working_detail__shift__end_time__isnull=False)
+
+    with transaction.atomic():
+        ids = list(open_rows.select_for_update(of=('self',)).values_list('id', flat=True))
+        if not ids:
+            return 0
+
+        close_time = close_time_expression()
+        hours = ExpressionWrapper((_seconds(close_time) - _seconds('checkin_time')) / Value(3600.0), output_field=FloatField())
+        Attendance.objects.filter(id__in=ids).update(
+            checkout_time=close_time,
+            working_hours=Round(Greatest(hours, Value(0.0)), 2),
+            auto_closed=True,
+            updated_on=timezone.now(),
+        )
+
+        closed = list(Attendance.objects.filter(id__in=ids).values_list('employee_id', 'date', 'checkout_time'))
+        already_requested = set(
+            Request.objects.filter(
+                type=RequestType.MISSED_CHECKOUT,
+                employee_id__in={employee_id for employee_id, _, _ in closed},
+                date__in={day for _, day, _ in closed},
+            ).exclude(status=RequestStatus.CANCELLED).values_list('employee_id', 'date')
+        )
+        Request.objects.bulk_create([
+            Request(employee_id=employee_id, type=RequestType.MISSED_CHECKOUT, date=day,
+                    time=checkout_time, reason=AUTO_CLOSE_REASON)
+            for employee_id, day, checkout_time in closed
+            if (employee_id, day) not in already_requested
+        ])
+
+        # The UPDATE bypasses the per-punch summary deltas and signals
+        months = {}
+        for employee_id, day, _ in closed:
+            nepali_day = english_to_nepali(day)
+            months.setdefault((nepali_day.year, nepali_day.month), set()).add(employee_id)
+        for (year, month), employee_ids in months.items():
+            rebuild_monthly_summaries(year, month, employee_ids)
+
+    days = [day for _, day, _ in closed]
+    invalidate_register(min(days), max(days))
+    return len(closed)
@@ -3,7 +3,7 @@ from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
-from djgeojson.fields import PointField
+from djgeojson.fields import PointField, PolygonField
 
 # Create your models here.
 class Attendance(models.Model):
@@ -18,12 +18,39 @@ class Attendance(models.Model):
     checkout_location = PointField(null=True, blank=True)
     checkin_devices = models.CharField(max_length=100, null=True, blank=True)
     checkout_devices = models.CharField(max_length=100, null=True, blank=True)
+    checkin_outside_fence = models.BooleanField(default=False)
+    checkout_outside_fence = models.BooleanField(default=False)
+    # Closed by close_missed_checkouts and waiting on the employee's missed checkout request
+    auto_closed = models.BooleanField(default=False)
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_attendance_employee_date'),
+        ]
+
     def __str__(self):
         return f"{self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_date = instance.__dict__.get('date')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._stored_date = self.date
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        # On PostgreSQL the table is partitioned by date (see partitions.py);
+        # naming the stored date updates one partition instead of probing all
+        stored_date = getattr(self, '_stored_date', None)
+        if stored_date is not None:
+            base_qs = base_qs.filter(date=stored_date)
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
 class RequestStatus(models.TextChoices):
     PENDING = 'pending', 'Pending'
     FORWARDED = 'forwarded', 'Forwarded'
@@ -45,6 +72,95 @@ class Request(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Request list filters, each paired with id for keyset pagination
+        indexes = [
+            models.Index(fields=['status', '-id'], name='request_status_id_idx'),
+            models.Index(fields=['type', '-id'], name='request_type_id_idx'),
+            models.Index(fields=['employee', '-id'], name='request_employee_id_idx'),
+            models.Index(fields=['date', '-id'], name='request_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.type} - {self.employee.username}"
-    
\ No newline at end of file
+    
+class MonthlyAttendanceSummary(models.Model):
+    """Per-employee totals for one Nepali (BS) month, kept in step with Attendance."""
+    employee = models.ForeignKey('user.AuthUser', on_delete=models.CASCADE, related_name='monthly_attendance_summaries')
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    present_days = models.PositiveIntegerField(default=0)
+    working_hours = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    late_arrivals = models.PositiveIntegerField(default=0)
+    early_departures = models.PositiveIntegerField(default=0)
+    missed_checkouts = models.PositiveIntegerField(default=0)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'year', 'month'], name='unique_monthly_attendance_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee} - {self.year}/{self.month:02d}"
+
+
+class GeofenceShape(models.TextChoices):
+    CIRCLE = 'circle', 'Radius'
+    POLYGON = 'polygon', 'Polygon'
+
+class Geofence(models.Model):
+    """Office or branch area punches are expected to come from."""
+    name = models.CharField(max_length=100)
+    shape = models.CharField(max_length=20, choices=GeofenceShape.choices, default=GeofenceShape.CIRCLE)
+    center = PointField(null=True, blank=True)
+    radius = models.PositiveIntegerField(null=True, blank=True, help_text="Metres, for radius fences")
+    area = PolygonField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PunchIdempotencyKey(models.Model):
+    """Outcome of a punch submitted with a client key, so retries can be replayed."""
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=64)
+    outcome = models.JSONField()
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_punch_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} - {self.key}"
+
+
+class ArchiveKind(models.TextChoices):
+    ATTENDANCE = 'attendance', 'Attendance'
+    REQUEST = 'request', 'Request'
+
+class AttendanceArchive(models.Model):
+    """Manifest entry for one Nepali month of rows moved out to a csv.gz file."""
+    kind = models.CharField(max_length=20, choices=ArchiveKind.choices)
+    fiscal_year = models.ForeignKey('fiscal_year.FiscalYear', on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance_archives')
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    path = models.CharField(max_length=255, help_text="Relative to ATTENDANCE_ARCHIVE_DIR")
+    row_count = models.PositiveIntegerField(default=0)
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the file")
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'year', 'month'], name='unique_attendance_archive_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} - {self.year}/{self.month:02d}"
@@ -0,0 +1,121 @@
+import re
+from datetime import timedelta
+
+import nepali_datetime
+from django.db import connection, transaction
+
+from utils.date_converter import english_to_nepali, get_last_day_of_month
+from .models import Attendance
+
+# One partition per Nepali month, so registers and summaries read a single one
+TABLE = Attendance._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+# Created by migration 0011
+EMPLOYEE_FOREIGN_KEY = f'{TABLE}_employee_id_fk'
+PARTITION_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def partition_name(year, month):
+    return f'{TABLE}_p{year}_{month:02d}'
+
+
+def month_bounds(year, month):
+    """AD [start, end) range of a Nepali month."""
+    first_date, last_date, _, _ = get_last_day_of_month(month, year)
+    return first_date.to_datetime_date(), last_date.to_datetime_date() + timedelta(days=1)
+
+
+def next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions():
+    """(year, month) -> name of every monthly partition attached to the table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [name for name, in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions[(int(match[1]), int(match[2]))] = name
+    return partitions
+
+
+def create_partition(year, month):
+    """
+    Attach the partition for a Nepali month. Rows that fell into the default
+    partition before it existed are moved across first, otherwise the attach
+    would fail.
+    """
+    name = connection.ops.quote_name(partition_name(year, month))
+    start, end = month_bounds(year, month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    return partition_name(year, month)
+
+
+def detach_partition(year, month):
+    """
+    Detach a month; its rows stay in a standalone table of the same name. The
+    table keeps the partition's copy of the employee foreign key, which is
+    dropped so employees can still be deleted.
+    """
+    name = connection.ops.quote_name(partition_name(year, month))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {EMPLOYEE_FOREIGN_KEY}')
+    return partition_name(year, month)
+
+
+def ensure_partitions(ahead=3):
+    """
+    Create the missing monthly partitions from the oldest row still in the
+    default partition (or the current month) up to ``ahead`` months from now.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(date) FROM {DEFAULT_PARTITION}')
+        oldest, = cursor.fetchone()
+
+    today = nepali_datetime.date.today()
+    start = english_to_nepali(oldest) if oldest else today
+    year, month = start.year, start.month
+    last = (today.year, today.month)
+    for _ in range(ahead):
+        last = next_month(*last)
+
+    existing = monthly_partitions()
+    created = []
+    while (year, month) <= last:
+        if (year, month) not in existing:
+            created.append(create_partition(year, month))
+        year, month = next_month(year, month)
+    return created
+
+
+def detach_partitions_before(year, month):
+    """Detach every monthly partition older than the given Nepali month."""
+    return [
+        detach_partition(*key)
+        for key in sorted(monthly_partitions())
+        if key < (year, month)
+    ]
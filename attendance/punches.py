@@ -0,0 +1,267 @@
+import csv
+import io
+import json
+import time as time_module
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from user.models import AuthUser, WorkingDetail
+from utils.date_converter import english_to_nepali
+from .geofence import is_outside_fence
+from .models import Attendance, RequestType
+from .register import register_cache_key
+from .summary import rebuild_monthly_summaries
+from .utils import (
+    approved_requests, calculate_working_hours, point_location, resolve_checkin_time, resolve_checkout_time,
+)
+
+DEFAULT_BATCH_SIZE = 500
+# Rounds of matching a batch against days other punches recorded meanwhile
+MATCH_ATTEMPTS = 3
+
+
+def parse_punches(content, format='json'):
+    """Turn a JSON list (or {"punches": [...]}) or a CSV document into punch dicts."""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if format == 'csv':
+        return list(csv.DictReader(io.StringIO(content)))
+
+    data = json.loads(content)
+    if isinstance(data, dict):
+        data = data.get('punches', [])
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of punches.")
+    return data
+
+
+def _parse_timestamp(value):
+    stamp = datetime.fromisoformat(str(value).strip())
+    if timezone.is_aware(stamp):
+        stamp = timezone.make_naive(stamp)
+    return stamp
+
+
+def _clean_punches(rows):
+    usernames = {str(row.get('employee') or '').strip() for row in rows if isinstance(row, dict)}
+    employee_ids = dict(AuthUser.objects.filter(username__in=usernames, is_active=True).values_list('username', 'id'))
+
+    punches, rejected = [], []
+    for line, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            rejected.append({'row': line, 'reason': "Malformed row."})
+            continue
+
+        username = str(row.get('employee') or '').strip()
+        if username not in employee_ids:
+            rejected.append({'row': line, 'reason': f"Unknown employee '{username}'."})
+            continue
+
+        try:
+            stamp = _parse_timestamp(row.get('timestamp'))
+        except (TypeError, ValueError):
+            rejected.append({'row': line, 'reason': "Invalid timestamp."})
+            continue
+
+        location = None
+        lat, lon = row.get('lat'), row.get('lon')
+        if lat not in (None, '') and lon not in (None, ''):
+            try:
+                location = point_location(lat, lon)
+            except (TypeError, ValueError):
+                rejected.append({'row': line, 'reason': "Invalid location."})
+                continue
+
+        outside_fence = is_outside_fence(lat, lon)
+        if outside_fence and settings.ATTENDANCE_GEOFENCE_MODE == 'reject':
+            rejected.append({'row': line, 'reason': "Outside office geofence."})
+            continue
+
+        punches.append({
+            'row': line,
+            'employee_id': employee_ids[username],
+            'timestamp': stamp,
+            'device': (str(row.get('device') or '').strip() or None),
+            'location': location,
+            'outside_fence': outside_fence,
+        })
+    return punches, rejected
+
+
+def _existing_attendance(employee_ids, dates):
+    return {
+        (attendance.employee_id, attendance.date): attendance
+        for attendance in Attendance.objects.filter(employee_id__in=employee_ids, date__in=dates)
+    }
+
+
+def _match_days(days):
+    """
+    (new rows, changed rows) for punches grouped by (employee id, day), merged
+    with the rows already recorded for those days.
+    """
+    employee_ids = {employee_id for employee_id, _ in days}
+    dates = {day for _, day in days}
+    existing = _existing_attendance(employee_ids, dates)
+    approved_times = {}
+    for employee_id, day, kind, approved_time in approved_requests(
+        employee_id__in=employee_ids,
+        date__in=dates,
+        type__in=[RequestType.LATE_ARRIVAL_REQUEST, RequestType.EARLY_DEPARTURE_REQUEST],
+    ).values_list('employee_id', 'date', 'type', 'time'):
+        approved_times.setdefault((employee_id, day, kind), approved_time)
+    shifts = {
+        working_detail.employee_id: working_detail.shift
+        for working_detail in WorkingDetail.objects.filter(employee_id__in=employee_ids).select_related('shift')
+    }
+
+    created, updated = [], []
+    for (employee_id, day), day_punches in days.items():
+        attendance = existing.get((employee_id, day))
+        is_new = attendance is None
+        if is_new:
+            attendance = Attendance(employee_id=employee_id, date=day)
+
+        # Punches already recorded for the day take part in the matching
+        day_punches = list(day_punches)
+        if attendance.actual_checkin_time:
+            day_punches.append({'timestamp': datetime.combine(day, attendance.actual_checkin_time),
+                                'device': attendance.checkin_devices, 'location': attendance.checkin_location,
+                                'outside_fence': attendance.checkin_outside_fence})
+        if attendance.actual_checkout_time:
+            day_punches.append({'timestamp': datetime.combine(day, attendance.actual_checkout_time),
+                                'device': attendance.checkout_devices, 'location': attendance.checkout_location,
+                                'outside_fence': attendance.checkout_outside_fence})
+
+        day_punches.sort(key=lambda punch: punch['timestamp'])
+        first, last = day_punches[0], day_punches[-1]
+        checkin_time = first['timestamp'].time()
+        checkout_time = last['timestamp'].time() if last['timestamp'] > first['timestamp'] else None
+        if (checkin_time, checkout_time) == (attendance.actual_checkin_time, attendance.actual_checkout_time):
+            continue
+
+        attendance.actual_checkin_time = checkin_time
+        attendance.checkin_devices = first['device']
+        attendance.checkin_location = first['location']
+        attendance.checkin_outside_fence = first['outside_fence']
+        if checkout_time:
+            attendance.actual_checkout_time = checkout_time
+            attendance.checkout_devices = last['device']
+            attendance.checkout_location = last['location']
+            attendance.checkout_outside_fence = last['outside_fence']
+
+        shift = shifts.get(employee_id)
+        attendance.checkin_time = resolve_checkin_time(
+            attendance.actual_checkin_time,
+            approved_times.get((employee_id, day, RequestType.LATE_ARRIVAL_REQUEST)),
+            shift,
+        )
+        if attendance.actual_checkout_time:
+            attendance.checkout_time = resolve_checkout_time(
+                attendance.actual_checkout_time,
+                approved_times.get((employee_id, day, RequestType.EARLY_DEPARTURE_REQUEST)),
+                shift,
+            )
+            attendance.working_hours = calculate_working_hours(attendance.checkin_time, attendance.checkout_time)
+
+        (created if is_new else updated).append(attendance)
+    return created, updated
+
+
+def _lost_inserts(created):
+    """
+    Days among ``created`` whose row was recorded by a concurrent punch first,
+    so the conflict-ignoring insert skipped ours.
+    """
+    if not created:
+        return set()
+    stored = {
+        (employee_id, day): punch
+        for employee_id, day, *punch in Attendance.objects.filter(
+            employee_id__in={attendance.employee_id for attendance in created},
+            date__in={attendance.date for attendance in created},
+        ).values_list('employee_id', 'date', 'actual_checkin_time', 'actual_checkout_time', 'checkin_devices')
+    }
+    return {
+        (attendance.employee_id, attendance.date) for attendance in created
+        if stored.get((attendance.employee_id, attendance.date)) != [
+            attendance.actual_checkin_time, attendance.actual_checkout_time, attendance.checkin_devices,
+        ]
+    }
+
+
+def ingest_punches(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Match raw device punches into Attendance rows.
+
+    The first punch of an employee's day is the check-in and the last one the
+    check-out, merged with any row already recorded for that day. Approved late
+    arrival / early departure requests and shift bounds are applied the same way
+    as in the check-in/check-out views. Existing rows, requests and shifts are
+    fetched with one query each and the result is written with
+    bulk_create/bulk_update in chunks of ``batch_size``.
+
+    New rows are inserted ignoring conflicts: a day recorded by a concurrent
+    punch in the meantime is matched again against that row and reported under
+    ``merged``.
+    """
+    started = time_module.perf_counter()
+    punches, rejected = _clean_punches(rows)
+
+    days = defaultdict(list)
+    for punch in punches:
+        days[(punch['employee_id'], punch['timestamp'].date())].append(punch)
+
+    created, updated, merged = [], [], []
+    pending = days
+    for _ in range(MATCH_ATTEMPTS):
+        if not pending:
+            break
+        new, changed = _match_days(pending)
+        with transaction.atomic():
+            Attendance.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+            lost = _lost_inserts(new)
+            inserted = [attendance for attendance in new if (attendance.employee_id, attendance.date) not in lost]
+            now = timezone.now()
+            for attendance in changed:
+                attendance.updated_on = now
+            Attendance.objects.bulk_update(changed, [
+                'actual_checkin_time', 'actual_checkout_time', 'checkin_time', 'checkout_time', 'working_hours',
+                'checkin_location', 'checkout_location', 'checkin_devices', 'checkout_devices',
+                'checkin_outside_fence', 'checkout_outside_fence', 'updated_on',
+            ], batch_size=batch_size)
+
+            # Bring the monthly summaries of every touched employee/month back in step
+            touched_months = defaultdict(set)
+            for attendance in inserted + changed:
+                nepali_day = english_to_nepali(attendance.date)
+                touched_months[(nepali_day.year, nepali_day.month)].add(attendance.employee_id)
+            for (year, month), month_employee_ids in touched_months.items():
+                rebuild_monthly_summaries(year, month, employee_ids=month_employee_ids)
+                cache.delete(register_cache_key(year, month))
+        created += inserted
+        updated += changed
+        merged += sorted(lost)
+        pending = {key: days[key] for key in lost}
+
+    for employee_id, day in sorted(pending):
+        for punch in days[(employee_id, day)]:
+            rejected.append({'row': punch['row'], 'reason': "Day kept changing while importing; send it again."})
+
+    elapsed = time_module.perf_counter() - started
+    return {
+        'received': len(rows),
+        'accepted': len(punches),
+        'created': len(created),
+        'updated': len(updated),
+        'merged': [{'employee_id': employee_id, 'date': day.isoformat()} for employee_id, day in merged],
+        'rejected': rejected,
+        'elapsed_seconds': round(elapsed, 3),
+        'punches_per_second': round(len(punches) / elapsed, 1) if elapsed else None,
+    }
@@ -0,0 +1,22 @@
+from django.db.models import Exists, OuterRef
+
+from leave.models import Leave
+from .models import Attendance
+
+
+def approved_leave_covering(employee='employee', day='date'):
+    """
+    Whether the outer row's employee has an approved leave spanning its AD
+    date. Leave dates are stored in AD, so this is a plain range predicate the
+    leave period index answers.
+    """
+    return Exists(Leave.objects.filter(
+        employee=OuterRef(employee), status='Approved', start_date__lte=OuterRef(day), end_date__gte=OuterRef(day),
+    ))
+
+
+def attendance_on_leave(start_date, end_date):
+    """Attendance punched in the AD range on a day its employee was on approved leave, in one query."""
+    return Attendance.objects.filter(
+        approved_leave_covering(), date__range=(start_date, end_date), checkin_time__isnull=False,
+    )
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from leave.models import Leave
+from user.models import AuthUser
+from utils.date_converter import english_to_nepali, get_last_day_of_month
+from .models import Attendance, Request, RequestStatus, RequestType
+
+PRESENT = 'P'
+LATE = 'L'
+ON_LEAVE = 'LV'
+ABSENT = 'A'
+UPCOMING = ''
+
+
+def register_cache_key(year, month):
+    return f'attendance_register:{year}:{month}'
+
+
+def invalidate_register(start_date, end_date=None):
+    """Drop the cached grid of every Nepali month touched by the AD date range."""
+    # Attendance.date defaults to timezone.now, so unsaved rows may carry a datetime
+    day = start_date.date() if isinstance(start_date, datetime) else start_date
+    end_date = end_date or day
+    while day <= end_date:
+        nepali_day = english_to_nepali(day)
+        cache.delete(register_cache_key(nepali_day.year, nepali_day.month))
+        _, last_date, _, _ = get_last_day_of_month(nepali_day.month, nepali_day.year)
+        day = last_date.to_datetime_date() + timedelta(days=1)
+
+
+def build_register(year, month):
+    """
+    Employee x day grid for a Nepali month.
+
+    Attendance, approved leaves and approved late arrival requests are read with
+    one query each; cells are filled by index (day offset) and leave ranges by
+    slice assignment, so no per-cell lookups are made.
+    """
+    first_date, last_date, last_day, _ = get_last_day_of_month(month, year)
+    start, end = first_date.to_datetime_date(), last_date.to_datetime_date()
+    today = timezone.now().date()
+
+    # Days up to today default to absent, later ones stay blank
+    elapsed = max(0, min(last_day, (today - start).days + 1))
+    blank_row = [ABSENT] * elapsed + [UPCOMING] * (last_day - elapsed)
+
+    employees = list(AuthUser.objects.filter(is_active=True).order_by('first_name', 'last_name'))
+    cells = {employee.id: list(blank_row) for employee in employees}
+
+    excused = set(Request.objects.filter(
+        date__range=(start, end),
+        type=RequestType.LATE_ARRIVAL_REQUEST,
+        status=RequestStatus.APPROVED,
+    ).values_list('employee_id', 'date'))
+
+    for employee_id, date, checkin_time, shift_start in Attendance.objects.filter(
+            date__range=(start, end), employee_id__in=cells, checkin_time__isnull=False,
+    ).values_list('employee_id', 'date', 'checkin_time', 'employee__working_detail__shift__start_time'):
+        is_late = shift_start and checkin_time > shift_start and (employee_id, date) not in excused
+        cells[employee_id][(date - start).days] = LATE if is_late else PRESENT
+
+    for employee_id, leave_start, leave_end in Leave.objects.filter(
+            status='Approved', start_date__lte=last_date, end_date__gte=first_date, employee_id__in=cells,
+    ).values_list('employee_id', 'start_date', 'end_date'):
+        first = max((leave_start.to_datetime_date() - start).days, 0)
+        last = min((leave_end.to_datetime_date() - start).days, last_day - 1)
+        cells[employee_id][first:last + 1] = [ON_LEAVE] * (last - first + 1)
+
+    return {
+        'year': year,
+        'month': month,
+        'as_of': today,
+        'days': list(range(1, last_day + 1)),
+        'rows': [{'employee': employee.full_name(), 'cells': cells[employee.id]} for employee in employees],
+    }
+
+
+def render_register(year, month):
+    """Rendered register table for the month, cached until a relevant row changes."""
+    key = register_cache_key(year, month)
+    cached = cache.get(key)
+    # A grid built on an earlier day has stale absent/upcoming cells
+    if cached is None or cached[0] != timezone.now().date():
+        register = build_register(year, month)
+        cached = (register['as_of'], render_to_string('attendance/register_table.html', {'register': register}))
+        cache.set(key, cached, None)
+    return mark_safe(cached[1])
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from leave.models import Leave
+from .geofence import invalidate_geofences
+from .models import Attendance, Geofence, Request
+from .register import invalidate_register
+
+
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=Request)
+def invalidate_register_for_day(sender, instance, **kwargs):
+    invalidate_register(instance.date)
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def invalidate_register_for_leave(sender, instance, **kwargs):
+    to_nepali = Leave._meta.get_field('start_date').to_python
+    invalidate_register(to_nepali(instance.start_date).to_datetime_date(), to_nepali(instance.end_date).to_datetime_date())
+
+
+@receiver([post_save, post_delete], sender=Geofence)
+def rebuild_geofence_index(sender, instance, **kwargs):
+    invalidate_geofences()
@@ -0,0 +1,131 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from user.models import WorkingDetail
+from utils.date_converter import english_to_nepali, english_to_nepali_columns, get_last_day_of_month
+from .archive import is_archived, month_attendance
+from .models import Attendance, MonthlyAttendanceSummary
+
+SUMMARY_FIELDS = ('present_days', 'working_hours', 'late_arrivals', 'early_departures', 'missed_checkouts')
+
+
+def attendance_contribution(attendance, shift=None):
+    """What a single Attendance row adds to its month's summary."""
+    if attendance is None or not attendance.checkin_time:
+        return {}
+    return {
+        'present_days': 1,
+        'working_hours': Decimal(str(round(attendance.working_hours or 0, 2))),
+        'late_arrivals': int(bool(shift and attendance.checkin_time > shift.start_time)),
+        'early_departures': int(bool(shift and attendance.checkout_time and attendance.checkout_time < shift.end_time)),
+        'missed_checkouts': int(attendance.actual_checkout_time is None),
+    }
+
+
+def apply_summary_delta(employee_id, day, before, after):
+    """
+    Move a month's summary from the ``before`` to the ``after`` contribution of one
+    row. Usually a single UPDATE with F-expressions; the row is created on the
+    first punch of the month.
+    """
+    delta = {field: after.get(field, 0) - before.get(field, 0) for field in SUMMARY_FIELDS}
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+
+    nepali_day = english_to_nepali(day)
+    summary = MonthlyAttendanceSummary.objects.filter(employee_id=employee_id, year=nepali_day.year, month=nepali_day.month)
+    changes = {field: F(field) + value for field, value in delta.items()}
+    if summary.update(**changes, updated_on=timezone.now()):
+        return
+
+    try:
+        with transaction.atomic():
+            MonthlyAttendanceSummary.objects.create(
+                employee_id=employee_id, year=nepali_day.year, month=nepali_day.month,
+                **{field: max(value, 0) for field, value in delta.items()}
+            )
+    except IntegrityError:
+        # Created concurrently by another punch
+        summary.update(**changes, updated_on=timezone.now())
+
+
+def apply_summary_deltas(changes):
+    """
+    Batch form of apply_summary_delta for (employee_id, day, before, after)
+    tuples: changes are summed per employee and month first, so the number of
+    writes is the number of touched summaries, not rows.
+    """
+    changes = list(changes)
+    years, months, _ = english_to_nepali_columns(day for _, day, _, _ in changes)
+    grouped = {}
+    for (employee_id, day, before, after), year, month in zip(changes, years, months):
+        key = (employee_id, year, month)
+        _, before_total, after_total = grouped.setdefault(key, (day, {}, {}))
+        for total, contribution in ((before_total, before), (after_total, after)):
+            for field, value in contribution.items():
+                total[field] = total.get(field, 0) + value
+
+    for (employee_id, _, _), (day, before_total, after_total) in grouped.items():
+        apply_summary_delta(employee_id, day, before_total, after_total)
+
+
+def _archived_month_totals(year, month, employee_ids=None):
+    """Per-employee totals of an archived month, from its archive file and the rows written since."""
+    attendances, _ = month_attendance(year, month, employee_ids)
+    shifts = {
+        working_detail.employee_id: working_detail.shift
+        for working_detail in WorkingDetail.objects.filter(
+            employee_id__in={attendance.employee_id for attendance in attendances},
+        ).select_related('shift')
+    }
+    totals = {}
+    for attendance in attendances:
+        contribution = attendance_contribution(attendance, shifts.get(attendance.employee_id))
+        if not contribution:
+            continue
+        total = totals.setdefault(attendance.employee_id, {'employee_id': attendance.employee_id})
+        for field, value in contribution.items():
+            total[field] = total.get(field, 0) + value
+    return totals.values()
+
+
+def rebuild_monthly_summaries(year, month, employee_ids=None):
+    """
+    Recompute one Nepali month from Attendance with a single aggregate query.
+    Archived months are recomputed from their archive file merged with the
+    rows that reached the table since.
+    """
+    summaries = MonthlyAttendanceSummary.objects.filter(year=year, month=month)
+    if employee_ids is not None:
+        summaries = summaries.filter(employee_id__in=employee_ids)
+
+    if is_archived(year, month):
+        totals = _archived_month_totals(year, month, employee_ids)
+    else:
+        first_date, last_date, _, _ = get_last_day_of_month(month, year)
+        attendances = Attendance.objects.filter(
+            date__range=(first_date.to_datetime_date(), last_date.to_datetime_date()),
+            checkin_time__isnull=False,
+        )
+        if employee_ids is not None:
+            attendances = attendances.filter(employee_id__in=employee_ids)
+        totals = attendances.values('employee_id').annotate(
+            present_days=Count('id'),
+            working_hours=Coalesce(Sum('working_hours'), Value(Decimal('0.00')), output_field=DecimalField()),
+            late_arrivals=Count('id', filter=Q(checkin_time__gt=F('employee__working_detail__shift__start_time'))),
+            early_departures=Count('id', filter=Q(checkout_time__lt=F('employee__working_detail__shift__end_time'))),
+            missed_checkouts=Count('id', filter=Q(actual_checkout_time__isnull=True)),
+        ).order_by()
+
+    with transaction.atomic():
+        summaries.delete()
+        created = MonthlyAttendanceSummary.objects.bulk_create(
+            [MonthlyAttendanceSummary(year=year, month=month, **row) for row in totals],
+            batch_size=1000,
+        )
+    return len(created)
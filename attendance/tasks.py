@@ -0,0 +1,38 @@
+import os
+from datetime import date
+
+from django.conf import settings
+
+from jobs.queue import task
+from .exports import EXPORT_CHUNK_SIZE, attendance_register_rows, stream_csv
+from .models import Attendance
+from .summary import rebuild_monthly_summaries
+
+
+@task('attendance.rebuild_summary')
+def rebuild_summary(job, year, month=None):
+    months = [month] if month else range(1, 13)
+    rebuilt = 0
+    for done, month in enumerate(months):
+        job.set_progress(done * 100 / len(months), f"Rebuilding {year}/{month:02d}")
+        rebuilt += rebuild_monthly_summaries(year, month)
+    return {'summaries': rebuilt}
+
+
+@task('attendance.export')
+def export_register(job, start_date, end_date, employee_id=None):
+    start_date, end_date = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    queryset = Attendance.objects.filter(date__range=(start_date, end_date))
+    if employee_id:
+        queryset = queryset.filter(employee_id=employee_id)
+    total = queryset.count() or 1
+
+    relative_path = os.path.join('exports', f'attendance_{start_date}_{end_date}_{job.pk}.csv')
+    path = os.path.join(settings.JOBS_OUTPUT_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for written, line in enumerate(stream_csv(attendance_register_rows(start_date, end_date, employee_id))):
+            output.write(line)
+            if written and written % EXPORT_CHUNK_SIZE == 0:
+                job.set_progress(written * 100 / total, f"{written} of {total} rows")
+    return {'file': relative_path, 'rows': written}
@@ -1,3 +1,551 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date, time
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import nepali_datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from attendance.archive import archivable_fiscal_years, archive_fiscal_year, archive_month, attendance_for_month
+from attendance.geofence import invalidate_geofences, is_outside_fence
+from attendance.idempotency import IN_PROGRESS_MESSAGE, claim_key, save_outcome
+from attendance.missed_checkouts import close_missed_checkouts
+from attendance.models import (
+    Attendance, AttendanceArchive, Geofence, GeofenceShape, MonthlyAttendanceSummary, Request, RequestStatus, RequestType,
+)
+from attendance import punches
+from attendance.partitions import create_partition, detach_partition, is_partitioned
+from attendance.punches import ingest_punches, parse_punches
+from attendance.reconciliation import attendance_on_leave
+from attendance.register import build_register, render_register
+from attendance.summary import SUMMARY_FIELDS, rebuild_monthly_summaries
+from fiscal_year.models import FiscalYear
+from leave.models import Leave, LeaveType
+from roster.models import Shift
+from user.models import AuthUser, WorkingDetail
+
+
+def app_queries(queries):
+    # Leaves out the reads and writes of the database cache
+    cache_table = settings.CACHES['default']['LOCATION']
+    return [query for query in queries if cache_table not in query['sql'] and 'SAVEPOINT' not in query['sql']]
+
+
+class CheckinViewTest(TestCase):
+    def setUp(self):
+        self.user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        self.client.force_login(self.user)
+
+    def test_second_checkin_is_rejected_by_the_insert(self):
+        self.client.post(reverse('attendance:checkin'), {'checkinlat': '27.7', 'checkinlon': '85.3'})
+        response = self.client.post(reverse('attendance:checkin'), follow=True)
+
+        self.assertEqual(Attendance.objects.filter(employee=self.user).count(), 1)
+        self.assertContains(response, "You have already checked in today.")
+
+    def test_retry_with_same_key_replays_the_first_outcome(self):
+        data = {'checkinlat': '27.7', 'checkinlon': '85.3', 'idempotency_key': 'a1b2c3d4e5f6'}
+        self.client.post(reverse('attendance:checkin'), data)
+
+        response = self.client.post(reverse('attendance:checkin'), data, follow=True)
+        self.assertContains(response, "Check-In Successful")
+        self.assertNotContains(response, "You have already checked in today.")
+
+        # Falls back to the database once the cached copy is gone
+        cache.clear()
+        response = self.client.post(reverse('attendance:checkin'), data, follow=True)
+        self.assertContains(response, "Check-In Successful")
+        self.assertEqual(Attendance.objects.filter(employee=self.user).count(), 1)
+
+    def test_key_is_claimed_before_the_punch_and_never_overwritten(self):
+        data = {'checkinlat': '27.7', 'checkinlon': '85.3', 'idempotency_key': 'f6e5d4c3b2a1'}
+        scope = f'checkin_view:{self.user.pk}'
+
+        # A concurrent request holds the key: this one neither punches nor claims it
+        self.assertIsNone(claim_key(scope, data['idempotency_key']))
+        response = self.client.post(reverse('attendance:checkin'), data, follow=True)
+        self.assertContains(response, IN_PROGRESS_MESSAGE)
+        self.assertFalse(Attendance.objects.exists())
+
+        save_outcome(scope, data['idempotency_key'], {'location': '/', 'messages': [[25, "First outcome"]]})
+        save_outcome(scope, data['idempotency_key'], {'location': '/', 'messages': [[25, "Second outcome"]]})
+        cache.clear()
+        response = self.client.post(reverse('attendance:checkin'), data, follow=True)
+        self.assertContains(response, "First outcome")
+        self.assertNotContains(response, "Second outcome")
+
+
+class PunchIngestionTest(TestCase):
+    def setUp(self):
+        self.user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+
+    def test_first_and_last_punch_become_checkin_and_checkout(self):
+        rows = parse_punches(
+            "employee,timestamp,device,lat,lon\n"
+            "emp,2025-05-01T09:05:00,gate-1,27.7,85.3\n"
+            "emp,2025-05-01T13:00:00,gate-2,,\n"
+            "emp,2025-05-01T17:30:00,gate-1,27.7,85.3\n"
+            "ghost,2025-05-01T09:00:00,gate-1,,\n"
+            "emp,yesterday,gate-1,,\n",
+            format='csv',
+        )
+        report = ingest_punches(rows)
+
+        self.assertEqual((report['created'], report['updated']), (1, 0))
+        self.assertEqual([r['row'] for r in report['rejected']], [4, 5])
+        attendance = Attendance.objects.get(employee=self.user)
+        self.assertEqual(str(attendance.actual_checkin_time), '09:05:00')
+        self.assertEqual(str(attendance.actual_checkout_time), '17:30:00')
+        self.assertEqual(float(attendance.working_hours), 8.42)
+
+        # Replaying an earlier punch moves the check-in and keeps the checkout
+        report = ingest_punches([{'employee': 'emp', 'timestamp': '2025-05-01T08:55:00', 'device': 'gate-3'}])
+        attendance.refresh_from_db()
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(str(attendance.actual_checkin_time), '08:55:00')
+        self.assertEqual(str(attendance.actual_checkout_time), '17:30:00')
+
+    def test_import_applies_the_first_approved_request_like_the_punch_view(self):
+        for approved_time in (time(10, 0), time(11, 0)):
+            Request.objects.create(employee=self.user, type=RequestType.LATE_ARRIVAL_REQUEST, date=date(2025, 5, 1),
+                                   time=approved_time, reason='Traffic', status=RequestStatus.APPROVED)
+
+        ingest_punches([{'employee': 'emp', 'timestamp': '2025-05-01T10:30:00', 'device': 'gate-1'}])
+
+        self.assertEqual(Attendance.objects.get(employee=self.user).checkin_time, time(10, 0))
+
+    def test_day_recorded_by_a_concurrent_punch_is_merged(self):
+        existing_attendance = punches._existing_attendance
+
+        def concurrent_checkin(employee_ids, dates):
+            # The row for the day is written right after the import looked for it
+            found = existing_attendance(employee_ids, dates)
+            if not Attendance.objects.filter(employee=self.user).exists():
+                Attendance.objects.create(employee=self.user, date=date(2025, 5, 1), actual_checkin_time=time(9, 0),
+                                          checkin_time=time(9, 0), checkin_devices='web')
+            return found
+
+        rows = [
+            {'employee': 'emp', 'timestamp': '2025-05-01T17:30:00', 'device': 'gate-1'},
+            {'employee': 'emp', 'timestamp': '2025-05-01T12:00:00', 'device': 'gate-1', 'lat': 'inf', 'lon': '85.3'},
+        ]
+        with mock.patch.object(punches, '_existing_attendance', side_effect=concurrent_checkin):
+            report = ingest_punches(rows)
+
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        self.assertEqual(report['merged'], [{'employee_id': self.user.id, 'date': '2025-05-01'}])
+        self.assertEqual(report['rejected'], [{'row': 2, 'reason': "Invalid location."}])
+        attendance = Attendance.objects.get(employee=self.user)
+        self.assertEqual(str(attendance.actual_checkin_time), '09:00:00')
+        self.assertEqual(str(attendance.actual_checkout_time), '17:30:00')
+
+
+class AttendanceExportTest(TestCase):
+    def test_register_streams_rows_with_nepali_dates(self):
+        user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        Attendance.objects.create(employee=user, date=date(2025, 4, 14), checkin_time=time(9, 0))
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('attendance:export'), {'start_date': '2025-04-01', 'end_date': '2025-04-30'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('emp,Emp Loyee,2025-04-14,2082-01-01,,09:00:00'))
+
+    def test_range_outside_the_bs_calendar_is_rejected_before_streaming(self):
+        user = AuthUser.objects.create_user(username='emp', email='emp@example.com', password='pass')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('attendance:export'), {'start_date': '1900-01-01', 'end_date': '2025-04-30'},
+                                   follow=True)
+
+        self.assertRedirects(response, reverse('attendance:request_list'))
+        self.assertContains(response, "Invalid date range.")
+
+    def test_malformed_employee_is_rejected_before_streaming(self):
+        user = AuthUser.objects.create_user(username='emp', email='emp@example.com', password='pass')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('attendance:export'), {'employee': 'abc'}, follow=True)
+        self.assertRedirects(response, reverse('attendance:request_list'))
+        self.assertContains(response, "Invalid employee.")
+
+
+class MonthlySummaryTest(TestCase):
+    def test_incremental_summary_matches_rebuild(self):
+        user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        self.client.force_login(user)
+        self.client.post(reverse('attendance:checkin'))
+        self.client.post(reverse('attendance:checkout'))
+
+        summary = MonthlyAttendanceSummary.objects.get(employee=user)
+        incremental = [getattr(summary, field) for field in SUMMARY_FIELDS]
+        self.assertEqual(summary.present_days, 1)
+        self.assertEqual(summary.missed_checkouts, 0)
+
+        rebuild_monthly_summaries(summary.year, summary.month)
+        summary = MonthlyAttendanceSummary.objects.get(employee=user)
+        self.assertEqual([getattr(summary, field) for field in SUMMARY_FIELDS], incremental)
+
+
+class AttendanceRegisterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+
+    def test_grid_marks_present_leave_and_absent(self):
+        leave_type = LeaveType.objects.create(name='Sick', number_of_days=12)
+        # Baisakh 2082 starts on 2025-04-14
+        Attendance.objects.create(employee=self.user, date=date(2025, 4, 14), checkin_time=time(9, 0))
+        Leave.objects.create(employee=self.user, leave_type=leave_type, start_date='2082-01-03',
+                             end_date='2082-01-04', status='Approved')
+
+        register = build_register(2082, 1)
+
+        self.assertEqual(register['rows'][0]['cells'][:5], ['P', 'A', 'LV', 'LV', 'A'])
+
+    def test_attendance_on_approved_leave_is_found_in_sql(self):
+        leave_type = LeaveType.objects.create(name='Sick', number_of_days=12)
+        Leave.objects.create(employee=self.user, leave_type=leave_type, start_date='2082-01-03',
+                             end_date='2082-01-04', status='Approved')
+        Leave.objects.create(employee=self.user, leave_type=leave_type, start_date='2082-01-06',
+                             end_date='2082-01-06', status='Declined')
+        for day in (14, 16, 19):
+            Attendance.objects.create(employee=self.user, date=date(2025, 4, day), checkin_time=time(9, 0))
+
+        with self.assertNumQueries(1):
+            dates = list(attendance_on_leave(date(2025, 4, 14), date(2025, 4, 30)).values_list('date', flat=True))
+        self.assertEqual(dates, [date(2025, 4, 16)])
+
+    def test_rendered_grid_is_invalidated_by_a_punch(self):
+        with CaptureQueriesContext(connection) as queries:
+            render_register(2082, 1)
+        self.assertEqual(len(app_queries(queries)), 4)
+        # A hit is a single read of the shared cache
+        with self.assertNumQueries(1):
+            render_register(2082, 1)
+
+        Attendance.objects.create(employee=self.user, date=date(2025, 4, 14), checkin_time=time(9, 0))
+        with CaptureQueriesContext(connection) as queries:
+            render_register(2082, 1)
+        self.assertEqual(len(app_queries(queries)), 4)
+
+    def test_register_page_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('attendance:register'), {'year': 2082, 'month': 1})
+        self.assertContains(response, 'Emp Loyee')
+
+        # Years the BS calendar does not cover fall back to the current month
+        today = nepali_datetime.date.today()
+        for year in (1, 99999):
+            response = self.client.get(reverse('attendance:register'), {'year': year, 'month': 1})
+            self.assertEqual((response.context['year'], response.context['month']), (today.year, today.month))
+
+
+class GeofenceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Geofence.objects.create(name='Head Office', center={'type': 'Point', 'coordinates': [85.3240, 27.7172]}, radius=200)
+        Geofence.objects.create(name='Branch', shape=GeofenceShape.POLYGON, area={'type': 'Polygon', 'coordinates': [
+            [[85.30, 27.60], [85.31, 27.60], [85.31, 27.61], [85.30, 27.61], [85.30, 27.60]],
+        ]})
+
+    def tearDown(self):
+        # Fences vanish with the test transaction without firing signals
+        invalidate_geofences()
+
+    def test_index_locates_circle_and_polygon_fences(self):
+        self.assertFalse(is_outside_fence('27.7175', '85.3242'))
+        self.assertFalse(is_outside_fence(27.605, 85.305))
+        self.assertTrue(is_outside_fence(27.72, 85.33))
+        self.assertTrue(is_outside_fence(None, None))
+        self.assertTrue(is_outside_fence('inf', '85.3242'))
+        self.assertTrue(is_outside_fence('nan', 'nan'))
+        self.assertTrue(is_outside_fence(27.7175, 1e308))
+
+    def test_lookups_skip_the_database_until_fences_change(self):
+        is_outside_fence(27.7172, 85.3240)
+        with self.assertNumQueries(0):
+            is_outside_fence(27.7172, 85.3240)
+
+        Geofence.objects.filter(name='Head Office').get().delete()
+        self.assertTrue(is_outside_fence(27.7172, 85.3240))
+
+    @override_settings(ATTENDANCE_GEOFENCE_MODE='reject')
+    def test_reject_mode_blocks_out_of_fence_checkin(self):
+        user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        self.client.force_login(user)
+        self.client.post(reverse('attendance:checkin'), {'checkinlat': '27.8', 'checkinlon': '85.4'})
+        self.assertFalse(Attendance.objects.exists())
+
+
+class BulkRequestStatusTest(TestCase):
+    def test_bulk_approval_updates_all_attendance_rows_at_once(self):
+        users = [
+            AuthUser.objects.create_user(
+                username=f'emp{i}', email=f'emp{i}@example.com', password='pass',
+                first_name='Emp', last_name=str(i),
+            )
+            for i in range(3)
+        ]
+        day = date(2025, 5, 1)
+        reqs = []
+        for user in users:
+            Attendance.objects.create(employee=user, date=day, checkin_time=time(9, 0), actual_checkin_time=time(9, 0))
+            reqs.append(Request.objects.create(employee=user, type=RequestType.MISSED_CHECKOUT, date=day,
+                                               time=time(17, 0), reason='Forgot'))
+        self.client.force_login(users[0])
+
+        response = self.client.post(reverse('attendance:request_list'), {
+            'status': RequestStatus.APPROVED, 'request_ids': [req.id for req in reqs],
+        })
+
+        self.assertRedirects(response, reverse('attendance:request_list'))
+        self.assertEqual(Request.objects.filter(status=RequestStatus.APPROVED).count(), 3)
+        self.assertEqual(
+            list(Attendance.objects.values_list('checkout_time', 'working_hours').distinct()),
+            [(time(17, 0), Decimal('8.00'))],
+        )
+        self.assertEqual(list(MonthlyAttendanceSummary.objects.values_list('working_hours', flat=True)), [Decimal('8.00')] * 3)
+
+    def test_malformed_or_oversized_selection_is_a_bad_request(self):
+        user = AuthUser.objects.create_user(username='emp', email='emp@example.com', password='pass')
+        self.client.force_login(user)
+
+        for request_ids in (['1', 'x'], list(range(1, 502))):
+            response = self.client.post(reverse('attendance:request_list'), {
+                'status': RequestStatus.APPROVED, 'request_ids': request_ids,
+            })
+            self.assertEqual(response.status_code, 400)
+
+
+class RequestListTest(TestCase):
+    def setUp(self):
+        self.user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        self.reqs = [
+            Request.objects.create(employee=self.user, type=RequestType.MISSED_CHECKOUT, date=date(2025, 5, day),
+                                   time=time(17, 0), reason='Forgot',
+                                   status=RequestStatus.APPROVED if day % 2 else RequestStatus.PENDING)
+            for day in range(1, 26)
+        ]
+        self.client.force_login(self.user)
+
+    def test_keyset_pages_walk_forward_and_back(self):
+        first = self.client.get(reverse('attendance:request_list'))
+        self.assertEqual([req.id for req in first.context['requests']], [req.id for req in self.reqs[:4:-1]])
+        self.assertTrue(first.context['has_next'])
+
+        second = self.client.get(reverse('attendance:request_list'), {'after': first.context['next_cursor']})
+        self.assertEqual([req.id for req in second.context['requests']], [req.id for req in self.reqs[4::-1]])
+        self.assertFalse(second.context['has_next'])
+
+        back = self.client.get(reverse('attendance:request_list'), {'before': second.context['previous_cursor']})
+        self.assertEqual(back.context['requests'], first.context['requests'])
+
+    def test_filters_and_status_counts(self):
+        response = self.client.get(reverse('attendance:request_list'), {'status': 'pending', 'end_date': '2025-05-10'})
+
+        self.assertEqual(len(response.context['requests']), 5)
+        counts = {key: count for key, _, count in response.context['status_counts']}
+        self.assertEqual((counts['pending'], counts['approved']), (5, 5))
+
+
+class AsyncPunchTest(TestCase):
+    async def test_async_checkin_status_and_checkout(self):
+        user = await AuthUser.objects.acreate(
+            username='emp', email='emp@example.com', first_name='Emp', last_name='Loyee',
+        )
+        await self.async_client.aforce_login(user)
+
+        response = await self.async_client.get(reverse('attendance:status'))
+        self.assertEqual(response.json()['status'], 'CheckIn')
+
+        await self.async_client.post(reverse('attendance:checkin_async'), {'checkinlat': '27.7', 'checkinlon': '85.3', 'idempotency_key': 'a1b2c3d4e5f6'})
+        response = await self.async_client.get(reverse('attendance:status'))
+        self.assertEqual(response.json()['status'], 'CheckOut')
+
+        await self.async_client.post(reverse('attendance:checkout_async'))
+        attendance = await Attendance.objects.aget(employee=user)
+        self.assertIsNotNone(attendance.actual_checkout_time)
+        self.assertEqual(await MonthlyAttendanceSummary.objects.filter(employee=user, present_days=1).acount(), 1)
+
+    async def test_anonymous_requests_are_sent_to_login_without_a_thread_hop(self):
+        response = await self.async_client.get(reverse('attendance:status'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('attendance:status')}",
+                             fetch_redirect_response=False)
+
+        # Only the device endpoint itself skips the login check, not any path containing "/api/"
+        response = await self.async_client.get('/employee/api/anything/')
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.post(reverse('attendance:punch_import'), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+class MissedCheckoutTest(TestCase):
+    def test_open_rows_are_closed_at_shift_end_with_a_pending_request(self):
+        shift = Shift.objects.create(title='Day', start_time=time(9, 0), end_time=time(17, 0))
+        user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        WorkingDetail.objects.create(employee=user, shift=shift)
+        Attendance.objects.create(employee=user, date=date(2025, 5, 1), checkin_time=time(9, 30), actual_checkin_time=time(9, 30))
+        Attendance.objects.create(employee=user, date=date(2025, 5, 2), checkin_time=time(9, 0), checkout_time=time(17, 0))
+
+        self.assertEqual(close_missed_checkouts(date(2025, 5, 3)), 1)
+        self.assertEqual(close_missed_checkouts(date(2025, 5, 3)), 0)
+
+        attendance = Attendance.objects.get(date=date(2025, 5, 1))
+        self.assertEqual((attendance.checkout_time, attendance.working_hours, attendance.auto_closed),
+                         (time(17, 0), Decimal('7.50'), True))
+        request = Request.objects.get(employee=user)
+        self.assertEqual((request.type, request.status, request.time),
+                         (RequestType.MISSED_CHECKOUT, RequestStatus.PENDING, time(17, 0)))
+        self.assertEqual(MonthlyAttendanceSummary.objects.get(employee=user).working_hours, Decimal('7.50'))
+
+
+class AttendancePartitionTest(TestCase):
+    def setUp(self):
+        self.user = AuthUser.objects.create_user(username='emp', email='emp@example.com', password='pass')
+
+    def test_updates_name_the_stored_date(self):
+        Attendance.objects.create(employee=self.user, date=date(2025, 5, 1), checkin_time=time(9, 0))
+        attendance = Attendance.objects.get(employee=self.user)
+        attendance.checkout_time = time(17, 0)
+        with CaptureQueriesContext(connection) as queries:
+            attendance.save(update_fields=['checkout_time'])
+        update, = [query['sql'] for query in app_queries(queries) if query['sql'].startswith('UPDATE')]
+        self.assertIn('"date" = ', update)
+
+    @skipUnless(connection.vendor == 'postgresql', "Partitioning is PostgreSQL only")
+    def test_partitioned_table_keeps_constraints_and_detached_months_release_employees(self):
+        self.assertTrue(is_partitioned())
+        Attendance.objects.create(employee=self.user, date=date(2021, 7, 18), checkin_time=time(9, 0))
+        create_partition(2078, 4)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(employee=self.user, date=date(2021, 7, 18))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(employee_id=self.user.id + 1000, date=date(2021, 7, 18))
+            connection.check_constraints()
+
+        detach_partition(2078, 4)
+        self.assertFalse(Attendance.objects.exists())
+        self.user.delete()
+
+
+class AttendanceArchiveTest(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(ATTENDANCE_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_closed_fiscal_year_is_archived_and_still_readable(self):
+        user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        FiscalYear.objects.create(fiscal_year='2078/79', start_date='2078-04-01', end_date='2079-03-32')
+        FiscalYear.objects.create(fiscal_year='2079/80', start_date='2079-04-01', end_date='2080-03-31')
+        # Shrawan 2078 starts on 2021-07-17
+        Attendance.objects.create(employee=user, date=date(2021, 7, 18), checkin_time=time(9, 0),
+                                  checkin_location={'type': 'Point', 'coordinates': [85.3, 27.7]})
+        Request.objects.create(employee=user, type=RequestType.MISSED_CHECKOUT, date=date(2021, 7, 18),
+                               time=time(17, 0), reason='Forgot')
+
+        closed, = archivable_fiscal_years(keep=1)
+        self.assertEqual(closed.fiscal_year, '2078/79')
+        archive_fiscal_year(closed)
+
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(Request.objects.exists())
+        self.assertEqual(list(AttendanceArchive.objects.values_list('kind', 'year', 'month', 'row_count')),
+                         [('attendance', 2078, 4, 1), ('request', 2078, 4, 1)])
+
+        self.client.force_login(user)
+        response = self.client.get(reverse('attendance:history'), {'year': 2078, 'month': 4})
+        self.assertTrue(response.context['archived'])
+        attendance, = response.context['attendances']
+        self.assertEqual((attendance.date, attendance.checkin_time), (date(2021, 7, 18), time(9, 0)))
+        self.assertEqual(attendance.checkin_location['coordinates'], [85.3, 27.7])
+
+        today = nepali_datetime.date.today()
+        response = self.client.get(reverse('attendance:history'), {'year': 99999, 'month': 4})
+        self.assertEqual((response.context['year'], response.context['month']), (today.year, today.month))
+
+    def test_rows_reaching_an_archived_month_are_shown_and_archived_later(self):
+        user = AuthUser.objects.create_user(username='emp', email='emp@example.com', password='pass')
+        Attendance.objects.create(employee=user, date=date(2021, 7, 18), checkin_time=time(9, 0))
+        archive_month(2078, 4)
+        MonthlyAttendanceSummary.objects.create(employee=user, year=2078, month=4, present_days=1)
+
+        # An import after the month was archived
+        Attendance.objects.create(employee=user, date=date(2021, 7, 19), checkin_time=time(9, 30))
+        attendances, archived = attendance_for_month(user.id, 2078, 4)
+        self.assertTrue(archived)
+        self.assertEqual([attendance.date for attendance in attendances], [date(2021, 7, 18), date(2021, 7, 19)])
+
+        # Rebuilt from the archive file and the live row together
+        self.assertEqual(rebuild_monthly_summaries(2078, 4), 1)
+        self.assertEqual(MonthlyAttendanceSummary.objects.get(employee=user, year=2078, month=4).present_days, 2)
+
+        archive_month(2078, 4)
+        self.assertFalse(Attendance.objects.exists())
+        archive = AttendanceArchive.objects.get(kind='attendance')
+        self.assertEqual(archive.row_count, 2)
+        self.assertEqual(len(attendance_for_month(user.id, 2078, 4)[0]), 2)
+        self.assertEqual(MonthlyAttendanceSummary.objects.get(employee=user, year=2078, month=4).present_days, 2)
+
+    def test_failed_write_keeps_the_old_file_and_the_rows(self):
+        user = AuthUser.objects.create_user(username='emp', email='emp@example.com', password='pass')
+        Attendance.objects.create(employee=user, date=date(2021, 7, 18), checkin_time=time(9, 0))
+        archive, = archive_month(2078, 4)
+        archive_file = os.path.join(settings.ATTENDANCE_ARCHIVE_DIR, archive.path)
+        with open(archive_file, 'rb') as file:
+            archived = file.read()
+
+        Attendance.objects.create(employee=user, date=date(2021, 7, 19), checkin_time=time(9, 30))
+        with mock.patch('attendance.archive.os.fsync', side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                archive_month(2078, 4)
+
+        with open(archive_file, 'rb') as file:
+            self.assertEqual(file.read(), archived)
+        self.assertEqual(os.listdir(os.path.dirname(archive_file)), [os.path.basename(archive_file)])
+        self.assertEqual(Attendance.objects.count(), 1)
+
+        # Rows go with one DELETE, not one per row
+        with CaptureQueriesContext(connection) as queries:
+            archive_month(2078, 4)
+        deletes = [query for query in app_queries(queries) if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(AttendanceArchive.objects.get(kind='attendance').row_count, 2)
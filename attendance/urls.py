@@ -1,11 +1,18 @@
 from django.urls import include, path
-from .views import AttendanceRequestDeleteView, checkin_view, checkout_view, AttendanceRequestListView, AttendanceRequestCreateView, AttendanceRequestEditView, RequestUpdateStatusView
+from .views import AttendanceRequestDeleteView, checkin_view, checkout_view, checkin_async_view, checkout_async_view, attendance_status_view, AttendanceRequestListView, AttendanceRequestCreateView, AttendanceRequestEditView, RequestUpdateStatusView, punch_import_view, attendance_export_view, attendance_register_view, attendance_history_view
 
 app_name = 'attendance'
 
 urlpatterns = [
     path("checkin/", checkin_view, name="checkin"),
     path("checkout/", checkout_view, name="checkout"),
+    path("async/checkin/", checkin_async_view, name="checkin_async"),
+    path("async/checkout/", checkout_async_view, name="checkout_async"),
+    path("async/status/", attendance_status_view, name="status"),
+    path("api/punches/", punch_import_view, name="punch_import"),
+    path("export/", attendance_export_view, name="export"),
+    path("register/", attendance_register_view, name="register"),
+    path("history/", attendance_history_view, name="history"),
 
     path('request/list/', AttendanceRequestListView.as_view(), name='request_list'),
     path('request/create/', AttendanceRequestCreateView.as_view(), name='request_create'),
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+
+from .models import Request, RequestStatus
+
+
+def attendance_status(attendance):
+    """Dashboard button state for today's Attendance row (or None)."""
+    if attendance is None:
+        return "CheckIn"
+    if attendance.checkin_time and not attendance.checkout_time:
+        return "CheckOut"
+    elif attendance.checkout_time:
+        return "Already CheckedOut"
+
+
+def punch_window_error(status, shift, now_time):
+    # Shift min start / max end bound when the next punch may be made
+    if shift is None:
+        return None
+    if status == 'CheckIn' and shift.min_start_time and now_time < shift.min_start_time:
+        return "Check-in time is outside of the allowed range."
+    if status == 'CheckOut' and shift.max_end_time and shift.max_end_time < now_time:
+        return "Check-out time is outside of the allowed range."
+    return None
+
+
+def approved_requests(**filters):
+    """
+    Approved requests, earliest first. When a day has several, the first one
+    is applied, by the punch views and the punch import alike.
+    """
+    return Request.objects.filter(status=RequestStatus.APPROVED, **filters).order_by('id')
+
+
+def resolve_checkin_time(actual_time, approved_time=None, shift=None):
+    # Approved late arrival request replaces the punch, shift start is the floor
+    checkin_time = approved_time or actual_time
+    if shift and checkin_time < shift.start_time:
+        checkin_time = shift.start_time
+    return checkin_time
+
+
+def resolve_checkout_time(actual_time, approved_time=None, shift=None):
+    # Approved early departure request replaces the punch, shift end is the ceiling
+    checkout_time = approved_time or actual_time
+    if shift and checkout_time > shift.end_time:
+        checkout_time = shift.end_time
+    return checkout_time
+
+
+def point_location(lat, lon):
+    """GeoJSON point for a lat/lon pair; raises ValueError/TypeError on bad input."""
+    lat, lon = float(lat), float(lon)
+    # Also rejects NaN and infinity, which JSON columns cannot store
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Coordinates {lat}, {lon} are out of range.")
+    return {
+        'type': 'Point',
+        'coordinates': [round(lon, 6), round(lat, 6)]
+    }
+
+
+def calculate_working_hours(checkin_time, checkout_time):
+    if checkin_time and checkout_time:
+        start = datetime.combine(date.today(), checkin_time)
+        end = datetime.combine(date.today(), checkout_time)
+        return (end - start).total_seconds() / 3600
+    return 0
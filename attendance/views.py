@@ -1,73 +1,105 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404, redirect
 from datetime import date,datetime
+from urllib.parse import urlencode
+import nepali_datetime
 from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView
 from django.views.generic.edit import DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin 
+from django.conf import settings
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from jobs.queue import enqueue
+from user.models import AuthUser, WorkingDetail
+from utils.date_converter import get_last_day_of_month
 from .models import Request, RequestStatus, RequestType, Attendance
 from .forms import RequestForm
+from .archive import attendance_for_month
+from .exports import attendance_register_rows, stream_csv
+from .geofence import is_outside_fence
+from .idempotency import PENDING, claim_key, idempotency_key, idempotent_punch, release_key, save_outcome
+from .punches import ingest_punches, parse_punches
+from .register import invalidate_register, render_register
+from .summary import apply_summary_delta, apply_summary_deltas, attendance_contribution
+from .utils import (
+    approved_requests, attendance_status, calculate_working_hours, point_location, punch_window_error,
+    resolve_checkin_time, resolve_checkout_time,
+)
 
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils import timezone
 
+@idempotent_punch
 def checkin_view(request):
     # today = timezone.localdate()
     today=timezone.now()
 
-    if request.user.attendance.filter(date=today).exists():
-        messages.info(request, "You have already checked in today.")
-        return redirect(reverse_lazy('dashboard'))
-
     lat = request.POST.get('checkinlat')
     lon = request.POST.get('checkinlon')
 
+    outside_fence = is_outside_fence(lat, lon)
+    if outside_fence and settings.ATTENDANCE_GEOFENCE_MODE == 'reject':
+        messages.error(request, "Check-in is only allowed from an office location.")
+        return redirect(reverse_lazy('dashboard'))
+
+    # Work out the final row in memory so it is written with a single insert
     now = timezone.now()
-    attendance = Attendance.objects.create(employee=request.user)
+    attendance = Attendance(employee=request.user, date=today.date())
     attendance.actual_checkin_time = now.time()
-    attendance.checkin_time = now.time()
 
-    # Apply late arrival request time if approved
-    approved_late_request = Request.objects.filter(
+    # Apply late arrival request time if approved and respect shift start time
+    approved_late_request = approved_requests(
         employee=request.user,
         date=today,
         type=RequestType.LATE_ARRIVAL_REQUEST,
-        status=RequestStatus.APPROVED
     ).first()
-    if approved_late_request:
-        attendance.checkin_time = approved_late_request.time
-
-    # Respect shift start time if earlier than check-in
-    employee_shift = getattr(request.user.profile, 'shift', None)
-    if employee_shift and attendance.checkin_time < employee_shift.start_time:
-        attendance.checkin_time = employee_shift.start_time
+    attendance.checkin_time = resolve_checkin_time(
+        now.time(),
+        approved_late_request.time if approved_late_request else None,
+        request.user.employee_shift,
+    )
 
     # Set location if available and valid
     try:
         if lat and lon:
-            attendance.checkin_location = {
-                'type': 'Point',
-                'coordinates': [round(float(lon), 6), round(float(lat), 6)]
-            }
+            attendance.checkin_location = point_location(lat, lon)
     except (ValueError, TypeError):
         messages.warning(request, "Invalid location data received.")
 
-    attendance.save()
+    attendance.checkin_outside_fence = outside_fence
+
+    # The (employee, date) unique constraint rejects a second punch, so a
+    # concurrent double tap cannot create a duplicate row
+    try:
+        with transaction.atomic():
+            attendance.save(force_insert=True)
+    except IntegrityError:
+        messages.info(request, "You have already checked in today.")
+        return redirect(reverse_lazy('dashboard'))
+
+    request.user.set_todays_attendance(attendance)
+    apply_summary_delta(request.user.id, attendance.date, {}, attendance_contribution(attendance, request.user.employee_shift))
 
     messages.success(request, "Check-In Successful")
     return redirect(reverse_lazy('dashboard'))
 
 
+@idempotent_punch
 def checkout_view(request):
     # today = timezone.localdate()
     today=timezone.now()
-    attendance = request.user.attendance.filter(date=today).first()
+    attendance = request.user.todays_attendance()
 
     if not attendance:
         messages.error(request, "No check-in record found for today.")
@@ -76,24 +108,26 @@ def checkout_view(request):
     lat = request.POST.get('checkoutlat')
     lon = request.POST.get('checkoutlon')
 
+    outside_fence = is_outside_fence(lat, lon)
+    if outside_fence and settings.ATTENDANCE_GEOFENCE_MODE == 'reject':
+        messages.error(request, "Check-out is only allowed from an office location.")
+        return redirect(reverse_lazy('dashboard'))
+
+    summary_before = attendance_contribution(attendance, request.user.employee_shift)
     now = timezone.now()
     attendance.actual_checkout_time = now.time()
-    attendance.checkout_time = now.time()
 
-    # Apply approved early departure request
-    approved_request = Request.objects.filter(
+    # Apply approved early departure request and clamp to shift end time
+    approved_request = approved_requests(
         employee=request.user,
         date=today,
         type=RequestType.EARLY_DEPARTURE_REQUEST,
-        status=RequestStatus.APPROVED
     ).first()
-    if approved_request:
-        attendance.checkout_time = approved_request.time
-
-    # Clamp checkout time to shift end time
-    employee_shift = getattr(request.user.profile, 'shift', None)
-    if employee_shift and attendance.checkout_time > employee_shift.end_time:
-        attendance.checkout_time = employee_shift.end_time
+    attendance.checkout_time = resolve_checkout_time(
+        now.time(),
+        approved_request.time if approved_request else None,
+        request.user.employee_shift,
+    )
 
     # Calculate working hours
     if attendance.checkin_time and attendance.checkout_time:
@@ -102,31 +136,350 @@ def checkout_view(request):
     # Record checkout location if valid
     try:
         if lat and lon:
-            attendance.checkout_location = {
-                'type': 'Point',
-                'coordinates': [round(float(lon), 6), round(float(lat), 6)]
-            }
+            attendance.checkout_location = point_location(lat, lon)
     except (ValueError, TypeError):
         messages.warning(request, "Invalid location data received.")
 
+    attendance.checkout_outside_fence = outside_fence
+
     attendance.save()
+    apply_summary_delta(request.user.id, attendance.date, summary_before, attendance_contribution(attendance, request.user.employee_shift))
+
+    messages.success(request, "Checkout Successful")
+    return redirect(reverse_lazy('dashboard'))
+
+# Async punch endpoints, for ASGI deployments (see gaaubesi_hrms/asgi.py).
+# They mirror checkin_view/checkout_view on the async ORM so a worker is not
+# tied up while the queries run.
+@idempotent_punch
+async def checkin_async_view(request):
+    user = await request.auser()
+    today = timezone.now()
+
+    lat = request.POST.get('checkinlat')
+    lon = request.POST.get('checkinlon')
+
+    outside_fence = await sync_to_async(is_outside_fence)(lat, lon)
+    if outside_fence and settings.ATTENDANCE_GEOFENCE_MODE == 'reject':
+        messages.error(request, "Check-in is only allowed from an office location.")
+        return redirect(reverse_lazy('dashboard'))
+
+    now = timezone.now()
+    attendance = Attendance(employee=user, date=today.date(), actual_checkin_time=now.time())
+
+    approved_late_request = await approved_requests(
+        employee=user,
+        date=today,
+        type=RequestType.LATE_ARRIVAL_REQUEST,
+    ).afirst()
+    employee_shift = await user.aget_employee_shift()
+    attendance.checkin_time = resolve_checkin_time(
+        now.time(),
+        approved_late_request.time if approved_late_request else None,
+        employee_shift,
+    )
+
+    try:
+        if lat and lon:
+            attendance.checkin_location = point_location(lat, lon)
+    except (ValueError, TypeError):
+        messages.warning(request, "Invalid location data received.")
+
+    attendance.checkin_outside_fence = outside_fence
+
+    try:
+        await attendance.asave(force_insert=True)
+    except IntegrityError:
+        messages.info(request, "You have already checked in today.")
+        return redirect(reverse_lazy('dashboard'))
+
+    await sync_to_async(apply_summary_delta)(user.id, attendance.date, {}, attendance_contribution(attendance, employee_shift))
+
+    messages.success(request, "Check-In Successful")
+    return redirect(reverse_lazy('dashboard'))
+
+
+@idempotent_punch
+async def checkout_async_view(request):
+    user = await request.auser()
+    today = timezone.now()
+    attendance = await user.atodays_attendance()
+
+    if not attendance:
+        messages.error(request, "No check-in record found for today.")
+        return redirect(reverse_lazy('dashboard'))
+
+    lat = request.POST.get('checkoutlat')
+    lon = request.POST.get('checkoutlon')
+
+    outside_fence = await sync_to_async(is_outside_fence)(lat, lon)
+    if outside_fence and settings.ATTENDANCE_GEOFENCE_MODE == 'reject':
+        messages.error(request, "Check-out is only allowed from an office location.")
+        return redirect(reverse_lazy('dashboard'))
+
+    employee_shift = await user.aget_employee_shift()
+    summary_before = attendance_contribution(attendance, employee_shift)
+    now = timezone.now()
+    attendance.actual_checkout_time = now.time()
+
+    approved_request = await approved_requests(
+        employee=user,
+        date=today,
+        type=RequestType.EARLY_DEPARTURE_REQUEST,
+    ).afirst()
+    attendance.checkout_time = resolve_checkout_time(
+        now.time(),
+        approved_request.time if approved_request else None,
+        employee_shift,
+    )
+    if attendance.checkin_time and attendance.checkout_time:
+        attendance.working_hours = calculate_working_hours(attendance.checkin_time, attendance.checkout_time)
+
+    try:
+        if lat and lon:
+            attendance.checkout_location = point_location(lat, lon)
+    except (ValueError, TypeError):
+        messages.warning(request, "Invalid location data received.")
+
+    attendance.checkout_outside_fence = outside_fence
+
+    await attendance.asave()
+    await sync_to_async(apply_summary_delta)(user.id, attendance.date, summary_before, attendance_contribution(attendance, employee_shift))
 
     messages.success(request, "Checkout Successful")
     return redirect(reverse_lazy('dashboard'))
 
+
+async def attendance_status_view(request):
+    # Lightweight dashboard state for polling clients
+    user = await request.auser()
+    status = attendance_status(await user.atodays_attendance())
+    window_error = punch_window_error(status, await user.aget_employee_shift(), timezone.now().time())
+    return JsonResponse({'status': status, 'can_punch': window_error is None, 'message': window_error})
+
+def attendance_register_view(request):
+    today = nepali_datetime.date.today()
+    try:
+        year = int(request.GET.get('year') or today.year)
+        month = int(request.GET.get('month') or today.month)
+    except ValueError:
+        year, month = today.year, today.month
+    if not 1 <= month <= 12:
+        month = today.month
+    if not nepali_datetime.MINYEAR <= year <= nepali_datetime.MAXYEAR:
+        year, month = today.year, today.month
+
+    context = {
+        'register_table': render_register(year, month),
+        'year': year,
+        'month': month,
+        'months': [(number, nepali_datetime.date(year, number, 1).strftime('%B')) for number in range(1, 13)],
+    }
+    return render(request, 'attendance/register.html', context)
+
+def attendance_history_view(request):
+    # Archived months are read back from their csv.gz file
+    today = nepali_datetime.date.today()
+    try:
+        year = int(request.GET.get('year') or today.year)
+        month = int(request.GET.get('month') or today.month)
+    except ValueError:
+        year, month = today.year, today.month
+    if not 1 <= month <= 12:
+        month = today.month
+    if not nepali_datetime.MINYEAR <= year <= nepali_datetime.MAXYEAR:
+        year, month = today.year, today.month
+
+    employee = request.user
+    if request.GET.get('employee'):
+        employee = get_object_or_404(AuthUser, pk=request.GET['employee'])
+    attendances, archived = attendance_for_month(employee.id, year, month)
+
+    context = {
+        'attendances': attendances,
+        'archived': archived,
+        'employee': employee,
+        'year': year,
+        'month': month,
+        'months': [(number, nepali_datetime.date(year, number, 1).strftime('%B')) for number in range(1, 13)],
+    }
+    return render(request, 'attendance/history.html', context)
+
+@csrf_exempt
+@require_POST
+def punch_import_view(request):
+    # Devices authenticate with a shared token instead of a session
+    token = settings.ATTENDANCE_DEVICE_TOKEN
+    if not token or not constant_time_compare(request.headers.get('X-Device-Token', ''), token):
+        return JsonResponse({'error': "Invalid device token."}, status=403)
+
+    upload = request.FILES.get('file')
+    content = upload.read() if upload else request.body
+    is_csv = 'csv' in request.content_type or (upload and upload.name.lower().endswith('.csv'))
+
+    try:
+        rows = parse_punches(content, format='csv' if is_csv else 'json')
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': "Could not parse punch batch."}, status=400)
+
+    # Offline-queued batches may be flushed more than once
+    key = idempotency_key(request)
+    if key:
+        outcome = claim_key('punch_import', key)
+        if outcome == PENDING:
+            return JsonResponse({'error': "A batch with this key is still being imported."}, status=409)
+        if outcome is not None:
+            return JsonResponse(outcome['json'])
+
+    try:
+        report = ingest_punches(rows)
+    except BaseException:
+        if key:
+            release_key('punch_import', key)
+        raise
+    if key:
+        save_outcome('punch_import', key, {'json': report})
+    return JsonResponse(report)
+
+def attendance_export_view(request):
+    # Defaults to the current Nepali month
+    today = nepali_datetime.date.today()
+    first_date, last_date, _, _ = get_last_day_of_month(today.month, today.year)
+    try:
+        start_date = date.fromisoformat(request.GET.get('start_date') or first_date.to_datetime_date().isoformat())
+        end_date = date.fromisoformat(request.GET.get('end_date') or last_date.to_datetime_date().isoformat())
+        # Every day is converted to BS while streaming, so the range has to lie inside the BS calendar
+        if not (nepali_datetime.date.min.to_datetime_date() <= start_date <= end_date
+                <= nepali_datetime.date.max.to_datetime_date()):
+            raise ValueError
+    except ValueError:
+        messages.error(request, "Invalid date range.")
+        return redirect('attendance:request_list')
+
+    employee_id = request.GET.get('employee') or None
+    if employee_id is not None:
+        # Checked here, since an error once streaming has begun would cut the file short
+        try:
+            employee_id = int(employee_id)
+        except ValueError:
+            messages.error(request, "Invalid employee.")
+            return redirect('attendance:request_list')
+
+    if request.GET.get('background'):
+        enqueue('attendance.export', created_by=request.user, start_date=start_date.isoformat(),
+                end_date=end_date.isoformat(), employee_id=employee_id)
+        messages.info(request, "Export has been queued; download it from Background Jobs when it finishes.")
+        return redirect('jobs:list')
+
+    rows = attendance_register_rows(start_date, end_date, employee_id=employee_id)
+    response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="attendance_{start_date}_{end_date}.csv"'
+    return response
+
 # Attendance Request
 class AttendanceRequestListView(ListView):
     model = Request  
     template_name = 'attendance/request/request_list.html'
     context_object_name = 'requests'
 
+    page_size = 20
+    # Most requests one bulk status update may touch
+    max_selection = 500
+    filter_keys = ('status', 'type', 'employee', 'start_date', 'end_date')
+
+    def get_filters(self):
+        return {key: self.request.GET.get(key, '').strip() for key in self.filter_keys}
+
+    def filter_queryset(self, queryset, include_status=True):
+        filters = self.get_filters()
+        if include_status and filters['status']:
+            queryset = queryset.filter(status=filters['status'])
+        if filters['type']:
+            queryset = queryset.filter(type=filters['type'])
+        if filters['employee'].isdigit():
+            queryset = queryset.filter(employee_id=filters['employee'])
+        for key, lookup in (('start_date', 'date__gte'), ('end_date', 'date__lte')):
+            try:
+                queryset = queryset.filter(**{lookup: date.fromisoformat(filters[key])})
+            except ValueError:
+                pass
+        return queryset
+
     def get_queryset(self):
-        return Request.objects.select_related('employee').all().order_by('-id')
-    
+        # Keyset pagination on id: "after" walks to older requests, "before" back to newer ones
+        queryset = self.filter_queryset(Request.objects.select_related('employee'))
+        after = self.request.GET.get('after', '')
+        before = self.request.GET.get('before', '')
+
+        if before.isdigit():
+            page = list(queryset.filter(id__gt=before).order_by('id')[:self.page_size + 1])
+            self.has_previous = len(page) > self.page_size
+            self.has_next = True
+            return page[:self.page_size][::-1]
+
+        if after.isdigit():
+            queryset = queryset.filter(id__lt=after)
+        page = list(queryset.order_by('-id')[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.has_previous = after.isdigit()
+        return page[:self.page_size]
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['request_status_choices'] = RequestStatus.choices
+        page = context['requests']
+
+        # Counts for every status in one conditional aggregation
+        counts = self.filter_queryset(Request.objects.all(), include_status=False).aggregate(
+            **{status: Count('id', filter=Q(status=status)) for status in RequestStatus.values}
+        )
+        filters = self.get_filters()
+
+        context.update({
+            'request_status_choices': RequestStatus.choices,
+            'request_type_choices': RequestType.choices,
+            'status_counts': [(value, label, counts[value]) for value, label in RequestStatus.choices],
+            'employees': AuthUser.objects.filter(is_active=True).order_by('first_name', 'last_name'),
+            'filters': filters,
+            'querystring': urlencode({key: value for key, value in filters.items() if value}),
+            'has_next': self.has_next,
+            'has_previous': self.has_previous,
+            'next_cursor': page[-1].id if page else None,
+            'previous_cursor': page[0].id if page else None,
+        })
         return context
+
+    def post(self, request, *args, **kwargs):
+        # Bulk status update of the selected open requests
+        new_status = request.POST.get('status')
+        try:
+            request_ids = {int(request_id) for request_id in request.POST.getlist('request_ids')}
+        except ValueError:
+            return HttpResponseBadRequest("Invalid request selection.")
+        if len(request_ids) > self.max_selection:
+            return HttpResponseBadRequest(f"At most {self.max_selection} requests can be updated at once.")
+
+        if new_status not in RequestStatus.values:
+            messages.error(request, 'Invalid status selected.')
+            return redirect('attendance:request_list')
+        if not request_ids:
+            messages.error(request, 'No requests selected.')
+            return redirect('attendance:request_list')
+
+        with transaction.atomic():
+            reqs = list(Request.objects.select_for_update().filter(
+                id__in=request_ids,
+                status__in=[RequestStatus.PENDING, RequestStatus.FORWARDED],
+            ))
+            Request.objects.filter(id__in=[req.id for req in reqs]).update(status=new_status, updated_on=timezone.now())
+            if new_status == RequestStatus.APPROVED:
+                update_attendance_for_requests(reqs)
+
+        if reqs:
+            days = [req.date for req in reqs]
+            invalidate_register(min(days), max(days))
+
+        messages.success(request, f'{len(reqs)} request(s) updated to {RequestStatus(new_status).label}.')
+        return redirect('attendance:request_list')
     
 
 class AttendanceRequestCreateView(LoginRequiredMixin, CreateView):
@@ -194,33 +547,72 @@ class RequestUpdateStatusView(View):
 
 
 def update_attendance_for_request(req):
-    attendance = Attendance.objects.filter(employee=req.employee, date=req.date).first()
-    if not attendance:
-        return
-
-    updated = False
-
-    if req.type == RequestType.LATE_ARRIVAL_REQUEST and attendance.checkin_time:
-        attendance.checkin_time = req.time
-        updated = True
+    update_attendance_for_requests([req])
+
+
+def update_attendance_for_requests(reqs):
+    """
+    Apply approved requests to their Attendance rows. The rows and shifts are
+    fetched with one query each and the changes saved with a single bulk_update.
+    """
+    if not reqs:
+        return 0
+
+    employee_ids = {req.employee_id for req in reqs}
+    attendances = {
+        (attendance.employee_id, attendance.date): attendance
+        for attendance in Attendance.objects.filter(employee_id__in=employee_ids, date__in={req.date for req in reqs})
+    }
+    if not attendances:
+        return 0
+    shifts = {
+        working_detail.employee_id: working_detail.shift
+        for working_detail in WorkingDetail.objects.filter(employee_id__in=employee_ids).select_related('shift')
+    }
+
+    summary_before, changed = {}, {}
+    for req in sorted(reqs, key=lambda req: req.id):
+        key = (req.employee_id, req.date)
+        attendance = attendances.get(key)
+        if not attendance:
+            continue
+
+        before = attendance_contribution(attendance, shifts.get(req.employee_id))
+        updated = False
+
+        if req.type == RequestType.LATE_ARRIVAL_REQUEST and attendance.checkin_time:
+            attendance.checkin_time = req.time
+            updated = True
+
+        elif req.type == RequestType.EARLY_DEPARTURE_REQUEST and attendance.checkout_time:
+            attendance.checkout_time = req.time
+            updated = True
+
+        elif req.type == RequestType.MISSED_CHECKOUT:
+            attendance.checkout_time = req.time
+            attendance.auto_closed = False
+            updated = True
+
+        if updated and attendance.checkin_time and attendance.checkout_time:
+            attendance.working_hours = calculate_working_hours(attendance.checkin_time, attendance.checkout_time)
+
+        if updated:
+            summary_before.setdefault(key, before)
+            changed[key] = attendance
+
+    if not changed:
+        return 0
 
-    elif req.type == RequestType.EARLY_DEPARTURE_REQUEST and attendance.checkout_time:
-        attendance.checkout_time = req.time
-        updated = True
-
-    elif req.type == RequestType.MISSED_CHECKOUT:
-        attendance.checkout_time = req.time
-        updated = True
-
-    if updated and attendance.checkin_time and attendance.checkout_time:
-        attendance.working_hours = calculate_working_hours(attendance.checkin_time, attendance.checkout_time)
-
-    if updated:
-        attendance.save()
-
-def calculate_working_hours(checkin_time, checkout_time):
-    if checkin_time and checkout_time:
-        start = datetime.combine(date.today(), checkin_time)
-        end = datetime.combine(date.today(), checkout_time)
-        return (end - start).total_seconds() / 3600
-    return 0
\ No newline at end of file
+    now = timezone.now()
+    for attendance in changed.values():
+        attendance.updated_on = now
+    Attendance.objects.bulk_update(changed.values(), ['checkin_time', 'checkout_time', 'working_hours', 'auto_closed', 'updated_on'])
+
+    apply_summary_deltas([
+        (employee_id, day, summary_before[(employee_id, day)], attendance_contribution(attendance, shifts.get(employee_id)))
+        for (employee_id, day), attendance in changed.items()
+    ])
+    # bulk_update sends no signals
+    days = [day for _, day in changed]
+    invalidate_register(min(days), max(days))
+    return len(changed)
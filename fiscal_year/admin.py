@@ -1,3 +1,35 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+
+from .models import FiscalYear, Holiday
+from .resolver import current_fiscal_year
 
 # Register your models here.
+@admin.register(FiscalYear)
+class FiscalYearAdmin(admin.ModelAdmin):
+    list_display = ('fiscal_year', 'start_date', 'end_date', 'status', 'is_current')
+    actions = ['roll_over_leave']
+
+    @admin.action(description="Roll leave over from the current fiscal year into the selected one")
+    def roll_over_leave(self, request, queryset):
+        from leave.rollover import RolloverError, rollover_fiscal_year
+
+        if queryset.count() != 1:
+            self.message_user(request, "Select exactly one fiscal year to roll over into.", messages.ERROR)
+            return
+        current = current_fiscal_year()
+        if current is None:
+            self.message_user(request, "No fiscal year is marked current.", messages.ERROR)
+            return
+        try:
+            report = rollover_fiscal_year(current, queryset.get(), created_by=request.user)
+        except RolloverError as error:
+            self.message_user(request, str(error), messages.ERROR)
+            return
+        summary = ', '.join(f"{key.replace('_', ' ')}: {value}" for key, value in report.items())
+        self.message_user(request, f"Rolled {current} over. {summary}", messages.SUCCESS)
+
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('name', 'date', 'is_half_day', 'fiscal_year')
+    list_filter = ('fiscal_year', 'is_half_day')
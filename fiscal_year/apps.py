@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FiscalYearConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fiscal_year'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,70 @@
+import random
+import time
+from datetime import timedelta
+
+import nepali_datetime
+from django.core.management.base import BaseCommand
+
+from utils import bs_calendar
+
+
+class Command(BaseCommand):
+    help = "Compare BS/AD conversions through nepali_datetime with the precomputed calendar table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dates', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        first = nepali_datetime.date(bs_calendar.MIN_YEAR, 1, 1).to_datetime_date()
+        span = bs_calendar.MAX_ORDINAL - bs_calendar.MIN_ORDINAL
+        ad_dates = [first + timedelta(days=rng.randrange(span)) for _ in range(options['dates'])]
+        bs_dates = [bs_calendar.ad_to_bs(ad_date) for ad_date in ad_dates]
+        bs_strings = [f'{year}-{month:02d}-{day:02d}' for year, month, day in bs_dates]
+        months = [(year, month) for year, month, _ in bs_dates if (year, month) < (bs_calendar.MAX_YEAR, 12)]
+
+        def library_month_length(year, month):
+            # What get_last_day_of_month used to do
+            following = nepali_datetime.date(year + month // 12, month % 12 + 1, 1)
+            return (following - timedelta(days=1)).day
+
+        for label, library, table, inputs in [
+            ("BS -> AD", lambda value: nepali_datetime.date(*value).to_datetime_date(),
+             lambda value: bs_calendar.bs_to_ad(*value), bs_dates),
+            ("AD -> BS", nepali_datetime.date.from_datetime_date, bs_calendar.ad_to_nepali, ad_dates),
+            ("BS string -> AD", lambda value: nepali_datetime.date(*map(int, value.split('-'))).to_datetime_date(),
+             bs_calendar.parse_bs, bs_strings),
+            ("Month length", lambda value: library_month_length(*value),
+             lambda value: bs_calendar.month_length(*value), months),
+        ]:
+            library_time = self.time(library, inputs)
+            table_time = self.time(table, inputs)
+            self.stdout.write(
+                f"{label}: nepali_datetime {library_time:.3f}s, table {table_time:.3f}s "
+                f"({library_time / table_time:.1f}x) for {len(inputs)} dates"
+            )
+
+        # Report-style batches: every date converted to a BS string, as an export does
+        for label, one_by_one, batch, inputs in [
+            ("AD -> BS strings (batch)", lambda values: [
+                nepali_datetime.date.from_datetime_date(value).strftime('%Y-%m-%d') for value in values
+            ], bs_calendar.ad_to_bs_strings, ad_dates),
+            ("AD -> BS columns (batch)", lambda values: [
+                nepali_datetime.date.from_datetime_date(value) for value in values
+            ], bs_calendar.ad_to_bs_many, ad_dates),
+            ("BS strings -> AD (batch)", lambda values: [
+                nepali_datetime.date(*map(int, value.split('-'))).to_datetime_date() for value in values
+            ], bs_calendar.parse_bs_many, bs_strings),
+        ]:
+            library_time = self.time(one_by_one, [inputs])
+            batch_time = self.time(batch, [inputs])
+            self.stdout.write(
+                f"{label}: nepali_datetime {library_time:.3f}s, table {batch_time:.3f}s "
+                f"({library_time / batch_time:.1f}x) for {len(inputs)} dates"
+            )
+
+    def time(self, convert, inputs):
+        started = time.perf_counter()
+        for value in inputs:
+            convert(value)
+        return time.perf_counter() - started
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:19
+
+import django.db.models.deletion
+import nepali_datetime_field.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fiscal_year', '0003_remove_fiscalyear_is_active_fiscalyear_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('date', nepali_datetime_field.models.NepaliDateField()),
+                ('is_half_day', models.BooleanField(default=False, verbose_name='Half Day?')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='fiscal_year.fiscalyear')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fiscal_year', 'date'), name='unique_holiday_fiscal_year_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fiscal_year', '0004_holiday'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fiscalyear',
+            index=models.Index(fields=['start_date', 'end_date'], name='fiscal_year_period_idx'),
+        ),
+    ]
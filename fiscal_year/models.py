@@ -10,7 +10,28 @@ class FiscalYear(models.Model):
     is_current = models.BooleanField(default=False, choices=YesNoList)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True) 
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='fiscal_year_period_idx'),
+        ]
 
     def __str__(self):
         return self.fiscal_year
+
+
+class Holiday(models.Model):
+    fiscal_year = models.ForeignKey(FiscalYear, on_delete=models.CASCADE, related_name='holidays')
+    name = models.CharField(max_length=100)
+    date = NepaliDateField()
+    is_half_day = models.BooleanField(default=False, verbose_name="Half Day?")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fiscal_year', 'date'], name='unique_holiday_fiscal_year_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.date})"
@@ -0,0 +1,70 @@
+from bisect import bisect_right
+
+from utils.process_cache import ProcessIndex
+from .models import FiscalYear
+
+VERSION_KEY = 'fiscal_year_index_version'
+
+
+def _ad(day):
+    # Accept nepali_datetime dates as well as AD ones
+    return day.to_datetime_date() if hasattr(day, 'to_datetime_date') else day
+
+
+class FiscalYearIndex:
+    """Fiscal years as sorted AD intervals; a date is resolved with a binary search."""
+
+    def __init__(self, fiscal_years):
+        self.fiscal_years = sorted(fiscal_years, key=lambda fiscal_year: _ad(fiscal_year.start_date))
+        self.starts = [_ad(fiscal_year.start_date) for fiscal_year in self.fiscal_years]
+        self.ends = [_ad(fiscal_year.end_date) for fiscal_year in self.fiscal_years]
+        self.current = next((fiscal_year for fiscal_year in self.fiscal_years if fiscal_year.is_current), None)
+
+    @classmethod
+    def from_db(cls):
+        return cls(FiscalYear.objects.all())
+
+    def resolve(self, day):
+        day = _ad(day)
+        position = bisect_right(self.starts, day) - 1
+        if position >= 0 and day <= self.ends[position]:
+            return self.fiscal_years[position]
+        return None
+
+    def between(self, start, end):
+        """Fiscal years overlapping the inclusive AD range, in order."""
+        start, end = _ad(start), _ad(end)
+        last = bisect_right(self.starts, end)
+        return [
+            fiscal_year for position, fiscal_year in enumerate(self.fiscal_years[:last])
+            if self.ends[position] >= start
+        ]
+
+
+_index = ProcessIndex(VERSION_KEY, FiscalYearIndex.from_db)
+
+
+def get_fiscal_year_index():
+    """
+    Process-wide index, rebuilt only when the fiscal year version moves, so
+    resolving a fiscal year normally costs no query.
+    """
+    return _index.get()
+
+
+def invalidate_fiscal_years():
+    _index.invalidate()
+
+
+def fiscal_year_for(day):
+    """The FiscalYear containing an AD or BS date, or None."""
+    return get_fiscal_year_index().resolve(day)
+
+
+def current_fiscal_year():
+    return get_fiscal_year_index().current
+
+
+def current_fiscal_year_id():
+    current = current_fiscal_year()
+    return current.pk if current else None
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FiscalYear, Holiday
+from .resolver import invalidate_fiscal_years
+from .working_days import invalidate_working_calendar
+
+
+@receiver([post_save, post_delete], sender=Holiday)
+def invalidate_calendar_for_holiday(sender, instance, **kwargs):
+    invalidate_working_calendar(instance.fiscal_year_id)
+
+
+@receiver([post_save, post_delete], sender=FiscalYear)
+def invalidate_calendar_for_fiscal_year(sender, instance, **kwargs):
+    invalidate_working_calendar(instance.pk)
+    invalidate_fiscal_years()
@@ -1,3 +1,106 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+import nepali_datetime
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from fiscal_year.models import FiscalYear, Holiday
+from fiscal_year.resolver import VERSION_KEY, current_fiscal_year, fiscal_year_for
+from fiscal_year.working_days import leave_days, working_day_flags, working_days
+from leave.models import LeaveType
+from utils import bs_calendar
+from utils.date_converter import finding_fiscal_date, nepali_str_to_english
+
+
+def ad(nepali_date):
+    return nepali_str_to_english(nepali_date)
+
+
+@override_settings(WEEKLY_OFF_DAYS=[5])
+class WorkingDaysTest(TestCase):
+    def setUp(self):
+        self.fiscal_year = FiscalYear.objects.create(fiscal_year='2081/82', start_date='2081-04-01', end_date='2082-03-31')
+        # 2081-05-01 is a Saturday
+        Holiday.objects.create(fiscal_year=self.fiscal_year, name='Festival', date='2081-05-03')
+        Holiday.objects.create(fiscal_year=self.fiscal_year, name='Half Holiday', date='2081-05-05', is_half_day=True)
+
+    def test_weekly_days_off_and_holidays_are_not_counted(self):
+        self.assertEqual(working_day_flags(ad('2081-05-01'), ad('2081-05-05')), [False, True, False, True, True])
+        self.assertEqual(working_days(ad('2081-05-01'), ad('2081-05-08')), 4.5)
+        # Spills into the previous fiscal year, where only Saturdays are off
+        self.assertEqual(working_days(ad('2081-03-25'), ad('2081-04-01')), 7)
+
+    def test_sandwich_rule_and_half_days(self):
+        plain = LeaveType(name='Casual', number_of_days=12)
+        sandwich = LeaveType(name='Annual', number_of_days=12, sandwich_rule_status=True)
+
+        self.assertEqual(leave_days(plain, ad('2081-04-31'), ad('2081-05-04')), 4)
+        self.assertEqual(leave_days(sandwich, ad('2081-04-31'), ad('2081-05-04')), 6)
+        # Days off at the edges of a leave are not sandwiched
+        self.assertEqual(leave_days(sandwich, ad('2081-05-01'), ad('2081-05-03')), 1)
+        self.assertEqual(leave_days(sandwich, ad('2081-05-03'), ad('2081-05-03')), 0)
+        self.assertEqual(leave_days(plain, ad('2081-05-02'), ad('2081-05-02'), is_half_day=True), 0.5)
+
+    def test_calendar_is_recompiled_when_holidays_change(self):
+        self.assertEqual(working_days(ad('2081-05-06'), ad('2081-05-06')), 1)
+        Holiday.objects.create(fiscal_year=self.fiscal_year, name='Declared', date='2081-05-06')
+        self.assertEqual(working_days(ad('2081-05-06'), ad('2081-05-06')), 0)
+
+
+class BSCalendarTest(SimpleTestCase):
+    def test_table_agrees_with_nepali_datetime(self):
+        day = nepali_datetime.date(2079, 1, 1)
+        while day.year < 2083:
+            ad_date = day.to_datetime_date()
+            self.assertEqual(bs_calendar.bs_to_ad(day.year, day.month, day.day), ad_date)
+            self.assertEqual(bs_calendar.ad_to_bs(ad_date), (day.year, day.month, day.day))
+            day += timedelta(days=1)
+
+    def test_month_lengths_and_fiscal_year_bounds(self):
+        self.assertEqual(bs_calendar.month_length(2081, 4), 32)
+        self.assertEqual(bs_calendar.month_bounds(2081, 4), (date(2024, 7, 16), date(2024, 8, 16)))
+        self.assertEqual(bs_calendar.fiscal_year_bounds(2081), (date(2024, 7, 16), date(2025, 7, 16)))
+        self.assertEqual(bs_calendar.fiscal_year_of(date(2025, 7, 16)), 2081)
+        self.assertEqual(bs_calendar.fiscal_year_of(date(2025, 7, 17)), 2082)
+        with self.assertRaises(ValueError):
+            bs_calendar.bs_to_ad(2081, 4, 33)
+        with self.assertRaises(ValueError):
+            bs_calendar.ad_to_bs(date(1900, 1, 1))
+
+    def test_batch_conversions(self):
+        ad_dates = [date(2024, 7, 16), date(2024, 8, 16), date(2024, 7, 16), date(2025, 4, 14)]
+        self.assertEqual(bs_calendar.ad_to_bs_strings(ad_dates), ['2081-04-01', '2081-04-32', '2081-04-01', '2082-01-01'])
+        years, months, days = bs_calendar.ad_to_bs_many(ad_dates)
+        self.assertEqual((list(years), list(months), list(days)),
+                         ([2081, 2081, 2081, 2082], [4, 4, 4, 1], [1, 32, 1, 1]))
+        self.assertEqual(bs_calendar.parse_bs_many(['2081-04-32', '2082-01-01']), [date(2024, 8, 16), date(2025, 4, 14)])
+
+
+class FiscalYearResolverTest(TestCase):
+    def setUp(self):
+        FiscalYear.objects.create(fiscal_year='2080/81', start_date='2080-04-01', end_date='2081-03-31')
+        FiscalYear.objects.create(fiscal_year='2081/82', start_date='2081-04-01', end_date='2082-03-31', is_current=True)
+
+    def test_dates_resolve_without_queries_until_a_fiscal_year_changes(self):
+        self.assertEqual(current_fiscal_year().fiscal_year, '2081/82')
+        with self.assertNumQueries(0):
+            self.assertEqual(fiscal_year_for(ad('2081-03-31')).fiscal_year, '2080/81')
+            self.assertEqual(fiscal_year_for(nepali_datetime.date(2081, 4, 1)).fiscal_year, '2081/82')
+            self.assertIsNone(fiscal_year_for(ad('2082-04-01')))
+
+        FiscalYear.objects.create(fiscal_year='2082/83', start_date='2082-04-01', end_date='2083-03-32')
+        self.assertEqual(fiscal_year_for(ad('2082-04-01')).fiscal_year, '2082/83')
+        self.assertEqual(finding_fiscal_date(2082, 2), {
+            'start_year': 2081, 'start_month': 4, 'start_day': 1, 'end_year': 2082, 'end_month': 3, 'end_day': 31,
+        })
+
+    def test_a_version_bump_from_another_worker_rebuilds_the_index(self):
+        current_fiscal_year()
+        # What invalidate_fiscal_years in another process leaves in the shared cache
+        cache.set(VERSION_KEY, 'bumped elsewhere', None)
+        FiscalYear.objects.filter(is_current=True).update(is_current=False)
+        # Seen at the next version check, not on every lookup
+        with self.assertNumQueries(0):
+            self.assertEqual(current_fiscal_year().fiscal_year, '2081/82')
+        with self.settings(CACHE_VERSION_CHECK_INTERVAL=0):
+            self.assertIsNone(current_fiscal_year())
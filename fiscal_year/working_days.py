@@ -0,0 +1,172 @@
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Holiday
+from .resolver import get_fiscal_year_index
+
+# Day weights are counted in half days so half-day holidays stay integers
+FULL_DAY, HALF_DAY, OFF_DAY = 2, 1, 0
+
+
+def working_calendar_cache_key(fiscal_year_id):
+    return f'working_calendar:{fiscal_year_id}'
+
+
+def invalidate_working_calendar(fiscal_year_id):
+    cache.delete(working_calendar_cache_key(fiscal_year_id))
+
+
+class WorkingCalendar:
+    """
+    A fiscal year compiled to one weight per day with prefix sums, so the
+    working days of any range inside it are a subtraction, and with the
+    nearest working day on either side of every day for the sandwich rule.
+    Dates are AD.
+    """
+
+    def __init__(self, start, end, holidays, off_days):
+        self.start, self.end = start, end
+        size = (end - start).days + 1
+        weights = bytearray(
+            OFF_DAY if (start + timedelta(days=offset)).weekday() in off_days else FULL_DAY
+            for offset in range(size)
+        )
+        for day, is_half_day in holidays:
+            if start <= day <= end:
+                offset = (day - start).days
+                weights[offset] = min(weights[offset], HALF_DAY if is_half_day else OFF_DAY)
+        self.weights = bytes(weights)
+        self.prefix = list(accumulate(self.weights, initial=0))
+
+        # next_working[i] / previous_working[i]: offset of the first working day at or after / at or before i
+        self.next_working, upcoming = [None] * size, None
+        for offset in range(size - 1, -1, -1):
+            if self.weights[offset]:
+                upcoming = offset
+            self.next_working[offset] = upcoming
+        self.previous_working, latest = [None] * size, None
+        for offset in range(size):
+            if self.weights[offset]:
+                latest = offset
+            self.previous_working[offset] = latest
+
+    def working_days(self, start, end):
+        first, last = (max(start, self.start) - self.start).days, (min(end, self.end) - self.start).days
+        if last < first:
+            return 0
+        return (self.prefix[last + 1] - self.prefix[first]) / FULL_DAY
+
+    def is_working_day(self, day):
+        return bool(self.weights[(day - self.start).days])
+
+    def first_working_day(self, start, end):
+        offset = self.next_working[(max(start, self.start) - self.start).days]
+        day = None if offset is None else self.start + timedelta(days=offset)
+        return day if day is not None and day <= end else None
+
+    def last_working_day(self, start, end):
+        offset = self.previous_working[(min(end, self.end) - self.start).days]
+        day = None if offset is None else self.start + timedelta(days=offset)
+        return day if day is not None and day >= start else None
+
+
+class WeeklyCalendar:
+    """Weekly days off only, for dates outside every fiscal year."""
+
+    def __init__(self, start, end, off_days):
+        self.start, self.end, self.off_days = start, end, off_days
+
+    def working_days(self, start, end):
+        days = (end - start).days + 1
+        full_weeks, remainder = divmod(days, 7)
+        off = full_weeks * len(self.off_days)
+        off += sum(1 for offset in range(remainder) if (start + timedelta(days=offset)).weekday() in self.off_days)
+        return days - off
+
+    def is_working_day(self, day):
+        return day.weekday() not in self.off_days
+
+    def first_working_day(self, start, end):
+        day = start
+        while day <= end and not self.is_working_day(day):
+            day += timedelta(days=1)
+        return day if day <= end else None
+
+    def last_working_day(self, start, end):
+        day = end
+        while day >= start and not self.is_working_day(day):
+            day -= timedelta(days=1)
+        return day if day >= start else None
+
+
+def compile_working_calendar(fiscal_year_id, start, end):
+    """The fiscal year's compiled calendar, cached until its holidays or dates change."""
+    key = working_calendar_cache_key(fiscal_year_id)
+    calendar = cache.get(key)
+    if calendar is None or (calendar.start, calendar.end) != (start, end):
+        holidays = [
+            (day.to_datetime_date(), is_half_day)
+            for day, is_half_day in Holiday.objects.filter(fiscal_year_id=fiscal_year_id).values_list('date', 'is_half_day')
+        ]
+        calendar = WorkingCalendar(start, end, holidays, set(settings.WEEKLY_OFF_DAYS))
+        cache.set(key, calendar, None)
+    return calendar
+
+
+def _segments(start, end):
+    """(calendar, start, end) pieces covering the AD range, split at fiscal year boundaries."""
+    off_days = set(settings.WEEKLY_OFF_DAYS)
+    segments, day = [], start
+    for fiscal_year in get_fiscal_year_index().between(start, end):
+        fiscal_year_id = fiscal_year.pk
+        fiscal_year_start, fiscal_year_end = fiscal_year.start_date.to_datetime_date(), fiscal_year.end_date.to_datetime_date()
+        if day < fiscal_year_start:
+            gap_end = min(end, fiscal_year_start - timedelta(days=1))
+            segments.append((WeeklyCalendar(day, gap_end, off_days), day, gap_end))
+            day = gap_end + timedelta(days=1)
+        segment_end = min(end, fiscal_year_end)
+        if day <= segment_end:
+            segments.append((compile_working_calendar(fiscal_year_id, fiscal_year_start, fiscal_year_end), day, segment_end))
+            day = segment_end + timedelta(days=1)
+    if day <= end:
+        segments.append((WeeklyCalendar(day, end, off_days), day, end))
+    return segments
+
+
+def working_days(start, end):
+    """Working days in the inclusive AD range; half-day holidays count as 0.5."""
+    return sum(calendar.working_days(segment_start, segment_end) for calendar, segment_start, segment_end in _segments(start, end))
+
+
+def working_day_flags(start, end):
+    """Whether each day of the inclusive AD range is a working day, in order."""
+    flags = []
+    for calendar, segment_start, segment_end in _segments(start, end):
+        flags.extend(
+            calendar.is_working_day(segment_start + timedelta(days=offset))
+            for offset in range((segment_end - segment_start).days + 1)
+        )
+    return flags
+
+
+def leave_days(leave_type, start, end, is_half_day=False):
+    """
+    Days a leave request costs. Weekly days off and holidays are not counted
+    unless the leave type follows the sandwich rule, in which case those
+    falling between the first and last working day of the leave are.
+    """
+    if is_half_day:
+        return 0.5
+    if not leave_type.sandwich_rule_status:
+        return working_days(start, end)
+
+    first = last = None
+    for calendar, segment_start, segment_end in _segments(start, end):
+        first = first or calendar.first_working_day(segment_start, segment_end)
+        last = calendar.last_working_day(segment_start, segment_end) or last
+    if first is None:
+        return 0
+    return (last - first).days + 1
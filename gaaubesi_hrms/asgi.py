@@ -5,6 +5,30 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+ASGI deployment mode
+--------------------
+The punch endpoints have async twins (``attendance:checkin_async``,
+``attendance:checkout_async`` and the ``attendance:status`` JSON read) that use
+the async ORM. Every middleware in ``MIDDLEWARE`` is async capable, so these
+requests stay on the event loop end to end; the geofence test and the summary
+update still run through ``sync_to_async``. To run in this mode:
+
+    pip install uvicorn
+    ATTENDANCE_ASYNC_PUNCH=True uvicorn gaaubesi_hrms.asgi:application --workers 4
+
+``ATTENDANCE_ASYNC_PUNCH`` points the dashboard forms at the async endpoints;
+everything else keeps running as sync views in the ASGI thread pool. Keep
+``CONN_MAX_AGE`` at 0 (the default) under ASGI, or put pgbouncer in front of
+PostgreSQL, since each async request may use its own connection.
+Workers share the database cache (``CACHES`` in settings), so cache
+invalidation in one worker is seen by the others. The geofence index stays in
+each worker's memory and only checks the shared cache for a newer version every
+``CACHE_VERSION_CHECK_INTERVAL`` seconds, so punches make no cache round trip.
+``manage.py benchmark_punches`` compares punches per worker on both paths. With
+PostgreSQL on a local socket it measured 0.91-0.95x for the async path (about
+60-70 punches/s on either), so the gain is only expected where each query waits
+on network latency; measure against the production database before switching.
 """
 
 import os
@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -11,26 +12,39 @@ from django.conf import settings
 from django.contrib.auth import logout
 
 class RestrictUserMiddleware(object):
+    """
+    Sends anonymous users to the login page. Sync and async capable, so under
+    ASGI the async punch views are reached without a thread hop.
+    """
+    sync_capable = True
+    async_capable = True
     login_url = 'login'
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def is_public(self, request):
+        # Exact prefixes; the device punch import authenticates with its own token
+        public_paths = (reverse('login'), reverse('logout'), reverse('admin:index'), reverse('attendance:punch_import'))
+        return request.path.startswith(public_paths)
+
     def __call__(self, request):
-        # restricted url not request.path.find("/login") > -1 and not request.path.find("/change-password") > -1 and not request.path.find("/track-order") and not request.path.find("/api")
-        if request.path.find("/login") > -1 or request.path.find("/admin") > -1 or request.path.find("/logout") > -1:
-            response = self.get_response(request)
-            return response
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
 
-        if not request.user.is_authenticated:
-            # check for role admin or role
+        if not self.is_public(request) and not request.user.is_authenticated:
             return redirect_to_login(request.get_full_path(), reverse('login'), REDIRECT_FIELD_NAME)
-            # return redirect_to_login(request.get_full_path(), resolve_url(self.login_url), REDIRECT_FIELD_NAME)
 
         # if request.user.profile.role != 'Super-Admin':
         #     messages.error(request, 'You do not have permission to view this page')
         #     logout(request)
         #     return redirect(reverse('login'))
-        
-        response = self.get_response(request)
 
-        return response
\ No newline at end of file
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.is_public(request) and not (await request.auser()).is_authenticated:
+            return redirect_to_login(request.get_full_path(), reverse('login'), REDIRECT_FIELD_NAME)
+        return await self.get_response(request)
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'attendance',
     'leave',
     'fiscal_year',
+    'jobs',
     
 ]
 
@@ -152,5 +153,48 @@ LOGIN_URL = 'user/login'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'user.AuthUser'
 
+# One cache shared by every worker, so invalidating the attendance registers, leave
+# calendars and working calendars reaches all processes. The database cache table
+# is created by `manage.py migrate`.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='hrms_cache'),
+    }
+}
+
+# Seconds between checks of the shared cache for changes to the in-process geofence
+# and fiscal year indexes; changes made in another worker are seen within this time
+CACHE_VERSION_CHECK_INTERVAL = config('CACHE_VERSION_CHECK_INTERVAL', default=30, cast=int)
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# Shared secret biometric devices send as X-Device-Token when posting punches
+ATTENDANCE_DEVICE_TOKEN = config('ATTENDANCE_DEVICE_TOKEN', default='')
+
+# What to do with punches outside every office geofence: 'off', 'flag' or 'reject'
+ATTENDANCE_GEOFENCE_MODE = config('ATTENDANCE_GEOFENCE_MODE', default='flag')
+
+# Point the dashboard punch forms at the async endpoints (see gaaubesi_hrms/asgi.py)
+ATTENDANCE_ASYNC_PUNCH = config('ATTENDANCE_ASYNC_PUNCH', default=False, cast=bool)
+
+# Seconds a punch idempotency key is remembered; covers offline-queued punches
+ATTENDANCE_IDEMPOTENCY_TTL = config('ATTENDANCE_IDEMPOTENCY_TTL', default=86400, cast=int)
+
+# Checkout time (HH:MM) for auto-closing rows of employees without a shift; blank leaves them open
+ATTENDANCE_AUTO_CLOSE_TIME = config('ATTENDANCE_AUTO_CLOSE_TIME', default='')
+
+# Where archive_attendance writes closed fiscal years as per-month csv.gz files
+ATTENDANCE_ARCHIVE_DIR = config('ATTENDANCE_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive'))
+
+# Background jobs (see `manage.py run_jobs`): base retry delay and how long a
+# running job may go without finishing before it is assumed abandoned, in seconds
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=30, cast=int)
+JOBS_STALE_AFTER = config('JOBS_STALE_AFTER', default=3600, cast=int)
+
+# Files produced by background jobs, such as queued exports
+JOBS_OUTPUT_DIR = config('JOBS_OUTPUT_DIR', default=os.path.join(BASE_DIR, 'job_output'))
+
+# Weekly days off as Python weekday numbers (Monday is 0); Saturday by default
+WEEKLY_OFF_DAYS = config('WEEKLY_OFF_DAYS', default='5', cast=Csv(int))
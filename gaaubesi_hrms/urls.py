@@ -15,6 +15,7 @@ urlpatterns = [
     path("leave/", include("leave.urls")),
     path("attendance/", include("attendance.urls")),
     path("fiscal-year/", include("fiscal_year.urls")),
+    path("jobs/", include("jobs.urls")),
 
 ]
 
@@ -2,8 +2,11 @@ from django.contrib.auth.decorators import login_required
 from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 import os
+import uuid
 
-from django.urls import reverse_lazy
+from django.conf import settings
+from django.urls import reverse, reverse_lazy
+from attendance.utils import punch_window_error
 # from documents.models import ContractDocument, Document
 from .forms import UserLoginForm
 from django.contrib.auth import authenticate, login
@@ -20,29 +23,21 @@ from django.utils import timezone
 def dashboard(request):
     user = request.user
     type = user.attendance_status_button
-   
-    try:
-        employee_shift = user.profile.shift
-    except AttributeError:
-        employee_shift = None
-        # messages.warning(request, "No profile found for this user.")
+    employee_shift = user.employee_shift
 
     btn_status = 'show'
-    if employee_shift != None:
-        if type == 'CheckIn':
-            if employee_shift.min_start_time:
-                if timezone.now().time() < employee_shift.min_start_time:
-                    btn_status = 'hide'
-                    messages.error(request, "Check-in time is outside of the allowed range.")
-
-        elif type == 'CheckOut':
-            if employee_shift.max_end_time:
-                if employee_shift.max_end_time < timezone.now().time():
-                    btn_status = 'hide'
-                    messages.error(request, "Check-out time is outside of the allowed range.")
+    window_error = punch_window_error(type, employee_shift, timezone.now().time())
+    if window_error:
+        btn_status = 'hide'
+        messages.error(request, window_error)
 
+    async_punch = settings.ATTENDANCE_ASYNC_PUNCH
     context = {
         'btn_status': btn_status,
+        'checkin_url': reverse('attendance:checkin_async' if async_punch else 'attendance:checkin'),
+        'checkout_url': reverse('attendance:checkout_async' if async_punch else 'attendance:checkout'),
+        # A resubmitted form carries the same key, so the punch is replayed rather than redone
+        'punch_key': uuid.uuid4().hex,
     }
     return render(request, 'dashboard.html', context)
 
@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from .models import Job
+
+# Register your models here.
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'progress', 'attempts', 'created_by', 'created_on', 'finished_on')
+    list_filter = ('status', 'name')
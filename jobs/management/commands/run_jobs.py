@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.queue import claim_job, requeue_stale_jobs, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs. Several workers can run side by side; no broker is needed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when no job is due instead of polling")
+        parser.add_argument('--sleep', type=float, default=2, help="Seconds between polls of an empty queue")
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        self.stdout.write(f"Worker {worker} started.")
+        requeue_stale_jobs()
+        try:
+            while True:
+                job = claim_job(worker)
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    requeue_stale_jobs()
+                    continue
+
+                self.stdout.write(f"Running {job}")
+                if run_job(job):
+                    self.stdout.write(self.style.SUCCESS(f"Job #{job.pk} succeeded."))
+                else:
+                    self.stdout.write(self.style.ERROR(f"Job #{job.pk} failed (attempt {job.attempts} of {job.max_attempts})."))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Worker {worker} stopped.")
@@ -0,0 +1,95 @@
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+_tasks = {}
+
+
+def task(name):
+    """
+    Register a function as a background task. It is called as
+    ``func(job, **payload)`` and whatever it returns is stored as the result.
+    """
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def enqueue(name, created_by=None, max_attempts=3, **payload):
+    if name not in _tasks:
+        raise ValueError(f"Unknown task {name!r}")
+    return Job.objects.create(name=name, payload=payload, created_by=created_by, max_attempts=max_attempts)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def requeue_stale_jobs():
+    """Put back jobs whose worker died mid-run, going by how long they have been locked."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return Job.objects.filter(status=JobStatus.RUNNING, locked_at__lt=cutoff).update(
+        status=JobStatus.QUEUED, locked_by='', locked_at=None,
+    )
+
+
+def claim_job(worker):
+    """
+    Take the oldest due job. Workers skip rows another worker has locked, and
+    the status guard on the UPDATE keeps a job from being claimed twice where
+    row locks are unavailable.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=JobStatus.QUEUED, run_after__lte=now)
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=JobStatus.QUEUED).update(
+            status=JobStatus.RUNNING, locked_by=worker, locked_at=now,
+            started_on=now, attempts=F('attempts') + 1,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """Run a claimed job, then mark it succeeded, or queued again with backoff, or failed."""
+    try:
+        func = _tasks[job.name]
+        result = func(job, **job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            # Back off, doubling the delay with each attempt
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=JobStatus.QUEUED, error=error, locked_by='', locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=JobStatus.FAILED, error=error, locked_by='', locked_at=None, finished_on=timezone.now(),
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status=JobStatus.SUCCEEDED, result=result, progress=100, error='',
+        locked_by='', locked_at=None, finished_on=timezone.now(),
+    )
+    return True
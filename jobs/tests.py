@@ -0,0 +1,54 @@
+from django.test import TestCase, override_settings
+
+from jobs.models import Job, JobStatus
+from jobs.queue import claim_job, enqueue, run_job, task
+
+calls = []
+
+
+@task('tests.add')
+def add(job, a, b):
+    job.set_progress(50, "Adding")
+    return {'sum': a + b}
+
+
+@task('tests.flaky')
+def flaky(job):
+    calls.append(job.attempts)
+    raise RuntimeError("boom")
+
+
+class JobQueueTest(TestCase):
+    def test_claimed_job_runs_and_records_result(self):
+        job = enqueue('tests.add', a=2, b=3)
+
+        claimed = claim_job('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, JobStatus.RUNNING)
+        self.assertIsNone(claim_job('worker-2'))
+
+        self.assertTrue(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {'sum': 5})
+        self.assertEqual(job.progress, 100)
+
+    @override_settings(JOBS_RETRY_DELAY=0)
+    def test_failing_job_is_retried_until_attempts_run_out(self):
+        calls.clear()
+        job = enqueue('tests.flaky', max_attempts=2)
+
+        self.assertFalse(run_job(claim_job('worker-1')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+
+        self.assertFalse(run_job(claim_job('worker-1')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertIn('RuntimeError', job.error)
+        self.assertEqual(calls, [1, 2])
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+        self.assertFalse(Job.objects.exists())
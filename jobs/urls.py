@@ -0,0 +1,11 @@
+from django.urls import path
+from .views import JobListView, job_status_view, job_download_view
+
+app_name = 'jobs'
+
+
+urlpatterns = [
+    path('list/', JobListView.as_view(), name='list'),
+    path('<int:pk>/status/', job_status_view, name='status'),
+    path('<int:pk>/download/', job_download_view, name='download'),
+]
@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.generic import ListView
+
+from .models import Job, JobStatus
+
+
+class JobListView(ListView):
+    model = Job
+    template_name = 'jobs/list.html'
+    context_object_name = 'jobs'
+    paginate_by = 20
+
+    def get_queryset(self):
+        queryset = Job.objects.select_related('created_by').order_by('-id')
+        status = self.request.GET.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'status': self.request.GET.get('status', ''),
+            'job_status_choices': JobStatus.choices,
+            'has_active_jobs': any(job.status in (JobStatus.QUEUED, JobStatus.RUNNING) for job in context['jobs']),
+        })
+        return context
+
+
+def job_status_view(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'attempts': job.attempts,
+        'result': job.result,
+    })
+
+
+def job_download_view(request, pk):
+    # Tasks that produce a file return {'file': <path relative to JOBS_OUTPUT_DIR>}
+    job = get_object_or_404(Job, pk=pk, status=JobStatus.SUCCEEDED)
+    relative_path = (job.result or {}).get('file')
+    if not relative_path:
+        raise Http404("This job did not produce a file.")
+    path = os.path.join(settings.JOBS_OUTPUT_DIR, relative_path)
+    if not os.path.isfile(path):
+        raise Http404("The file is no longer available.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
@@ -1,3 +1,16 @@
 from django.contrib import admin
 
+from .models import LeaveTransaction
+
 # Register your models here.
+@admin.register(LeaveTransaction)
+class LeaveTransactionAdmin(admin.ModelAdmin):
+    list_display = ('employee_leave', 'kind', 'days', 'leave', 'created_by', 'created_on')
+    list_filter = ('kind',)
+    raw_id_fields = ('employee_leave', 'leave', 'created_by')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
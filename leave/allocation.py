@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from user.models import AuthUser
+from utils.common import point_down_round
+from utils.date_converter import ad_date
+from .ledger import open_ledgers
+from .models import EmployeeLeave, JobType, LeaveTransaction, LeaveTransactionType
+
+# Rows per INSERT when allocating to every employee at once
+BATCH_SIZE = 1000
+
+
+def eligible_employees(leave_type):
+    """
+    (employee id, AD joining date or None) of every active employee the leave
+    type applies to, read with one query. Joining dates are stored in AD, so
+    casting skips converting each one from BS in Python.
+    """
+    filters = {'is_active': True}
+    if leave_type.gender != 'A':
+        filters['profile__gender'] = leave_type.gender
+    if leave_type.marital_status != 'A':
+        filters['profile__marital_status'] = leave_type.marital_status
+    if leave_type.job_type != JobType.ALL:
+        filters['working_detail__job_type'] = leave_type.job_type
+
+    return AuthUser.objects.filter(**filters).annotate(
+        joined_on=ad_date('working_detail__joining_date')
+    ).values_list('id', 'joined_on')
+
+
+def prorated_leave(total_days, joined_on, fiscal_year_start, fiscal_year_end):
+    """Full entitlement for employees who joined before the fiscal year, otherwise pro rata per 30 days left."""
+    if joined_on <= fiscal_year_start:
+        return total_days
+    month_diff = (fiscal_year_end - joined_on).days // 30
+    if month_diff <= 0:
+        return None
+    return point_down_round(round(month_diff * (total_days / 12), 1))
+
+
+def allocate_leave_type(leave_type, update_existing=False):
+    """
+    Assign a leave type to every eligible employee with a fixed number of
+    queries: newly eligible employees are inserted in one batch, employees who no longer
+    qualify are deactivated with one UPDATE, and with ``update_existing`` the
+    remaining allocations are recomputed (leave taken is kept). Every change
+    to an entitlement is also written to the leave ledger.
+    """
+    fiscal_year = leave_type.fiscal_year
+    fiscal_year_start = fiscal_year.start_date.to_datetime_date()
+    fiscal_year_end = fiscal_year.end_date.to_datetime_date()
+
+    eligible, entitlements = set(), {}
+    for employee_id, joined_on in eligible_employees(leave_type):
+        eligible.add(employee_id)
+        if joined_on is None:
+            continue
+        total_leave = prorated_leave(leave_type.number_of_days, joined_on, fiscal_year_start, fiscal_year_end)
+        if total_leave is not None:
+            entitlements[employee_id] = total_leave
+
+    existing = {
+        employee_id: (employee_leave_id, total_leave)
+        for employee_id, employee_leave_id, total_leave in EmployeeLeave.objects.filter(
+            leave_type=leave_type, is_active=True,
+        ).values_list('employee_id', 'id', 'total_leave')
+    }
+
+    to_create = [
+        EmployeeLeave(employee_id=employee_id, leave_type_id=leave_type.id, total_leave=total_leave, leave_taken=0,
+                      leave_remaining=total_leave, created_by_id=leave_type.created_by_id,
+                      updated_by_id=leave_type.updated_by_id, is_active=True)
+        for employee_id, total_leave in entitlements.items()
+        if employee_id not in existing
+    ]
+
+    # Entitlements only take a handful of distinct values, so existing rows are
+    # updated with one UPDATE per value rather than per employee
+    to_update, adjustments = {}, []
+    if update_existing:
+        for employee_id, (employee_leave_id, current_total) in existing.items():
+            total_leave = entitlements.get(employee_id)
+            if total_leave is None or total_leave == current_total:
+                continue
+            to_update.setdefault(total_leave, []).append(employee_leave_id)
+            adjustments.append(LeaveTransaction(
+                employee_leave_id=employee_leave_id, kind=LeaveTransactionType.ALLOCATION, days=total_leave - current_total,
+                note="Entitlement recalculated", created_by_id=leave_type.updated_by_id,
+            ))
+
+    with transaction.atomic():
+        EmployeeLeave.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        if to_create:
+            open_ledgers([leave_type.id], leave_type.created_by_id)
+        LeaveTransaction.objects.bulk_create(adjustments, batch_size=BATCH_SIZE)
+        deactivated = EmployeeLeave.objects.filter(
+            leave_type=leave_type,
+            employee_id__in=[employee_id for employee_id in existing if employee_id not in eligible],
+            is_active=True,
+        ).update(is_active=False, updated_by_id=leave_type.updated_by_id, updated_on=timezone.now())
+        updated = 0
+        for total_leave, ids in to_update.items():
+            updated += EmployeeLeave.objects.filter(id__in=ids).update(
+                total_leave=total_leave,
+                leave_remaining=Greatest(Value(float(total_leave), output_field=FloatField()) - F('leave_taken'), Value(0.0)),
+                updated_by_id=leave_type.updated_by_id,
+                updated_on=timezone.now(),
+            )
+
+    return {'created': len(to_create), 'updated': updated, 'deactivated': deactivated}
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+
+from fiscal_year.working_days import working_day_flags
+from utils.bs_calendar import ad_to_bs, month_bounds
+from utils.date_converter import get_last_day_of_month
+from .models import Leave
+
+# Approved leaves and those still awaiting a decision
+CALENDAR_STATUSES = ('Applied', 'Verified', 'Approved')
+
+
+def calendar_cache_key(year, month):
+    return f'leave_calendar:{year}:{month}'
+
+
+def invalidate_calendar(start_date, end_date=None):
+    """Drop the cached calendar of every Nepali month touched by the AD date range."""
+    day, end_date, keys = start_date, end_date or start_date, []
+    while day <= end_date:
+        year, month, _ = ad_to_bs(day)
+        keys.append(calendar_cache_key(year, month))
+        day = month_bounds(year, month)[1] + timedelta(days=1)
+    cache.delete_many(keys)
+
+
+def build_calendar(year, month):
+    """
+    Who is off on each day of a Nepali month. Leaves overlapping the month are
+    read with one query and turned into start/end events; a single sweep over
+    the days keeps the set of leaves in progress, so nothing is looked up per
+    day.
+    """
+    first_date, last_date, last_day, _ = get_last_day_of_month(month, year)
+    start = first_date.to_datetime_date()
+
+    # starts[offset] holds the leaves beginning that day, ends[offset] those that finished the day before
+    starts = [[] for _ in range(last_day)]
+    ends = [[] for _ in range(last_day + 1)]
+    for leave_id, employee_id, first_name, middle_name, last_name, leave_type, status, leave_start, leave_end in (
+        Leave.objects.filter(status__in=CALENDAR_STATUSES, start_date__lte=last_date, end_date__gte=first_date)
+        .values_list('id', 'employee_id', 'employee__first_name', 'employee__middle_name', 'employee__last_name',
+                     'leave_type__name', 'status', 'start_date', 'end_date')
+    ):
+        entry = {
+            'employee_id': employee_id,
+            'name': ' '.join(part for part in (first_name, middle_name, last_name) if part),
+            'leave_type': leave_type,
+            'status': status,
+        }
+        first = max((leave_start.to_datetime_date() - start).days, 0)
+        last = min((leave_end.to_datetime_date() - start).days, last_day - 1)
+        starts[first].append((leave_id, entry))
+        ends[last + 1].append(leave_id)
+
+    working = working_day_flags(start, last_date.to_datetime_date())
+    days, active = [], {}
+    for offset in range(last_day):
+        for leave_id in ends[offset]:
+            del active[leave_id]
+        active.update(starts[offset])
+        employees = sorted(active.values(), key=lambda entry: entry['name'])
+        days.append({
+            'date': (first_date + timedelta(days=offset)).strftime('%Y-%m-%d'),
+            'working_day': working[offset],
+            'headcount': len({entry['employee_id'] for entry in employees}),
+            'employees': employees,
+        })
+
+    return {'year': year, 'month': month, 'days': days}
+
+
+def month_calendar(year, month):
+    """The month's calendar, cached until a leave or holiday touching it is saved or deleted."""
+    key = calendar_cache_key(year, month)
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = build_calendar(year, month)
+        cache.set(key, calendar, None)
+    return calendar
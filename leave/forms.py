@@ -2,8 +2,11 @@ from django import forms
 import datetime
 from datetime import timedelta
 from fiscal_year.models import FiscalYear
+from fiscal_year.resolver import current_fiscal_year_id
+from fiscal_year.working_days import leave_days
 from utils.date_converter import english_to_nepali, nepali_str_to_english
 from .models import EmployeeLeave, Leave, LeaveType
+from .overlap import conflicting_ranges, format_ranges
 from django.core.exceptions import ValidationError
 from nepali_datetime import date as nep_date
 
@@ -38,7 +41,7 @@ class LeaveForm(forms.ModelForm):
     class Meta:
         model = Leave
         fields = (
-            'leave_type', 'start_date', 'end_date', 'reason'
+            'leave_type', 'start_date', 'end_date', 'is_half_day', 'reason'
         )
         widgets = {
             'start_date': forms.TextInput(attrs={'placeholder': 'YYYY-MM-DD', 'class': 'nep_date'}),
@@ -54,7 +57,7 @@ class LeaveForm(forms.ModelForm):
         if self.user:
             assigned_leave_type_ids = EmployeeLeave.objects.filter(
                 employee=self.user,
-                leave_type__fiscal_year__is_current=True,
+                leave_type__fiscal_year_id=current_fiscal_year_id(),
             ).values_list('leave_type_id', flat=True)
 
             self.fields['leave_type'].queryset = LeaveType.objects.filter(id__in=assigned_leave_type_ids)
@@ -75,9 +78,21 @@ class LeaveForm(forms.ModelForm):
         if end_date_eng < start_date_eng:
             raise ValidationError("End date cannot be before start date.")
 
+        is_half_day = cleaned_data.get('is_half_day')
         no_of_days = (end_date_eng - start_date_eng).days + 1
 
         if leave_type:
+            #half day check
+            if is_half_day and not leave_type.half_leave_status:
+                raise ValidationError("Half day leave is not allowed for this leave type.")
+            if is_half_day and no_of_days > 1:
+                raise ValidationError("A half day leave must start and end on the same day.")
+
+            # Weekly days off and holidays are left out (or sandwiched) per the leave type
+            no_of_days = leave_days(leave_type, start_date_eng, end_date_eng, is_half_day)
+            if not no_of_days:
+                raise ValidationError("The selected dates fall entirely on holidays.")
+
             #max_per_day_leave check
             if leave_type.max_per_day_leave and no_of_days > leave_type.max_per_day_leave:
                 raise ValidationError(
@@ -93,43 +108,13 @@ class LeaveForm(forms.ModelForm):
                         f"You must apply at least {leave_type.pre_inform_days} day(s) in advance."
                     )
 
-        # 3. Check for overlapping leaves with specific dates
-        start_nep = nep_date.from_datetime_date(start_date_eng)
-        end_nep = nep_date.from_datetime_date(end_date_eng)
-
-        overlapping_leaves = Leave.objects.filter(
-            employee=self.user,
-            start_date__lte=end_nep,
-            end_date__gte=start_nep,
-        ).exclude(status__in=['Declined', 'Rejected'])
-
-        # Exclude current instance when editing
-        if self.instance and self.instance.pk:
-            overlapping_leaves = overlapping_leaves.exclude(pk=self.instance.pk)
-
-        if overlapping_leaves.exists():
-            # Create set of requested English dates
-            requested_dates = set(start_date_eng + timedelta(days=i) for i in range(no_of_days))
-            taken_dates = set()
-
-            for leave in overlapping_leaves:
-                # Convert Nepali leave dates to English for accurate comparison
-                leave_start_eng = leave.start_date.to_datetime_date()
-                leave_end_eng = leave.end_date.to_datetime_date()
-
-                leave_dates = set(
-                    leave_start_eng + timedelta(days=i)
-                    for i in range((leave_end_eng - leave_start_eng).days + 1)
-                )
-                taken_dates |= leave_dates
-
-            conflict_dates = sorted(requested_dates & taken_dates)
-
-            if conflict_dates:
-                formatted_dates = ', '.join([
-                    nep_date.from_datetime_date(date).strftime('%Y-%m-%d')
-                    for date in conflict_dates
-                ])
-                raise ValidationError(f"You have already taken leave on: {formatted_dates}.")
-
+        # 3. Check for overlapping leaves; conflicts are range intersections worked out by the database
+        conflicts = conflicting_ranges(
+            self.user, start_date_eng, end_date_eng,
+            exclude_pk=self.instance.pk if self.instance else None,
+        )
+        if conflicts:
+            raise ValidationError(f"You have already taken leave on: {format_ranges(conflicts)}.")
 
+        self.no_of_days = no_of_days
+        return cleaned_data
@@ -0,0 +1,119 @@
+from django.db import connection, transaction
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import EmployeeLeave, LeaveTransaction, LeaveTransactionType
+
+# Kinds that change the entitlement; the rest change the leave taken
+ENTITLEMENT_KINDS = (
+    LeaveTransactionType.ALLOCATION,
+    LeaveTransactionType.ACCRUAL,
+    LeaveTransactionType.CARRY_FORWARD,
+    LeaveTransactionType.ENCASHMENT,
+)
+USAGE_KINDS = (LeaveTransactionType.TAKEN, LeaveTransactionType.REVERSAL)
+
+
+def record_transaction(employee_leave, kind, days, leave=None, created_by=None, note=''):
+    """
+    Append a transaction and apply it to the cached balance in the same
+    database transaction. The balance is moved with F-expressions so two
+    approvals at once cannot overwrite each other.
+    """
+    entitlement = days if kind in ENTITLEMENT_KINDS else 0
+    taken = days if kind in USAGE_KINDS else 0
+
+    with transaction.atomic():
+        entry = LeaveTransaction.objects.create(
+            employee_leave=employee_leave, kind=kind, days=days, leave=leave, created_by=created_by, note=note,
+        )
+        EmployeeLeave.objects.filter(pk=employee_leave.pk).update(
+            total_leave=F('total_leave') + entitlement,
+            leave_taken=F('leave_taken') + taken,
+            leave_remaining=Greatest(F('total_leave') + entitlement - F('leave_taken') - taken, Value(0.0)),
+            updated_by=created_by,
+            updated_on=timezone.now(),
+        )
+    return entry
+
+
+def take_leave(leave, created_by=None):
+    employee_leave = EmployeeLeave.objects.filter(
+        employee=leave.employee, leave_type=leave.leave_type, is_active=True,
+    ).first()
+    if employee_leave is None:
+        return None
+    return record_transaction(employee_leave, LeaveTransactionType.TAKEN, leave.no_of_days,
+                              leave=leave, created_by=created_by)
+
+
+def reverse_leave(leave, created_by=None):
+    """Give back the days of a previously approved leave, against the balance they were taken from."""
+    taken = LeaveTransaction.objects.filter(leave=leave, kind__in=USAGE_KINDS).values('employee_leave').annotate(
+        days=Sum('days')
+    ).filter(days__gt=0)
+    entries = []
+    for row in taken:
+        employee_leave = EmployeeLeave(pk=row['employee_leave'])
+        entries.append(record_transaction(employee_leave, LeaveTransactionType.REVERSAL, -row['days'],
+                                          leave=leave, created_by=created_by))
+    return entries
+
+
+def _ledger_sum(kinds):
+    return Coalesce(
+        Subquery(
+            LeaveTransaction.objects.filter(employee_leave=OuterRef('pk'), kind__in=kinds)
+            .values('employee_leave').annotate(total=Sum('days')).values('total'),
+            output_field=FloatField(),
+        ),
+        Value(0.0),
+    )
+
+
+def rebuild_balances(queryset=None):
+    """
+    Recompute cached balances from the ledger with a single UPDATE, for
+    repairing drift or after importing transactions. Returns the number of
+    balances rewritten.
+    """
+    queryset = EmployeeLeave.objects.all() if queryset is None else queryset
+    return queryset.update(
+        total_leave=_ledger_sum(ENTITLEMENT_KINDS),
+        leave_taken=_ledger_sum(USAGE_KINDS),
+        leave_remaining=Greatest(_ledger_sum(ENTITLEMENT_KINDS) - _ledger_sum(USAGE_KINDS), Value(0.0)),
+    )
+
+
+def drifted_balances(queryset=None):
+    """Balances whose cached figures no longer match the ledger."""
+    queryset = EmployeeLeave.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        ledger_total=_ledger_sum(ENTITLEMENT_KINDS),
+        ledger_taken=_ledger_sum(USAGE_KINDS),
+    ).filter(~Q(total_leave=F('ledger_total')) | ~Q(leave_taken=F('ledger_taken')))
+
+
+def open_ledgers(leave_type_ids, created_by_id=None, note=''):
+    """
+    Record an allocation for the full entitlement of every balance of the
+    leave types that has no ledger entries yet, with one INSERT ... SELECT.
+    """
+    quote = connection.ops.quote_name
+    ledger = quote(LeaveTransaction._meta.db_table)
+    balances = quote(EmployeeLeave._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {ledger} (employee_leave_id, kind, days, note, created_by_id, created_on)
+            SELECT balance.id, %s, balance.total_leave, %s, %s, %s
+              FROM {balances} balance
+             WHERE balance.leave_type_id IN ({', '.join(['%s'] * len(leave_type_ids))})
+               AND NOT EXISTS (SELECT 1 FROM {ledger} entry WHERE entry.employee_leave_id = balance.id)
+            """,
+            [LeaveTransactionType.ALLOCATION.value, note, created_by_id,
+             LeaveTransaction._meta.get_field('created_on').get_db_prep_save(timezone.now(), connection),
+             *leave_type_ids],
+        )
+        return cursor.rowcount
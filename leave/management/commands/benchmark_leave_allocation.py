@@ -0,0 +1,55 @@
+import time
+
+import nepali_datetime
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from fiscal_year.models import FiscalYear
+from leave.allocation import allocate_leave_type
+from leave.models import JobType, LeaveType
+from user.models import AuthUser, WorkingDetail
+
+USERNAME_PREFIX = 'bench_leave_'
+
+
+class Command(BaseCommand):
+    help = "Time allocating and re-allocating a leave type across a set of synthetic employees."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        today = nepali_datetime.date.today()
+        fiscal_year = FiscalYear.objects.create(
+            fiscal_year='Benchmark', start_date=nepali_datetime.date(today.year, 1, 1),
+            end_date=nepali_datetime.date(today.year, 12, 30), status='inactive',
+        )
+        users = AuthUser.objects.bulk_create([
+            AuthUser(username=f'{USERNAME_PREFIX}{i}', email=f'{USERNAME_PREFIX}{i}@example.com',
+                     first_name='Bench', last_name=str(i))
+            for i in range(options['employees'])
+        ], batch_size=2000)
+        # Half joined before the fiscal year, the rest spread over it
+        WorkingDetail.objects.bulk_create([
+            WorkingDetail(employee=user, job_type=JobType.PERMANENT,
+                          joining_date=nepali_datetime.date(today.year - 1 if i % 2 else today.year, i % 12 + 1, 1))
+            for i, user in enumerate(users)
+        ], batch_size=2000)
+        leave_type = LeaveType.objects.create(fiscal_year=fiscal_year, name='Benchmark', number_of_days=12, status='inactive')
+
+        try:
+            self.run("Initial allocation", leave_type, update_existing=False)
+            leave_type.number_of_days = 18
+            self.run("Re-allocation", leave_type, update_existing=True)
+        finally:
+            leave_type.delete()
+            fiscal_year.delete()
+            AuthUser.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def run(self, label, leave_type, update_existing):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            report = allocate_leave_type(leave_type, update_existing=update_existing)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label}: {elapsed:.2f}s, {len(queries)} queries, {report}")
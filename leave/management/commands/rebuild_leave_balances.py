@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from leave.ledger import drifted_balances, rebuild_balances
+from leave.models import EmployeeLeave
+
+
+class Command(BaseCommand):
+    help = "Recompute cached employee leave balances from the leave transaction ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leave-type', type=int, help="Only rebuild balances of this leave type id.")
+        parser.add_argument('--check', action='store_true', help="Report drifted balances without changing them.")
+
+    def handle(self, *args, **options):
+        queryset = EmployeeLeave.objects.all()
+        if options['leave_type']:
+            queryset = queryset.filter(leave_type_id=options['leave_type'])
+
+        drifted = drifted_balances(queryset).count()
+        if options['check']:
+            self.stdout.write(f"{drifted} balance(s) differ from the ledger.")
+            return
+
+        rebuilt = rebuild_balances(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} balance(s); {drifted} had drifted from the ledger."))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fiscal_year.models import FiscalYear
+from fiscal_year.resolver import current_fiscal_year
+from leave.rollover import RolloverError, rollover_fiscal_year
+
+
+class Command(BaseCommand):
+    help = (
+        "Close a fiscal year and make another current: clone its active leave types, allocate them, "
+        "carry forward or encash the remaining balances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('to_fiscal_year', type=int, help="Id of the fiscal year to roll over into.")
+        parser.add_argument('--from', dest='from_fiscal_year', type=int,
+                            help="Id of the fiscal year being closed; defaults to the current one.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change and roll it back.")
+
+    def handle(self, *args, **options):
+        try:
+            to_fiscal_year = FiscalYear.objects.get(pk=options['to_fiscal_year'])
+            if options['from_fiscal_year']:
+                from_fiscal_year = FiscalYear.objects.get(pk=options['from_fiscal_year'])
+            else:
+                from_fiscal_year = current_fiscal_year()
+        except FiscalYear.DoesNotExist:
+            raise CommandError("Fiscal year not found.")
+        if from_fiscal_year is None:
+            raise CommandError("No fiscal year is current; pass --from.")
+
+        try:
+            report = rollover_fiscal_year(from_fiscal_year, to_fiscal_year, dry_run=options['dry_run'])
+        except RolloverError as error:
+            raise CommandError(str(error))
+
+        prefix = "[dry run] " if options['dry_run'] else ""
+        self.stdout.write(f"{prefix}Rolled {from_fiscal_year} over into {to_fiscal_year}:")
+        for key, value in report.items():
+            self.stdout.write(f"  {key.replace('_', ' ')}: {value}")
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0007_employeeleave_is_active_alter_leave_leave_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('allocation', 'Allocation'), ('accrual', 'Accrual'), ('taken', 'Taken'), ('reversal', 'Reversal'), ('carry_forward', 'Carry Forward'), ('encashment', 'Encashment')], max_length=20)),
+                ('days', models.FloatField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leave_transaction_created_by', to=settings.AUTH_USER_MODEL)),
+                ('employee_leave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='leave.employeeleave')),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='leave.leave')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:14
+
+from django.db import migrations
+
+
+def seed_ledger(apps, schema_editor):
+    """Open the ledger with each existing balance so a rebuild reproduces it."""
+    EmployeeLeave = apps.get_model('leave', 'EmployeeLeave')
+    LeaveTransaction = apps.get_model('leave', 'LeaveTransaction')
+
+    entries = []
+    for employee_leave_id, total_leave, leave_taken in EmployeeLeave.objects.values_list('id', 'total_leave', 'leave_taken').iterator():
+        entries.append(LeaveTransaction(employee_leave_id=employee_leave_id, kind='allocation', days=total_leave,
+                                        note="Opening balance"))
+        if leave_taken:
+            entries.append(LeaveTransaction(employee_leave_id=employee_leave_id, kind='taken', days=leave_taken,
+                                            note="Opening balance"))
+    LeaveTransaction.objects.bulk_create(entries, batch_size=1000)
+
+
+def clear_ledger(apps, schema_editor):
+    apps.get_model('leave', 'LeaveTransaction').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0008_leave_transaction'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_ledger, clear_ledger),
+    ]
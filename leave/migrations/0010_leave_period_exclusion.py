@@ -0,0 +1,56 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:16
+
+from django.db import migrations
+
+# Leave gets a PostgreSQL daterange column generated from its (AD) start and
+# end dates, a GiST index on it and an exclusion constraint so an employee
+# cannot hold two non-declined leaves on the same day. Other databases rely on
+# the form check alone.
+
+TABLE = 'leave_leave'
+CONSTRAINT = 'leave_no_overlapping_leaves'
+
+
+def add_period(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT a.id, b.id FROM {TABLE} a JOIN {TABLE} b
+              ON a.employee_id = b.employee_id AND a.id < b.id
+             AND a.start_date <= b.end_date AND b.start_date <= a.end_date
+             AND a.status NOT IN ('Declined', 'Rejected') AND b.status NOT IN ('Declined', 'Rejected')
+        """)
+        clashes = cursor.fetchall()
+    if clashes:
+        pairs = ', '.join(f'{a}/{b}' for a, b in clashes[:20])
+        raise RuntimeError(f"Resolve overlapping leaves before migrating (leave id pairs: {pairs}).")
+
+    for sql in [
+        'CREATE EXTENSION IF NOT EXISTS btree_gist',
+        f"ALTER TABLE {TABLE} ADD COLUMN period daterange "
+        f"GENERATED ALWAYS AS (daterange(start_date, end_date, '[]')) STORED",
+        f'CREATE INDEX {TABLE}_employee_period_idx ON {TABLE} USING gist (employee_id, period)',
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {CONSTRAINT} EXCLUDE USING gist "
+        f"(employee_id WITH =, period WITH &&) WHERE (status NOT IN ('Declined', 'Rejected'))",
+    ]:
+        schema_editor.execute(sql)
+
+
+def drop_period(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {CONSTRAINT}')
+    schema_editor.execute(f'DROP INDEX IF EXISTS {TABLE}_employee_period_idx')
+    schema_editor.execute(f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS period')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0009_seed_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_period, drop_period),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0010_leave_period_exclusion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leave',
+            name='is_half_day',
+            field=models.BooleanField(default=False, verbose_name='Half Day?'),
+        ),
+        migrations.AlterField(
+            model_name='leave',
+            name='no_of_days',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -74,7 +74,8 @@ class Leave(models.Model):
     leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE, related_name='leave_type_leave')
     start_date = NepaliDateField()
     end_date = NepaliDateField()
-    no_of_days = models.PositiveIntegerField(default=0)
+    no_of_days = models.FloatField(default=0)
+    is_half_day = models.BooleanField(default=False, verbose_name="Half Day?")
     reason = models.TextField(null=True, blank=True)
     status = models.CharField(choices=LEAVE_STATUS,default="Applied")
     created_by = models.ForeignKey('user.AuthUser', on_delete=models.CASCADE, related_name='leave_created_by', null=True)
@@ -82,6 +83,53 @@ class Leave(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # The date columns hold AD dates, so range predicates against attendance run on these indexes
+        indexes = [
+            models.Index(fields=['employee', 'start_date', 'end_date'], name='leave_employee_period_idx'),
+            models.Index(fields=['status', 'start_date', 'end_date'], name='leave_status_period_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The dates as loaded, so saving can tell whether they moved without reading them again
+        instance._loaded_dates = (instance.__dict__.get('start_date'), instance.__dict__.get('end_date'))
+        return instance
+
     def __str__(self):
         return f"{self.employee} - {self.leave_type} - {self.start_date} to {self.end_date}"
 
+
+
+class LeaveTransactionType(models.TextChoices):
+    ALLOCATION = 'allocation', 'Allocation'
+    ACCRUAL = 'accrual', 'Accrual'
+    TAKEN = 'taken', 'Taken'
+    REVERSAL = 'reversal', 'Reversal'
+    CARRY_FORWARD = 'carry_forward', 'Carry Forward'
+    ENCASHMENT = 'encashment', 'Encashment'
+
+
+class LeaveTransaction(models.Model):
+    """
+    Append-only history of an employee leave balance. Allocation, accrual,
+    carry forward and encashment change the entitlement; taken and reversal
+    change the leave taken. ``days`` is signed, so encashment and reversal
+    are negative.
+    """
+    employee_leave = models.ForeignKey(EmployeeLeave, on_delete=models.CASCADE, related_name='transactions')
+    kind = models.CharField(max_length=20, choices=LeaveTransactionType.choices)
+    days = models.FloatField()
+    leave = models.ForeignKey(Leave, on_delete=models.SET_NULL, related_name='transactions', null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey('user.AuthUser', on_delete=models.SET_NULL, related_name='leave_transaction_created_by', null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Leave transactions are append-only; record a reversal instead.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.employee_leave} - {self.get_kind_display()} {self.days}"
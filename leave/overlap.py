@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest, Least
+
+from utils.date_converter import ad_date, ad_value, english_to_nepali
+
+from .models import Leave
+
+# Leaves in these states do not hold their dates
+RELEASED_STATUSES = ('Declined', 'Rejected')
+
+
+def overlapping_leaves(employee, start_date, end_date, exclude_pk=None):
+    """
+    Leaves of the employee that share at least one day with the AD range
+    ``[start_date, end_date]``. On PostgreSQL the test runs on the ``period``
+    daterange column so the GiST index answers it.
+    """
+    queryset = Leave.objects.filter(employee=employee).exclude(status__in=RELEASED_STATUSES)
+    if connection.vendor == 'postgresql':
+        queryset = queryset.filter(RawSQL(
+            "leave_leave.period && daterange(%s, %s, '[]')", (start_date, end_date), output_field=BooleanField(),
+        ))
+    else:
+        queryset = queryset.filter(
+            start_date__lte=ad_value(end_date),
+            end_date__gte=ad_value(start_date),
+        )
+    if exclude_pk:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return queryset
+
+
+def conflicting_ranges(employee, start_date, end_date, exclude_pk=None):
+    """
+    AD ``(start, end)`` ranges within the request that are already taken,
+    merged and in order. Each one is the intersection of the request with an
+    existing leave, worked out by the database.
+    """
+    intersections = overlapping_leaves(employee, start_date, end_date, exclude_pk).annotate(
+        conflict_start=Greatest(ad_date('start_date'), ad_value(start_date)),
+        conflict_end=Least(ad_date('end_date'), ad_value(end_date)),
+    ).order_by('conflict_start').values_list('conflict_start', 'conflict_end')
+
+    merged = []
+    for conflict_start, conflict_end in intersections:
+        # Back-to-back leaves read as one range
+        if merged and conflict_start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], conflict_end)
+        else:
+            merged.append([conflict_start, conflict_end])
+    return [tuple(conflict) for conflict in merged]
+
+
+def format_ranges(ranges):
+    """Ranges in BS, e.g. ``2081-05-01 to 2081-05-03, 2081-06-10``; only the endpoints are converted."""
+    formatted = []
+    for start, end in ranges:
+        start_nep = english_to_nepali(start).strftime('%Y-%m-%d')
+        if start == end:
+            formatted.append(start_nep)
+        else:
+            formatted.append(f"{start_nep} to {english_to_nepali(end).strftime('%Y-%m-%d')}")
+    return ', '.join(formatted)
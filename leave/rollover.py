@@ -0,0 +1,120 @@
+from django.db import transaction
+
+from fiscal_year.models import FiscalYear
+from fiscal_year.resolver import invalidate_fiscal_years
+from .allocation import BATCH_SIZE, allocate_leave_type
+from .ledger import rebuild_balances
+from .models import EmployeeLeave, LeaveTransaction, LeaveTransactionType, LeaveType
+
+# Copied from each leave type into its clone for the new fiscal year
+CLONED_FIELDS = [
+    field.name for field in LeaveType._meta.concrete_fields
+    if field.name not in ('id', 'fiscal_year', 'created_by', 'updated_by', 'created_on', 'updated_on')
+]
+
+
+class RolloverError(Exception):
+    pass
+
+
+def clone_leave_types(from_fiscal_year, to_fiscal_year, created_by=None):
+    """
+    {old leave type id: leave type in the new year} for every active leave
+    type; a type whose name already exists in the new year is reused.
+    """
+    existing = {leave_type.name: leave_type for leave_type in LeaveType.objects.filter(fiscal_year=to_fiscal_year)}
+    clones, created = {}, []
+    for leave_type in LeaveType.objects.filter(fiscal_year=from_fiscal_year, status='active'):
+        clone = existing.get(leave_type.name)
+        if clone is None:
+            clone = LeaveType(fiscal_year=to_fiscal_year, created_by=created_by, updated_by=created_by,
+                              **{name: getattr(leave_type, name) for name in CLONED_FIELDS})
+            created.append(clone)
+        clones[leave_type.id] = clone
+    LeaveType.objects.bulk_create(created)
+    return clones, len(created)
+
+
+def rollover_fiscal_year(from_fiscal_year, to_fiscal_year, created_by=None, dry_run=False):
+    """
+    Close ``from_fiscal_year`` and make ``to_fiscal_year`` current, in one
+    transaction: active leave types are cloned and allocated for the new year,
+    remaining balances of carry-forward types move into the new year and those
+    of encashable types are encashed. Both legs are written to the leave
+    ledger. With ``dry_run`` everything is rolled back and only the report is
+    returned.
+    """
+    if from_fiscal_year.pk == to_fiscal_year.pk:
+        raise RolloverError("Choose a different fiscal year to roll over into.")
+    if LeaveTransaction.objects.filter(
+        employee_leave__leave_type__fiscal_year=from_fiscal_year,
+        kind__in=(LeaveTransactionType.CARRY_FORWARD, LeaveTransactionType.ENCASHMENT),
+        days__lt=0,
+    ).exists():
+        raise RolloverError(f"Fiscal year {from_fiscal_year} has already been rolled over.")
+
+    with transaction.atomic():
+        clones, types_created = clone_leave_types(from_fiscal_year, to_fiscal_year, created_by)
+        allocated = 0
+        for clone in {clone.id: clone for clone in clones.values()}.values():
+            if clone.status == 'active':
+                allocated += allocate_leave_type(clone)['created']
+
+        # Closing balances of every type that carries forward or encashes, in one query
+        closing = list(EmployeeLeave.objects.filter(
+            leave_type__in=list(clones), is_active=True, leave_remaining__gt=0,
+        ).exclude(
+            leave_type__carry_forward_status=False, leave_type__encashable_status=False,
+        ).values_list('id', 'employee_id', 'leave_type_id', 'leave_type__carry_forward_status', 'leave_remaining'))
+
+        new_balances = dict(
+            ((employee_id, leave_type_id), employee_leave_id)
+            for employee_leave_id, employee_id, leave_type_id in EmployeeLeave.objects.filter(
+                leave_type__in=[clone.id for clone in clones.values()], is_active=True,
+            ).values_list('id', 'employee_id', 'leave_type_id')
+        )
+
+        note = f"Fiscal year {from_fiscal_year} closed"
+        created_by_id = created_by.pk if created_by else None
+        entries, touched, carried, encashed, forfeited = [], set(), 0, 0, 0
+        for employee_leave_id, employee_id, leave_type_id, carries_forward, remaining in closing:
+            target = new_balances.get((employee_id, clones[leave_type_id].id)) if carries_forward else None
+            if carries_forward and target is None:
+                # No longer eligible for the type; carry forward has nowhere to go
+                forfeited += remaining
+                continue
+            kind = (LeaveTransactionType.CARRY_FORWARD if carries_forward else LeaveTransactionType.ENCASHMENT).value
+            entries.append(LeaveTransaction(employee_leave_id=employee_leave_id, kind=kind, days=-remaining,
+                                            note=note, created_by_id=created_by_id))
+            touched.add(employee_leave_id)
+            if carries_forward:
+                entries.append(LeaveTransaction(employee_leave_id=target, kind=kind, days=remaining,
+                                                note=note, created_by_id=created_by_id))
+                touched.add(target)
+                carried += remaining
+            else:
+                encashed += remaining
+        LeaveTransaction.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+        # Rebuilding by leave type keeps the statement small however many employees are involved
+        rebuild_balances(EmployeeLeave.objects.filter(
+            leave_type__in=[*clones, *(clone.id for clone in clones.values())],
+        ))
+
+        FiscalYear.objects.filter(is_current=True).exclude(pk=to_fiscal_year.pk).update(is_current=False)
+        FiscalYear.objects.filter(pk=to_fiscal_year.pk).update(is_current=True, status='active')
+        # The updates send no signals; drop the cached fiscal year index once they are committed
+        transaction.on_commit(invalidate_fiscal_years)
+
+        report = {
+            'leave_types_created': types_created,
+            'allocated': allocated,
+            'carried_forward_days': carried,
+            'encashed_days': encashed,
+            'forfeited_days': forfeited,
+            'balances_updated': len(touched),
+        }
+        if dry_run:
+            transaction.set_rollback(True)
+    return report
+
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from fiscal_year.models import Holiday
+from .calendar import invalidate_calendar
+from .models import Leave
+
+
+def _ad_range(start_date, end_date):
+    to_nepali = Leave._meta.get_field('start_date').to_python
+    return to_nepali(start_date).to_datetime_date(), to_nepali(end_date).to_datetime_date()
+
+
+@receiver(pre_save, sender=Leave)
+def invalidate_calendar_for_old_dates(sender, instance, update_fields=None, **kwargs):
+    # An edit can move a leave out of a month; that month's calendar is stale too
+    if not instance.pk or (update_fields is not None and not {'start_date', 'end_date'} & set(update_fields)):
+        return
+    old_dates = getattr(instance, '_loaded_dates', None)
+    if old_dates is None or None in old_dates:
+        # Not loaded from the database, or with the dates deferred
+        old_dates = Leave.objects.filter(pk=instance.pk).values_list('start_date', 'end_date').first()
+    if old_dates:
+        old_range = _ad_range(*old_dates)
+        if old_range != _ad_range(instance.start_date, instance.end_date):
+            invalidate_calendar(*old_range)
+
+
+@receiver([post_save, post_delete], sender=Leave)
+def invalidate_calendar_for_leave(sender, instance, **kwargs):
+    invalidate_calendar(*_ad_range(instance.start_date, instance.end_date))
+    instance._loaded_dates = (instance.start_date, instance.end_date)
+
+
+@receiver([post_save, post_delete], sender=Holiday)
+def invalidate_calendar_for_holiday(sender, instance, **kwargs):
+    to_nepali = Holiday._meta.get_field('date').to_python
+    invalidate_calendar(to_nepali(instance.date).to_datetime_date())
@@ -0,0 +1,10 @@
+from jobs.queue import task
+from .allocation import allocate_leave_type
+from .models import LeaveType
+
+
+@task('leave.allocate')
+def allocate(job, leave_type_id, update_existing=False):
+    leave_type = LeaveType.objects.select_related('fiscal_year').get(pk=leave_type_id)
+    job.set_progress(10, f"Allocating {leave_type.name}")
+    return allocate_leave_type(leave_type, update_existing=update_existing)
@@ -1,3 +1,189 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from fiscal_year.models import FiscalYear
+from leave.allocation import allocate_leave_type
+from leave.calendar import month_calendar
+from leave.ledger import rebuild_balances, record_transaction, reverse_leave, take_leave
+from leave.overlap import conflicting_ranges, format_ranges
+from leave.rollover import RolloverError, rollover_fiscal_year
+from leave.models import EmployeeLeave, JobType, Leave, LeaveTransaction, LeaveTransactionType, LeaveType
+from user.models import AuthUser, WorkingDetail
+from utils.date_converter import nepali_str_to_english
+
+
+class LeaveAllocationTest(TestCase):
+    def setUp(self):
+        fiscal_year = FiscalYear.objects.create(fiscal_year='2081/82', start_date='2081-04-01', end_date='2082-03-31')
+        self.fiscal_year = FiscalYear.objects.get(pk=fiscal_year.pk)
+        for username, job_type, joining_date in [
+            ('veteran', JobType.PERMANENT, '2079-01-01'),
+            ('newcomer', JobType.PERMANENT, '2081-10-01'),
+            ('contractor', JobType.CONTRACT, '2079-01-01'),
+        ]:
+            user = AuthUser.objects.create_user(
+                username=username, email=f'{username}@example.com', password='pass',
+                first_name=username.title(), last_name='Employee',
+            )
+            WorkingDetail.objects.create(employee=user, job_type=job_type, joining_date=joining_date)
+
+    def allocations(self, leave_type):
+        return dict(
+            EmployeeLeave.objects.filter(leave_type=leave_type, is_active=True)
+            .values_list('employee__username', 'total_leave')
+        )
+
+    def test_allocation_is_prorated_and_filtered_by_working_detail_job_type(self):
+        leave_type = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Annual', number_of_days=12,
+                                              job_type=JobType.PERMANENT)
+        with self.assertNumQueries(6):
+            allocate_leave_type(leave_type)
+        self.assertEqual(self.allocations(leave_type), {'veteran': 12, 'newcomer': 6})
+
+        EmployeeLeave.objects.filter(employee__username='veteran').update(leave_taken=4)
+        leave_type.number_of_days = 6
+        leave_type.job_type = JobType.ALL
+        with self.assertNumQueries(9):
+            report = allocate_leave_type(leave_type, update_existing=True)
+
+        self.assertEqual(report, {'created': 1, 'updated': 2, 'deactivated': 0})
+        self.assertEqual(self.allocations(leave_type), {'veteran': 6, 'newcomer': 3, 'contractor': 6})
+        self.assertEqual(EmployeeLeave.objects.get(employee__username='veteran').leave_remaining, 2)
+
+    def test_ledger_moves_balance_and_rebuild_reproduces_it(self):
+        leave_type = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Sick', number_of_days=12)
+        allocate_leave_type(leave_type)
+        employee_leave = EmployeeLeave.objects.get(employee__username='veteran', leave_type=leave_type)
+        leave = Leave.objects.create(employee=employee_leave.employee, leave_type=leave_type,
+                                     start_date='2081-05-01', end_date='2081-05-03', no_of_days=3)
+
+        take_leave(leave)
+        record_transaction(employee_leave, LeaveTransactionType.ENCASHMENT, -2)
+        reverse_leave(leave)
+        take_leave(leave)
+        employee_leave.refresh_from_db()
+        self.assertEqual((employee_leave.total_leave, employee_leave.leave_taken, employee_leave.leave_remaining),
+                         (10, 3, 7))
+
+        EmployeeLeave.objects.filter(pk=employee_leave.pk).update(total_leave=0, leave_taken=0, leave_remaining=0)
+        rebuild_balances()
+        employee_leave.refresh_from_db()
+        self.assertEqual((employee_leave.total_leave, employee_leave.leave_taken, employee_leave.leave_remaining),
+                         (10, 3, 7))
+
+        entry = LeaveTransaction.objects.filter(employee_leave=employee_leave).first()
+        with self.assertRaises(ValueError):
+            entry.save()
+
+    def test_conflicts_are_merged_range_intersections(self):
+        leave_type = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Casual', number_of_days=12)
+        employee = AuthUser.objects.get(username='veteran')
+        for start_date, end_date, status in [
+            ('2081-05-01', '2081-05-03', 'Approved'),
+            ('2081-05-04', '2081-05-06', 'Applied'),
+            ('2081-05-10', '2081-05-20', 'Declined'),
+            ('2081-05-15', '2081-05-25', 'Applied'),
+        ]:
+            Leave.objects.create(employee=employee, leave_type=leave_type, start_date=start_date,
+                                 end_date=end_date, status=status)
+
+        conflicts = conflicting_ranges(employee, nepali_str_to_english('2081-05-02'),
+                                       nepali_str_to_english('2081-05-16'))
+        self.assertEqual(format_ranges(conflicts), '2081-05-02 to 2081-05-06, 2081-05-15 to 2081-05-16')
+        self.assertEqual(conflicting_ranges(employee, nepali_str_to_english('2081-05-07'),
+                                            nepali_str_to_english('2081-05-14')), [])
+
+    def test_reopening_a_declined_leave_over_taken_dates_is_refused(self):
+        leave_type = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Casual', number_of_days=12)
+        employee = AuthUser.objects.get(username='veteran')
+        declined = Leave.objects.create(employee=employee, leave_type=leave_type, start_date='2081-05-01',
+                                        end_date='2081-05-03', status='Declined')
+        Leave.objects.create(employee=employee, leave_type=leave_type, start_date='2081-05-03',
+                             end_date='2081-05-04', status='Applied')
+        self.client.force_login(employee)
+
+        response = self.client.post(reverse('leave:leave_update_status', args=[declined.pk]),
+                                    {'status': 'Approved'}, follow=True)
+
+        self.assertContains(response, "The employee already has leave on some of these dates.")
+        declined.refresh_from_db()
+        self.assertEqual(declined.status, 'Declined')
+        self.assertFalse(LeaveTransaction.objects.filter(leave=declined).exists())
+
+    def test_leave_saves_only_drop_old_months_when_the_dates_move(self):
+        leave_type = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Home', number_of_days=12)
+        Leave.objects.create(employee=AuthUser.objects.get(username='veteran'), leave_type=leave_type,
+                             start_date='2081-05-30', end_date='2081-06-02', status='Applied')
+        self.assertEqual(month_calendar(2081, 5)['days'][29]['headcount'], 1)
+
+        leave = Leave.objects.get()
+        leave.status = 'Verified'
+        # The old dates are known from the load, so the leave is not read back
+        with CaptureQueriesContext(connection) as queries:
+            leave.save()
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT') and 'leave_leave' in query['sql']])
+
+        self.assertEqual(month_calendar(2081, 5)['days'][29]['headcount'], 1)
+        leave.start_date, leave.end_date = '2081-06-01', '2081-06-02'
+        leave.save()
+        self.assertEqual(month_calendar(2081, 5)['days'][29]['headcount'], 0)
+
+    def test_calendar_sweeps_leaves_and_is_invalidated_on_save(self):
+        leave_type = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Home', number_of_days=12)
+        veteran, newcomer = AuthUser.objects.get(username='veteran'), AuthUser.objects.get(username='newcomer')
+        Leave.objects.create(employee=veteran, leave_type=leave_type, start_date='2081-04-30',
+                             end_date='2081-05-02', status='Approved')
+        Leave.objects.create(employee=newcomer, leave_type=leave_type, start_date='2081-05-02',
+                             end_date='2081-05-03', status='Applied')
+        Leave.objects.create(employee=newcomer, leave_type=leave_type, start_date='2081-05-05',
+                             end_date='2081-05-05', status='Declined')
+
+        calendar = month_calendar(2081, 5)
+        self.assertEqual([day['headcount'] for day in calendar['days'][:6]], [1, 2, 1, 0, 0, 0])
+        self.assertEqual([entry['name'] for entry in calendar['days'][1]['employees']],
+                         ['Newcomer Employee', 'Veteran Employee'])
+
+        leave = Leave.objects.get(status='Declined')
+        leave.status = 'Approved'
+        leave.save()
+        # The leaves plus reading and storing cache entries; the fiscal year index is in
+        # process and the compiled working calendar comes from the cache
+        with CaptureQueriesContext(connection) as queries:
+            calendar = month_calendar(2081, 5)
+        self.assertEqual(len([query for query in queries if 'leave_leave' in query['sql']]), 1)
+        self.assertFalse([query for query in queries if 'fiscal_year' in query['sql']])
+        # A hit is a single cache read
+        with self.assertNumQueries(1):
+            month_calendar(2081, 5)
+        self.assertEqual(calendar['days'][4]['headcount'], 1)
+
+    def test_rollover_carries_forward_and_encashes_in_the_ledger(self):
+        annual = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Annual', number_of_days=12,
+                                          carry_forward_status=True)
+        sick = LeaveType.objects.create(fiscal_year=self.fiscal_year, name='Sick', number_of_days=6,
+                                        encashable_status=True)
+        allocate_leave_type(annual)
+        allocate_leave_type(sick)
+        veteran_annual = EmployeeLeave.objects.get(employee__username='veteran', leave_type=annual)
+        record_transaction(veteran_annual, LeaveTransactionType.TAKEN, 5)
+        new_year = FiscalYear.objects.get(pk=FiscalYear.objects.create(
+            fiscal_year='2082/83', start_date='2082-04-01', end_date='2083-03-31', status='inactive').pk)
+
+        report = rollover_fiscal_year(self.fiscal_year, new_year, dry_run=True)
+        self.assertEqual(report['leave_types_created'], 2)
+        self.assertFalse(LeaveType.objects.filter(fiscal_year=new_year).exists())
+
+        report = rollover_fiscal_year(self.fiscal_year, new_year)
+        self.assertEqual(report, {
+            'leave_types_created': 2, 'allocated': 6, 'carried_forward_days': 7 + 12 + 6,
+            'encashed_days': 6 + 3 + 6, 'forfeited_days': 0, 'balances_updated': 9,
+        })
+        veteran_annual.refresh_from_db()
+        self.assertEqual(veteran_annual.leave_remaining, 0)
+        self.assertEqual(EmployeeLeave.objects.get(employee__username='veteran', leave_type__name='Annual',
+                                                   leave_type__fiscal_year=new_year).total_leave, 19)
+        self.assertTrue(FiscalYear.objects.get(pk=new_year.pk).is_current)
+        with self.assertRaises(RolloverError):
+            rollover_fiscal_year(self.fiscal_year, new_year)
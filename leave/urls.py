@@ -1,5 +1,5 @@
 from django.urls import include, path
-from .views import LeaveTypeListView, LeaveTypeCreateView, LeaveTypeEditView, LeaveDeleteView, LeaveListView, LeaveCreateView, LeaveEditView, LeaveTypeDeleteView, LeaveStatusUpdateView
+from .views import LeaveTypeListView, LeaveTypeCreateView, LeaveTypeEditView, LeaveDeleteView, LeaveListView, LeaveCreateView, LeaveEditView, LeaveTypeDeleteView, LeaveStatusUpdateView, leave_calendar_view
 
 app_name = 'leave'
 
@@ -10,6 +10,7 @@ urlpatterns = [
     path('edit/<int:pk>', LeaveEditView.as_view(), name='leave_edit'),
     path('delete/<int:pk>', LeaveDeleteView.as_view(), name='leave_delete'),
     path('<int:pk>/update-status/', LeaveStatusUpdateView.as_view(), name='leave_update_status'),
+    path('calendar/', leave_calendar_view, name='leave_calendar'),
 
 
 
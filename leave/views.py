@@ -1,4 +1,3 @@
-from datetime import timezone
 from urllib.request import Request
 from django.shortcuts import render
 from django.contrib import messages
@@ -7,18 +6,26 @@ from django.shortcuts import get_object_or_404, redirect
 from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+import nepali_datetime
 
-from user.models import AuthUser, Profile
-from utils.common import point_down_round
+from user.models import AuthUser
 from utils.enums import MARITAL_STATUS
 from utils.date_converter import nepali_str_to_english
 # from utils.date_converter import nepali_str_to_english 
+from fiscal_year.resolver import current_fiscal_year_id
+from fiscal_year.working_days import leave_days
+from jobs.queue import enqueue
+from .calendar import month_calendar
+from .ledger import reverse_leave, take_leave
 from .models import EmployeeLeave, Leave, LeaveType
+from .overlap import RELEASED_STATUSES, overlapping_leaves
 from .forms import LeaveForm, LeaveTypeForm
 
 from django.contrib import messages
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
+from django.db import IntegrityError, transaction
 from django.db.models import Q, F, Case, When, Value, IntegerField
 from fiscal_year.models import FiscalYear
 
@@ -79,7 +86,8 @@ class LeaveTypeCreateView(LoginRequiredMixin, CreateView):
         leave_type.save()
         
         if leave_type.status == 'active':
-            updateLeaveTypeDetails(leave_type, update_existing=False)
+            enqueue('leave.allocate', created_by=self.request.user, leave_type_id=leave_type.id, update_existing=False)
+            messages.info(self.request, "Leave allocation has been queued; see Background Jobs for progress.")
 
         messages.success(self.request, "Leave Type created successfully.")
         return redirect(self.success_url)
@@ -104,7 +112,8 @@ class LeaveTypeEditView(LoginRequiredMixin, UpdateView):
         )
 
         if leave_type.status == 'active':
-            updateLeaveTypeDetails(leave_type, update_existing=update_existing)
+            enqueue('leave.allocate', created_by=self.request.user, leave_type_id=leave_type.id, update_existing=update_existing)
+            messages.info(self.request, "Leave allocation has been queued; see Background Jobs for progress.")
 
         messages.success(self.request, "Leave Type updated successfully.")
         return redirect(self.success_url)
@@ -123,125 +132,6 @@ class LeaveTypeDeleteView(View):
         messages.success(request, "Leave Type deleted successfully.")
         return redirect(self.success_url)
 
-#assign leaves to employees
-def updateLeaveTypeDetails(leave_type, update_existing=False):
-    fiscal_year = leave_type.fiscal_year
-    eng_fiscal_year_start_date = nepali_str_to_english(fiscal_year.start_date.strftime('%Y-%m-%d'))
-    eng_fiscal_year_end_date = nepali_str_to_english(fiscal_year.end_date.strftime('%Y-%m-%d'))
-
-    total_days = leave_type.number_of_days
-    gender = None if leave_type.gender == 'A' else leave_type.gender
-    marital_status = None if leave_type.marital_status == 'A' else leave_type.marital_status
-    job_type = None if leave_type.job_type == 'all' else leave_type.job_type
-
-    user_filters = {'is_active': True}
-    if gender:
-        user_filters['profile__gender'] = gender
-    if marital_status:
-        user_filters['profile__marital_status'] = marital_status
-    if job_type:
-        user_filters['profile__job_type'] = job_type
-
-    # Current eligible employees based on updated leave type
-    new_employee_qs = AuthUser.objects.filter(**user_filters).select_related('profile')
-    new_employee_ids = set(new_employee_qs.values_list('id', flat=True))
-
-    # Employees who currently have this leave type assigned
-    old_leaves_qs = EmployeeLeave.objects.filter(leave_type=leave_type, is_active=True)
-    old_employee_ids = set(old_leaves_qs.values_list('employee_id', flat=True))
-
-    # Employees to add (newly qualified)
-    new_employee_ids_to_add = new_employee_ids - old_employee_ids
-
-    # Employees to deactivate (no longer qualifying)
-    employee_ids_to_deactivate = old_employee_ids - new_employee_ids
-
-    # Employees already assigned and still qualifying
-    employees_to_update = new_employee_ids & old_employee_ids
-
-    # --- Add new employees ---
-    for emp in new_employee_qs:
-        if emp.id not in new_employee_ids_to_add:
-            continue
-
-        try:
-            profile = emp.profile
-        except Profile.DoesNotExist:
-            continue
-
-        joining_date = profile.joining_date
-        if not joining_date:
-            continue
-
-        eng_join_date = nepali_str_to_english(joining_date.strftime('%Y-%m-%d'))
-
-        if eng_join_date <= eng_fiscal_year_start_date:
-            total_leave = total_days
-        else:
-            month_diff = (eng_fiscal_year_end_date - eng_join_date).days // 30
-            if month_diff <= 0:
-                continue
-            raw_leave = round(month_diff * (total_days / 12), 1)
-            total_leave = point_down_round(raw_leave)
-
-        EmployeeLeave.objects.create(
-            employee=emp,
-            leave_type=leave_type,
-            total_leave=total_leave,
-            leave_taken=0,
-            leave_remaining=total_leave,
-            created_by=leave_type.created_by,
-            updated_by=leave_type.updated_by,
-            is_active=True,
-        )
-
-    # --- Deactivate old employees who no longer qualify ---
-    EmployeeLeave.objects.filter(
-        leave_type=leave_type,
-        employee_id__in=employee_ids_to_deactivate,
-        is_active=True
-    ).update(is_active=False)
-
-    # --- Update existing qualified employees (if number_of_days changed) ---
-    if update_existing:
-        for emp_id in employees_to_update:
-            try:
-                emp = AuthUser.objects.select_related('profile').get(id=emp_id)
-                profile = emp.profile
-            except (AuthUser.DoesNotExist, Profile.DoesNotExist):
-                continue
-
-            joining_date = profile.joining_date
-            if not joining_date:
-                continue
-
-            eng_join_date = nepali_str_to_english(joining_date.strftime('%Y-%m-%d'))
-
-            if eng_join_date <= eng_fiscal_year_start_date:
-                total_leave = total_days
-            else:
-                month_diff = (eng_fiscal_year_end_date - eng_join_date).days // 30
-                if month_diff <= 0:
-                    continue
-                raw_leave = round(month_diff * (total_days / 12), 1)
-                total_leave = point_down_round(raw_leave)
-
-            # Update total and remaining leave, but do not touch leave_taken
-            EmployeeLeave.objects.filter(
-                leave_type=leave_type,
-                employee=emp,
-                is_active=True
-            ).update(
-                total_leave=total_leave,
-                leave_remaining=F('leave_taken') > total_leave and 0 or (total_leave - F('leave_taken')),
-                is_active=True,
-                updated_by=leave_type.updated_by,
-                updated_on=timezone.now()
-            )
-
-
-
-
 # Leave
 class LeaveListView(ListView):
     model = Leave  
@@ -272,6 +162,19 @@ class LeaveListView(ListView):
         })
         return context
     
+def save_leave(leave, form):
+    """
+    Save a leave, turning a clash with the database overlap constraint (two
+    requests for the same days racing past form validation) into a form error.
+    """
+    try:
+        with transaction.atomic():
+            leave.save()
+    except IntegrityError:
+        form.add_error(None, "You have already taken leave on some of these dates.")
+        return False
+    return True
+
 class LeaveCreateView(LoginRequiredMixin, CreateView):
     model = Leave
     form_class = LeaveForm
@@ -288,14 +191,10 @@ class LeaveCreateView(LoginRequiredMixin, CreateView):
         leave.employee_id = self.request.user.id
         leave.created_by = self.request.user
 
-        start_date_nep = self.request.POST.get('start_date')
-        start_date_eng = nepali_str_to_english(start_date_nep)
-
-        end_date_nep = self.request.POST.get('end_date')
-        end_date_eng = nepali_str_to_english(end_date_nep)
-
-        leave.no_of_days = (end_date_eng - start_date_eng).days + 1
-        leave.save()
+        # Working days in the range, worked out by the form
+        leave.no_of_days = form.no_of_days
+        if not save_leave(leave, form):
+            return self.form_invalid(form)
 
         messages.success(self.request, "Leave  created successfully.")
         return redirect(self.success_url)
@@ -304,7 +203,7 @@ class LeaveCreateView(LoginRequiredMixin, CreateView):
         context = super().get_context_data(**kwargs)
         context['remaining_leaves'] = EmployeeLeave.objects.filter(
             employee=self.request.user,
-            leave_type__fiscal_year__is_current=True,
+            leave_type__fiscal_year_id=current_fiscal_year_id(),
             is_active=True
         ).select_related('leave_type')  # Optimizes DB queries
         return context
@@ -326,15 +225,11 @@ class LeaveEditView(LoginRequiredMixin, UpdateView):
         leave = form.save(commit=False)
         leave.updated_by = self.request.user
 
-        start_date_nep = self.request.POST.get('start_date')
-        start_date_eng = nepali_str_to_english(start_date_nep)
+        # Working days in the range, worked out by the form
+        leave.no_of_days = form.no_of_days
 
-        end_date_nep = self.request.POST.get('end_date')
-        end_date_eng = nepali_str_to_english(end_date_nep)
-
-        leave.no_of_days = (end_date_eng - start_date_eng).days + 1
-
-        leave.save()
+        if not save_leave(leave, form):
+            return self.form_invalid(form)
         messages.success(self.request, "Leave  updated successfully.")
         return redirect(self.success_url)
     
@@ -342,7 +237,7 @@ class LeaveEditView(LoginRequiredMixin, UpdateView):
         context = super().get_context_data(**kwargs)
         context['remaining_leaves'] = EmployeeLeave.objects.filter(
             employee=self.request.user,
-            leave_type__fiscal_year__is_current=True,
+            leave_type__fiscal_year_id=current_fiscal_year_id(),
             is_active=True
         ).select_related('leave_type')
         return context
@@ -370,44 +265,47 @@ class LeaveStatusUpdateView(View):
             messages.error(request, "Invalid status selected.")
             return redirect('leave:leave_list')
         
-        #update leave taken and remaining
-        if new_status == 'Approved':
-            update_employee_leaves(leave)
-
-        # if new_status == 'Declined':
-        #     EmployeeLeave.objects.filter(
-        #         employee=leave.employee,
-        #         leave_type=leave.leave_type
-        #     ).update(
-        #         leave_taken=Case(
-        #             When(leave_taken__gte=leave.no_of_days,
-        #                     then=F('leave_taken') - leave.no_of_days),
-        #             default=Value(0),
-        #             output_field=IntegerField()
-        #         ),
-        #         leave_remaining=F('leave_remaining') + leave.no_of_days
-        #     )
-
-        leave.status = new_status
-        leave.save()
+        overlap_error = "The employee already has leave on some of these dates."
+        try:
+            with transaction.atomic():
+                # Lock the leave so two reviewers cannot both move the balance
+                leave = Leave.objects.select_for_update().get(pk=leave.pk)
+                # A declined leave gave up its dates; another leave may hold them by now
+                if leave.status in RELEASED_STATUSES and new_status not in RELEASED_STATUSES and overlapping_leaves(
+                    leave.employee_id, leave.start_date.to_datetime_date(), leave.end_date.to_datetime_date(),
+                    exclude_pk=leave.pk,
+                ).exists():
+                    messages.error(request, overlap_error)
+                    return redirect('leave:leave_list')
+                # Move the balance through the ledger when a leave enters or leaves the approved state
+                if new_status == 'Approved' and leave.status != 'Approved':
+                    # Holidays may have been declared since the leave was applied for
+                    leave.no_of_days = leave_days(
+                        leave.leave_type, leave.start_date.to_datetime_date(), leave.end_date.to_datetime_date(),
+                        leave.is_half_day,
+                    )
+                    take_leave(leave, created_by=request.user)
+                elif leave.status == 'Approved' and new_status != 'Approved':
+                    reverse_leave(leave, created_by=request.user)
+
+                leave.status = new_status
+                leave.save()
+        except IntegrityError:
+            # Lost a race with a leave saved for the same days; the ledger entry is rolled back with it
+            messages.error(request, overlap_error)
+            return redirect('leave:leave_list')
         messages.success(request, f'Leave status updated to {leave.get_status_display()}.')
         return redirect('leave:leave_list')
-    
-def update_employee_leaves(leave):
-    leave_type = leave.leave_type
-    employee = leave.employee
-
-    employee_leave = EmployeeLeave.objects.filter(
-        employee=employee,
-        leave_type=leave_type,
-        is_active=True
-    ).first()
-    employee_leave.leave_taken += leave.no_of_days
-    employee_leave.leave_remaining -= leave.no_of_days
-    employee_leave.save()
-
-
-
-    
 
 
+def leave_calendar_view(request):
+    """Per-day list and headcount of employees on approved or pending leave for a Nepali month."""
+    today = nepali_datetime.date.today()
+    try:
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+    except ValueError:
+        return JsonResponse({'error': "Year and month must be numbers."}, status=400)
+    if not 1 <= month <= 12:
+        return JsonResponse({'error': "Month must be between 1 and 12."}, status=400)
+    return JsonResponse(month_calendar(year, month))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roster', '0001_initial'),
+        ('user', '0012_remove_profile_job_type_remove_profile_joining_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workingdetail',
+            index=models.Index(fields=['joining_date'], name='working_detail_joining_idx'),
+        ),
+    ]
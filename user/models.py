@@ -1,9 +1,11 @@
 from django.db import models
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from django.contrib.auth.models import AbstractUser
 from nepali_datetime_field.models import NepaliDateField
 
+from attendance.utils import attendance_status
 from leave.models import JobType
 from utils.enums import GENDER
 from utils.enums import MARITAL_STATUS
@@ -25,28 +27,50 @@ class AuthUser(AbstractUser):
         parts.append(self.last_name)
         return ' '.join(part for part in parts if part)
     
+    def todays_attendance(self):
+        """
+        Today's Attendance row (or None), loaded once and reused for the rest of
+        the request; ``request.user`` is built per request so the memo never
+        outlives it.
+        """
+        today = timezone.now().date()
+        cached = getattr(self, '_todays_attendance', None)
+        if cached is None or cached[0] != today:
+            cached = (today, self.attendance.filter(date=today).first())
+            self._todays_attendance = cached
+        return cached[1]
+
+    def set_todays_attendance(self, attendance):
+        self._todays_attendance = (timezone.now().date(), attendance)
+
+    @cached_property
+    def employee_shift(self):
+        working_detail = WorkingDetail.objects.select_related('shift').filter(employee=self).first()
+        return working_detail.shift if working_detail else None
+
+    async def atodays_attendance(self):
+        today = timezone.now().date()
+        cached = getattr(self, '_todays_attendance', None)
+        if cached is None or cached[0] != today:
+            cached = (today, await self.attendance.filter(date=today).afirst())
+            self._todays_attendance = cached
+        return cached[1]
+
+    async def aget_employee_shift(self):
+        if 'employee_shift' not in self.__dict__:
+            working_detail = await WorkingDetail.objects.select_related('shift').filter(employee=self).afirst()
+            self.__dict__['employee_shift'] = working_detail.shift if working_detail else None
+        return self.employee_shift
+
     @property
     def attendance_status_button(self):
-        todays_attendance = self.attendance.filter(
-            # date=timezone.localdate()
-            date=timezone.now()
-        )
-        if todays_attendance.exists():
-            # if todays_attendance.first().status == "CheckedOut":
-            #     return "Already CheckedIn"
-            # elif todays_attendance.first().status == "PaidLeave" or todays_attendance.first().status == "UnpaidLeave":
-            #     return "Leave"
-            # elif todays_attendance.first().status == "RoasterLeave":
-            #     return "Roaster Leave"
-            # else:
-            #     return "CheckOut"
-
-            if todays_attendance.first().checkin_time and not todays_attendance.first().checkout_time:
-                return "CheckOut"
-            elif todays_attendance.first().checkout_time:
-                return "Already CheckedOut"
-        else:
-            return "CheckIn"  
+        # if todays_attendance.status == "CheckedOut":
+        #     return "Already CheckedIn"
+        # elif todays_attendance.status == "PaidLeave" or todays_attendance.status == "UnpaidLeave":
+        #     return "Leave"
+        # elif todays_attendance.status == "RoasterLeave":
+        #     return "Roaster Leave"
+        return attendance_status(self.todays_attendance())
 
     def __str__(self):
         return self.username
@@ -81,6 +105,11 @@ class WorkingDetail(models.Model):
     job_type = models.CharField(choices=JobType.choices, default=JobType.PROBATION, verbose_name="Job Type")
     joining_date = NepaliDateField(null=True, verbose_name="Joining Date")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['joining_date'], name='working_detail_joining_idx'),
+        ]
+
   
 
 
@@ -1,3 +1,40 @@
+from datetime import time
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import Attendance
+from roster.models import Shift
+from user.models import AuthUser, WorkingDetail
+
+
+class DashboardQueryCountTest(TestCase):
+    # session, user, today's attendance, working detail + shift
+    QUERY_BUDGET = 4
+
+    def setUp(self):
+        self.user = AuthUser.objects.create_user(
+            username='emp', email='emp@example.com', password='pass',
+            first_name='Emp', last_name='Loyee',
+        )
+        shift = Shift.objects.create(title='Day', start_time=time(0, 0), end_time=time(23, 59))
+        WorkingDetail.objects.create(employee=self.user, shift=shift)
+        self.client.force_login(self.user)
+
+    def test_dashboard_before_checkin(self):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'data-bs-target="#checkinmodal"')
+
+    def test_dashboard_after_checkin(self):
+        Attendance.objects.create(employee=self.user, checkin_time=timezone.now().time())
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'data-bs-target="#checkoutmodal"')
 
-# Create your tests here.
+    def test_status_button_is_memoized(self):
+        user = AuthUser.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            for _ in range(6):
+                self.assertEqual(user.attendance_status_button, 'CheckIn')
@@ -0,0 +1,136 @@
+"""
+Bikram Sambat calendar as precomputed tables, so conversions to and from AD,
+month lengths and fiscal year bounds are index lookups rather than the
+nepali_datetime ordinal arithmetic and binary searches.
+
+The tables are compiled once at import from nepali_datetime's own month
+lengths, so both always agree:
+
+* ``_MONTH_STARTS[i]`` is the AD ordinal of the first day of BS month ``i``
+  (months counted from Baishakh of ``MIN_YEAR``); one extra entry closes the
+  last month.
+* ``_MONTH_OF_DAY[d]`` is the BS month index of the ``d``-th day of the range.
+"""
+from array import array
+from datetime import date
+
+import nepali_datetime
+
+MIN_YEAR, MAX_YEAR = nepali_datetime.MINYEAR, nepali_datetime.MAXYEAR
+# Fiscal years run from Shrawan 1 to the end of Asar
+FISCAL_YEAR_START_MONTH = 4
+
+
+def _compile():
+    first_ordinal = nepali_datetime.date(MIN_YEAR, 1, 1).to_datetime_date().toordinal()
+    month_starts, month_of_day = array('l', [first_ordinal]), array('H')
+    for year in range(MIN_YEAR, MAX_YEAR + 1):
+        # nepali_datetime keeps cumulative days before each month, led by a -1 placeholder
+        cumulative = nepali_datetime._CALENDAR[year]
+        for month in range(1, 13):
+            length = cumulative[month] - (cumulative[month - 1] if month > 1 else 0)
+            month_of_day.extend([len(month_starts) - 1] * length)
+            month_starts.append(month_starts[-1] + length)
+    return month_starts, month_of_day
+
+
+_MONTH_STARTS, _MONTH_OF_DAY = _compile()
+MIN_ORDINAL, MAX_ORDINAL = _MONTH_STARTS[0], _MONTH_STARTS[-1] - 1
+
+
+def _month_index(year, month):
+    if not MIN_YEAR <= year <= MAX_YEAR or not 1 <= month <= 12:
+        raise ValueError(f"BS month {year}-{month:02d} is outside {MIN_YEAR}..{MAX_YEAR}.")
+    return (year - MIN_YEAR) * 12 + month - 1
+
+
+def month_length(year, month):
+    index = _month_index(year, month)
+    return _MONTH_STARTS[index + 1] - _MONTH_STARTS[index]
+
+
+def bs_to_ad(year, month, day):
+    index = _month_index(year, month)
+    if not 1 <= day <= _MONTH_STARTS[index + 1] - _MONTH_STARTS[index]:
+        raise ValueError(f"Day {day} is out of range for BS month {year}-{month:02d}.")
+    return date.fromordinal(_MONTH_STARTS[index] + day - 1)
+
+
+def ad_to_bs(ad_date):
+    """(year, month, day) in BS of an AD date."""
+    ordinal = ad_date.toordinal()
+    if not MIN_ORDINAL <= ordinal <= MAX_ORDINAL:
+        raise ValueError(f"{ad_date} is outside the supported BS range.")
+    index = _MONTH_OF_DAY[ordinal - MIN_ORDINAL]
+    year, month = divmod(index, 12)
+    return MIN_YEAR + year, month + 1, ordinal - _MONTH_STARTS[index] + 1
+
+
+def ad_to_nepali(ad_date):
+    return nepali_datetime.date(*ad_to_bs(ad_date))
+
+
+def parse_bs(string_date):
+    """AD date of a ``YYYY-MM-DD`` BS string."""
+    year, month, day = string_date.split('-')
+    return bs_to_ad(int(year), int(month), int(day))
+
+
+def month_bounds(year, month):
+    """First and last AD dates of a BS month."""
+    index = _month_index(year, month)
+    return date.fromordinal(_MONTH_STARTS[index]), date.fromordinal(_MONTH_STARTS[index + 1] - 1)
+
+
+def fiscal_year_bounds(year):
+    """First and last AD dates of the fiscal year starting in Shrawan of BS ``year``."""
+    start = _month_index(year, FISCAL_YEAR_START_MONTH)
+    end = _month_index(year + 1, FISCAL_YEAR_START_MONTH - 1)
+    return date.fromordinal(_MONTH_STARTS[start]), date.fromordinal(_MONTH_STARTS[end + 1] - 1)
+
+
+def fiscal_year_of(ad_date):
+    """BS year in which the fiscal year containing the AD date starts."""
+    year, month, _ = ad_to_bs(ad_date)
+    return year if month >= FISCAL_YEAR_START_MONTH else year - 1
+
+
+def ad_to_bs_many(ad_dates):
+    """
+    Columnar ``(years, months, days)`` arrays for a sequence of AD dates, in
+    one pass over the table without creating a date object per entry.
+    """
+    years, months, days = array('H'), array('B'), array('B')
+    month_of_day, month_starts, last_offset = _MONTH_OF_DAY, _MONTH_STARTS, MAX_ORDINAL - MIN_ORDINAL
+    for ad_date in ad_dates:
+        ordinal = ad_date.toordinal()
+        offset = ordinal - MIN_ORDINAL
+        if not 0 <= offset <= last_offset:
+            raise ValueError(f"{ad_date} is outside the supported BS range.")
+        index = month_of_day[offset]
+        years.append(MIN_YEAR + index // 12)
+        months.append(index % 12 + 1)
+        days.append(ordinal - month_starts[index] + 1)
+    return years, months, days
+
+
+def ad_to_bs_strings(ad_dates):
+    """``YYYY-MM-DD`` BS strings for a sequence of AD dates; repeated dates are formatted once."""
+    formatted, strings = {}, []
+    for ad_date in ad_dates:
+        string = formatted.get(ad_date)
+        if string is None:
+            string = formatted[ad_date] = '%04d-%02d-%02d' % ad_to_bs(ad_date)
+        strings.append(string)
+    return strings
+
+
+def parse_bs_many(string_dates):
+    """AD dates for a sequence of ``YYYY-MM-DD`` BS strings; repeated strings are parsed once."""
+    parsed, ad_dates = {}, []
+    for string_date in string_dates:
+        ad_date = parsed.get(string_date)
+        if ad_date is None:
+            ad_date = parsed[string_date] = parse_bs(string_date)
+        ad_dates.append(ad_date)
+    return ad_dates
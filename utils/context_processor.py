@@ -25,7 +25,7 @@ def check_active_sidebar_links(request):
     if current_url in employee_urls:
         employee_status = True
     
-    attendance_urls =[ 'attendance:request_list']
+    attendance_urls =[ 'attendance:request_list', 'attendance:register', 'attendance:history']
     if current_url in attendance_urls:
         attendance_status = True
     
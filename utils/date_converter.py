@@ -1,19 +1,47 @@
 import nepali_datetime
 from datetime import datetime,timedelta,date
 
+from django.db.models import DateField, Value
+from django.db.models.functions import Cast
+
+from utils.bs_calendar import (
+    FISCAL_YEAR_START_MONTH, ad_to_bs_many, ad_to_bs_strings, ad_to_nepali, bs_to_ad, fiscal_year_bounds, month_length,
+    parse_bs, parse_bs_many,
+)
+
 def nepali_str_to_english(string_date):
-    string_date_split=string_date.split("-")
-    np_date = (nepali_datetime.date(int(string_date_split[0]),int(string_date_split[1]),int(string_date_split[2])))
-    date = np_date.to_datetime_date()
-    return date
+    return parse_bs(string_date)
 
 
 def english_to_nepali(string_date):
-    return nepali_datetime.date.from_datetime_date(string_date)
+    return ad_to_nepali(string_date)
+
+
+def english_to_nepali_many(dates):
+    # Batch form for reports: a list of BS 'YYYY-MM-DD' strings, one pass over the calendar table
+    return ad_to_bs_strings(dates)
+
+
+def english_to_nepali_columns(dates):
+    # (years, months, days) arrays, for grouping many AD dates by Nepali month
+    return ad_to_bs_many(dates)
+
+
+def nepali_str_to_english_many(string_dates):
+    return parse_bs_many(string_dates)
+
+def ad_date(field_name):
+    # NepaliDateField columns already hold AD dates; read them back as datetime.date instead of BS
+    return Cast(field_name, DateField())
+
+
+def ad_value(day):
+    # Compare a NepaliDateField column with an AD date as is, without converting it to BS first
+    return Value(day, output_field=DateField())
 
 def nepali_to_english(date):
     # return date.np_date.to_datetime_date()
-    return date.to_datetime_date()
+    return bs_to_ad(date.year, date.month, date.day)
 
 def get_last_day():
     today = (nepali_datetime.date.today())
@@ -50,26 +78,22 @@ def get_last_day_of_month(month_, year):
         month_num = 12 
     else:
         month_num = month_
-    next_month =  month_num + 1
-
-
-    if next_month>12:
-        next_month=1
-        year = int(year)+1
-
-    next_month_first_day = nepali_datetime.date(int(year), next_month, 1)
-    lastdate = next_month_first_day - timedelta(days=1)
-    lastday = lastdate.day
-    firstdate = lastdate - timedelta(days=int(lastdate.day-1))
+    month_num = int(month_num)
+    lastday = month_length(int(year), month_num)
+    firstdate = nepali_datetime.date(int(year), month_num, 1)
+    lastdate = nepali_datetime.date(int(year), month_num, lastday)
     start_end_dates = (firstdate,lastdate, lastday, month_num)
     return start_end_dates
 
 def finding_fiscal_date(year, month):
-    if month in [1,2,3,4]:
-        current_fiscal_year = year - 1
+    # The FiscalYear row covering the month when there is one, else the Shrawan-Asar convention
+    from fiscal_year.resolver import fiscal_year_for
 
-        return {"start_year":current_fiscal_year, "start_month":4, "start_day":1, "end_year":year, "end_month":3, "end_day":30}
-    
+    fiscal_year = fiscal_year_for(bs_to_ad(year, month, 1))
+    if fiscal_year:
+        start, end = fiscal_year.start_date, fiscal_year.end_date
     else:
-        current_fiscal_year = year + 1
-        return {"start_year":year, "start_month":4, "start_day":1, "end_year":current_fiscal_year, "end_month":3, "end_day":30}
\ No newline at end of file
+        start_year = year if month >= FISCAL_YEAR_START_MONTH else year - 1
+        start, end = (english_to_nepali(day) for day in fiscal_year_bounds(start_year))
+    return {"start_year":start.year, "start_month":start.month, "start_day":start.day,
+            "end_year":end.year, "end_month":end.month, "end_day":end.day}
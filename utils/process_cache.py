@@ -0,0 +1,42 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class ProcessIndex:
+    """
+    A lookup structure built from the database and kept in process memory.
+
+    Other workers learn that it changed through a version key in the shared
+    cache. The key is read at most every CACHE_VERSION_CHECK_INTERVAL seconds,
+    so lookups in between cost no round trip; a change made in this process
+    is seen at once, one made elsewhere within that interval.
+    """
+
+    def __init__(self, version_key, build):
+        self.version_key, self.build = version_key, build
+        self.value, self.version, self.checked_at = None, None, None
+
+    def _shared_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(self.version_key, version, None)
+            version = cache.get(self.version_key, version)
+        return version
+
+    def get(self):
+        now = time.monotonic()
+        if self.value is not None and now - self.checked_at < settings.CACHE_VERSION_CHECK_INTERVAL:
+            return self.value
+        version = self._shared_version()
+        if self.value is None or version != self.version:
+            self.value, self.version = self.build(), version
+        self.checked_at = now
+        return self.value
+
+    def invalidate(self):
+        self.value = None
+        cache.set(self.version_key, uuid.uuid4().hex, None)